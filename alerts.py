@@ -0,0 +1,374 @@
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from database import store_alert_events
+
+# Display name and unit of each metric, used in alert messages
+METRIC_LABELS = {
+    'temperature': ('Nhiệt độ', '°C'),
+    'humidity': ('Độ ẩm', '%')
+}
+
+# Margin a value must move back inside a limit before a raised alert clears,
+# so readings hovering around a limit don't raise and clear on every sample
+DEFAULT_HYSTERESIS = {
+    'temperature': 0.5,
+    'humidity': 2.0
+}
+
+# Same for rate rules, in rate units (°C/min, %/min): a raised rate alert clears
+# once the rate drops this far below max_rate
+DEFAULT_RATE_HYSTERESIS = {
+    'temperature': 0.1,
+    'humidity': 0.5
+}
+
+# Rule kinds and the parameters each one reads
+RULE_PARAMETERS = {
+    'range': ('min', 'max', 'hysteresis', 'sustain_minutes'),
+    'rate': ('max_rate', 'hysteresis', 'sustain_minutes')
+}
+
+# Columns of the transitions returned by AlertEngine.evaluate (the log stores all but the message)
+ALERT_COLUMNS = ['timestamp', 'sensor_id', 'rule', 'metric', 'event', 'value', 'severity', 'reading_id',
+                 'parameters', 'message']
+
+def threshold_rules(temp_min=15.0, temp_max=30.0, humid_min=30.0, humid_max=70.0, zones=None):
+    """
+    Build the standard rule set from the dashboard's alert thresholds.
+
+    Args:
+        temp_min (float): Minimum allowed temperature (°C)
+        temp_max (float): Maximum allowed temperature (°C)
+        humid_min (float): Minimum allowed humidity (%)
+        humid_max (float): Maximum allowed humidity (%)
+        zones (dict): Optional per-sensor overrides, e.g.
+            {'cold_room': {'temperature_range': {'min': 2.0, 'max': 8.0}}}
+
+    Returns:
+        list: Rule definitions for compile_rules
+    """
+    zones = zones or {}
+    rules = [
+        {'name': 'temperature_range', 'kind': 'range', 'metric': 'temperature',
+         'min': temp_min, 'max': temp_max, 'hysteresis': DEFAULT_HYSTERESIS['temperature']},
+        {'name': 'humidity_range', 'kind': 'range', 'metric': 'humidity',
+         'min': humid_min, 'max': humid_max, 'hysteresis': DEFAULT_HYSTERESIS['humidity']}
+    ]
+    for rule in rules:
+        overrides = {zone: params[rule['name']] for zone, params in zones.items() if rule['name'] in params}
+        if overrides:
+            rule['zones'] = overrides
+    return rules
+
+class CompiledRule:
+    """
+    Alert rule with its parameters resolved per sensor.
+
+    Rules are evaluated over a whole batch of readings with NumPy. The raised /
+    cleared state of each sensor is latched with hysteresis and carried between
+    batches, so results do not depend on how readings are batched.
+    """
+
+    def __init__(self, rule):
+        """
+        Args:
+            rule (dict): Rule definition with 'name', 'kind' ('range' or 'rate'),
+                'metric', the kind's parameters and optional 'zones' overrides
+        """
+        if rule.get('kind') not in RULE_PARAMETERS:
+            raise ValueError(f"Unknown alert rule kind: {rule.get('kind')}")
+        if rule.get('metric') not in METRIC_LABELS:
+            raise ValueError(f"Unknown alert rule metric: {rule.get('metric')}")
+
+        self.name = rule['name']
+        self.kind = rule['kind']
+        self.metric = rule['metric']
+        self.severity = rule.get('severity', 'warning')
+        hysteresis = DEFAULT_HYSTERESIS if self.kind == 'range' else DEFAULT_RATE_HYSTERESIS
+        self.defaults = {
+            'min': rule.get('min', -np.inf),
+            'max': rule.get('max', np.inf),
+            'max_rate': rule.get('max_rate', np.inf),
+            'hysteresis': rule.get('hysteresis', hysteresis[self.metric]),
+            'sustain_minutes': rule.get('sustain_minutes', 0.0)
+        }
+        self.zones = rule.get('zones', {})
+
+    def parameters(self, sensor_id):
+        """Parameters that apply to one sensor."""
+        return {**self.defaults, **self.zones.get(sensor_id, {})}
+
+    def parameters_json(self, sensor_id):
+        """Parameters that apply to one sensor as JSON, as stored in the alert log (unset limits left out)."""
+        params = self.parameters(sensor_id)
+        return json.dumps({key: float(params[key]) for key in RULE_PARAMETERS[self.kind]
+                           if np.isfinite(params[key])}, sort_keys=True)
+
+    def _resolve(self, sensors):
+        # One array per parameter, with zone overrides applied row by row
+        resolved = {}
+        for key in RULE_PARAMETERS[self.kind]:
+            values = np.full(len(sensors), float(self.defaults[key]))
+            for zone, overrides in self.zones.items():
+                if key in overrides:
+                    values[sensors == zone] = overrides[key]
+            resolved[key] = values
+        return resolved
+
+    def _signals(self, values, times, first, carry, params):
+        """Return (set, clear) masks: readings that raise and that release the latch."""
+        if self.kind == 'range':
+            low, high, margin = params['min'], params['max'], params['hysteresis']
+            raise_mask = (values < low) | (values > high)
+            clear_mask = (values >= low + margin) & (values <= high - margin)
+            return raise_mask, clear_mask
+
+        # Rate of change per minute against the previous reading of the same sensor
+        previous = np.empty_like(values)
+        previous[1:] = values[:-1]
+        previous_times = np.empty_like(times)
+        previous_times[1:] = times[:-1]
+        previous[first] = carry['last_value']
+        previous_times[first] = carry['last_time']
+        minutes = (times - previous_times) / np.timedelta64(1, 'm')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = np.abs((values - previous) / minutes)
+        rate[~(minutes > 0)] = np.nan
+
+        raise_mask = rate > params['max_rate']
+        clear_mask = rate <= params['max_rate'] - params['hysteresis']
+        return raise_mask, clear_mask
+
+    def evaluate(self, sensors, times, values, first, state):
+        """
+        Evaluate the rule over a batch of readings grouped by sensor.
+
+        Args:
+            sensors (np.ndarray): Sensor id per reading, readings of a sensor contiguous
+            times (np.ndarray): datetime64 timestamps, ascending within a sensor
+            values (np.ndarray): Metric values
+            first (np.ndarray): True at the first reading of each sensor
+            state (dict): Per-sensor state from earlier batches, updated in place
+
+        Returns:
+            np.ndarray: Boolean mask of readings at which the alert is active
+            np.ndarray: Boolean mask of readings at which the alert state changed
+        """
+        n = len(values)
+        starts = np.flatnonzero(first)
+        ends = np.append(starts[1:], n) - 1
+
+        # State carried over from the previous batch, spread to each sensor's rows
+        carried = [state.get(sensor, {}) for sensor in sensors[starts]]
+        carry = {
+            'latched': np.array([c.get('latched', False) for c in carried]),
+            'active': np.array([c.get('active', False) for c in carried]),
+            'run_start': np.array([c.get('run_start', np.datetime64('NaT')) for c in carried],
+                                  dtype='datetime64[ns]'),
+            'last_value': np.array([c.get('last_value', np.nan) for c in carried], dtype=float),
+            'last_time': np.array([c.get('last_time', np.datetime64('NaT')) for c in carried],
+                                  dtype='datetime64[ns]')
+        }
+
+        params = self._resolve(sensors)
+        raise_mask, clear_mask = self._signals(values, times, first, carry, params)
+
+        # Latch with hysteresis: set on a violation, release only on a clear reading,
+        # otherwise keep the previous state (forward fill, seeded with the carried state)
+        signal = np.full(n, np.nan)
+        signal[clear_mask] = 0.0
+        signal[raise_mask] = 1.0
+        unset = np.isnan(signal[starts])
+        signal[starts[unset]] = carry['latched'][unset]
+        filled = np.maximum.accumulate(np.where(np.isnan(signal), 0, np.arange(n)))
+        latched = signal[filled] == 1.0
+
+        # Start time of the current latched run, for sustained-for-N-minutes rules
+        previous_latched = np.empty(n, dtype=bool)
+        previous_latched[1:] = latched[:-1]
+        previous_latched[first] = carry['latched']
+        run_begins = latched & ~previous_latched
+        run_start = np.where(run_begins, times, np.datetime64('NaT'))
+        run_start[starts] = np.where(latched[starts] & previous_latched[starts],
+                                     carry['run_start'], run_start[starts])
+        marks = run_begins.copy()
+        marks[starts] = True
+        run_start = run_start[np.maximum.accumulate(np.where(marks, np.arange(n), 0))]
+
+        sustain = (params['sustain_minutes'] * 60e9).astype('timedelta64[ns]')
+        active = latched & (times - run_start >= sustain)
+
+        previous_active = np.empty(n, dtype=bool)
+        previous_active[1:] = active[:-1]
+        previous_active[first] = carry['active']
+        changed = active != previous_active
+
+        for start, end, sensor in zip(starts, ends, sensors[starts]):
+            state[sensor] = {
+                'latched': bool(latched[end]),
+                'active': bool(active[end]),
+                'run_start': run_start[end],
+                'last_value': values[end],
+                'last_time': times[end],
+                'since': run_start[end] + sustain[end] if active[end] else None
+            }
+
+        return active, changed
+
+    def message(self, sensor_id, value=None):
+        """
+        Describe an alert of this rule for display.
+
+        Args:
+            sensor_id (str): Sensor the alert belongs to
+            value (float): Value that raised the alert
+
+        Returns:
+            str: Alert message
+        """
+        label, unit = METRIC_LABELS[self.metric]
+        params = self.parameters(sensor_id)
+        if self.kind == 'range':
+            text = f"⚠️ {label} ngoài phạm vi cho phép: {params['min']} - {params['max']} {unit}"
+        else:
+            text = f"⚠️ {label} thay đổi quá nhanh: hơn {params['max_rate']} {unit}/phút"
+        if params['sustain_minutes']:
+            text += f" (kéo dài ≥ {params['sustain_minutes']:g} phút)"
+        return text
+
+def _empty_alerts():
+    """Transitions frame without rows, with the same column types as a filled one."""
+    return pd.DataFrame({
+        column: pd.Series(dtype='datetime64[ns]' if column == 'timestamp' else
+                          float if column in ('value', 'reading_id') else object)
+        for column in ALERT_COLUMNS
+    })
+
+def compile_rules(rules):
+    """
+    Validate rule definitions and resolve their parameters.
+
+    Args:
+        rules (list): Rule definitions (see threshold_rules)
+
+    Returns:
+        list: CompiledRule objects
+    """
+    return [CompiledRule(rule) for rule in rules]
+
+class AlertEngine:
+    """
+    Evaluate alert rules over batches of readings from many sensors.
+
+    Only state changes are reported, so an alert raised once stays a single log
+    entry until it clears. Readings already evaluated (by id) are skipped, which
+    lets several dashboard sessions feed the same engine. The log keeps one
+    transition per reading, rule and rule parameters, so engines sharing a rule
+    don't log it twice and different thresholds under one rule name don't collide.
+    """
+
+    def __init__(self, rules, log=True, start_id=0):
+        """
+        Args:
+            rules (list): Rule definitions (see threshold_rules)
+            log (bool): Append raised/cleared events to the alert_log table
+            start_id (int): Readings up to this id count as already evaluated
+        """
+        self.rules = compile_rules(rules)
+        self.log = log
+        self.state = {rule.name: {} for rule in self.rules}
+        self.last_id = start_id
+        self.lock = threading.Lock()
+
+    def evaluate(self, readings):
+        """
+        Evaluate all rules over new readings.
+
+        Args:
+            readings (pd.DataFrame): Readings with 'timestamp', 'sensor_id', the metric
+                columns and optionally 'id'
+
+        Returns:
+            pd.DataFrame: Alert transitions with 'timestamp', 'sensor_id', 'rule',
+                'metric', 'event' ('raised' or 'cleared'), 'value', 'severity',
+                'reading_id' (NaN without an 'id' column), 'parameters' (JSON of
+                the rule parameters that applied) and 'message'
+        """
+        with self.lock:
+            if 'id' in readings.columns:
+                readings = readings[readings['id'] > self.last_id]
+            if readings.empty:
+                return _empty_alerts()
+
+            # Group each sensor's readings together, in time order
+            readings = readings.sort_values(['sensor_id', 'timestamp'], kind='stable')
+            reading_ids = (readings['id'].to_numpy(dtype=float) if 'id' in readings.columns
+                           else np.full(len(readings), np.nan))
+            sensors = readings['sensor_id'].to_numpy(dtype=object)
+            times = pd.to_datetime(readings['timestamp']).to_numpy(dtype='datetime64[ns]')
+            first = np.empty(len(readings), dtype=bool)
+            first[0] = True
+            first[1:] = sensors[1:] != sensors[:-1]
+
+            frames = []
+            for rule in self.rules:
+                values = readings[rule.metric].to_numpy(dtype=float)
+                active, changed = rule.evaluate(sensors, times, values, first, self.state[rule.name])
+                rows = np.flatnonzero(changed)
+                if len(rows):
+                    frames.append(pd.DataFrame({
+                        'timestamp': times[rows],
+                        'sensor_id': sensors[rows],
+                        'rule': rule.name,
+                        'metric': rule.metric,
+                        'event': np.where(active[rows], 'raised', 'cleared'),
+                        'value': values[rows],
+                        'severity': rule.severity,
+                        'reading_id': reading_ids[rows],
+                        'parameters': [rule.parameters_json(sensor) for sensor in sensors[rows]],
+                        'message': [rule.message(sensor) for sensor in sensors[rows]]
+                    }))
+
+            if 'id' in readings.columns:
+                self.last_id = max(self.last_id, int(readings['id'].max()))
+
+            if not frames:
+                return _empty_alerts()
+
+            events = pd.concat(frames, ignore_index=True).sort_values('timestamp', kind='stable')
+            if self.log:
+                store_alert_events([
+                    (timestamp.to_pydatetime(), sensor, rule, metric, event, float(value), severity,
+                     None if np.isnan(reading_id) else int(reading_id), parameters)
+                    for timestamp, sensor, rule, metric, event, value, severity, reading_id, parameters
+                    in events[ALERT_COLUMNS[:-1]].itertuples(index=False, name=None)
+                ])
+            return events
+
+    def active_alerts(self):
+        """
+        List the alerts that are currently raised.
+
+        Returns:
+            list: Dicts with 'rule', 'sensor_id', 'metric', 'severity', 'value',
+                  'since' and 'message'
+        """
+        with self.lock:
+            return [
+                {
+                    'rule': rule.name,
+                    'sensor_id': sensor,
+                    'metric': rule.metric,
+                    'severity': rule.severity,
+                    'value': state['last_value'],
+                    'since': state['since'],
+                    'message': rule.message(sensor)
+                }
+                for rule in self.rules
+                for sensor, state in self.state[rule.name].items()
+                if state['active']
+            ]
@@ -1,22 +1,70 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-from sklearn.ensemble import IsolationForest
-import matplotlib.pyplot as plt
 
-def detect_anomalies(data, threshold=3.0):
+# scipy and scikit-learn take seconds to import; they are imported by the
+# detection methods that use them so importing this module stays cheap
+
+from database import (
+    ANOMALY_SCORE_FLOOR,
+    DEFAULT_SENSOR_ID,
+    get_readings_after_id,
+    load_seasonal_baseline,
+    save_seasonal_baseline,
+    store_anomaly_events
+)
+from instrumentation import timed
+
+# Metrics tracked by the seasonal baseline
+BASELINE_METRICS = ('temperature', 'humidity')
+
+# Minimum readings a weekday/hour bucket needs before it is used for scoring
+BASELINE_MIN_SAMPLES = 10
+
+# Default (delta, threshold) of the Page-Hinkley change-point detector per metric.
+# delta is the drift tolerated per reading, threshold the cumulative deviation
+# that raises a change event
+CHANGE_POINT_DEFAULTS = {
+    'temperature': (0.1, 8.0),
+    'humidity': (0.25, 20.0)
+}
+
+@timed()
+def detect_anomalies(data, threshold=3.0, baseline=None):
     """
     Detect anomalies in temperature and humidity data.
     
     Args:
         data (pd.DataFrame): DataFrame containing 'timestamp', 'temperature', 'humidity'
         threshold (float): The threshold for anomaly detection (Z-score or contamination)
+        baseline (dict): Optional seasonal baseline from build_seasonal_baseline. When it
+                         covers every reading, readings are scored against their
+                         weekday/hour bucket instead of the global distribution
         
     Returns:
         tuple: (temperature_anomalies, humidity_anomalies) where each is a DataFrame
                containing the anomalous readings
     """
-    if data.empty or len(data) < 10:  # Need enough data for meaningful detection
+    if data.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    
+    # Method 0: Seasonal z-score against the precomputed baseline
+    if baseline is not None:
+        temp_z = score_against_baseline(data, baseline, 'temperature')
+        humid_z = score_against_baseline(data, baseline, 'humidity')
+        
+        # Only use the baseline once it has warmed up for all buckets in the window
+        if not (np.isnan(temp_z).any() or np.isnan(humid_z).any()):
+            temp_data = data.copy()
+            humid_data = data.copy()
+            temp_data['zscore'] = np.abs(temp_z)
+            humid_data['zscore'] = np.abs(humid_z)
+            
+            temp_anomalies = temp_data[temp_data['zscore'] > threshold]
+            humid_anomalies = humid_data[humid_data['zscore'] > threshold]
+            temp_anomalies.attrs['method'] = humid_anomalies.attrs['method'] = 'seasonal'
+            return temp_anomalies, humid_anomalies
+    
+    if len(data) < 10:  # Need enough data for meaningful detection
         return pd.DataFrame(), pd.DataFrame()
     
     # Create copies to avoid modifying original data
@@ -25,6 +73,8 @@ def detect_anomalies(data, threshold=3.0):
     
     # Method 1: Z-score detection
     if len(data) < 50:  # For smaller datasets, use Z-score
+        from scipy import stats
+        
         # Calculate Z-scores
         temp_data['zscore'] = np.abs(stats.zscore(temp_data['temperature']))
         humid_data['zscore'] = np.abs(stats.zscore(humid_data['humidity']))
@@ -32,9 +82,12 @@ def detect_anomalies(data, threshold=3.0):
         # Identify anomalies based on Z-score threshold
         temp_anomalies = temp_data[temp_data['zscore'] > threshold]
         humid_anomalies = humid_data[humid_data['zscore'] > threshold]
+        temp_anomalies.attrs['method'] = humid_anomalies.attrs['method'] = 'zscore'
     
     # Method 2: Isolation Forest for larger datasets
     else:
+        from sklearn.ensemble import IsolationForest
+        
         # Prepare data for Isolation Forest
         temp_values = temp_data['temperature'].values.reshape(-1, 1)
         humid_values = humid_data['humidity'].values.reshape(-1, 1)
@@ -53,12 +106,502 @@ def detect_anomalies(data, threshold=3.0):
         humid_model.fit(humid_values)
         humid_data['anomaly'] = humid_model.predict(humid_values)
         
-        # Extract anomalies (-1 indicates an anomaly)
-        temp_anomalies = temp_data[temp_data['anomaly'] == -1]
-        humid_anomalies = humid_data[humid_data['anomaly'] == -1]
+        # Score the readings on the Z-score scale so the threshold also applies here
+        # (the contamination is clamped to 10%, whatever the threshold)
+        from scipy import stats
+        
+        temp_data['zscore'] = np.abs(stats.zscore(temp_data['temperature']))
+        humid_data['zscore'] = np.abs(stats.zscore(humid_data['humidity']))
+        
+        # Extract anomalies (-1 indicates an anomaly) that reach the threshold
+        temp_anomalies = temp_data[(temp_data['anomaly'] == -1) & (temp_data['zscore'] > threshold)]
+        humid_anomalies = humid_data[(humid_data['anomaly'] == -1) & (humid_data['zscore'] > threshold)]
+        temp_anomalies.attrs['method'] = humid_anomalies.attrs['method'] = 'isolation_forest'
     
     return temp_anomalies, humid_anomalies
 
+def _empty_baseline_table():
+    """Create an empty (count, mean, M2) lookup table indexed by [weekday, hour]."""
+    return np.zeros((3, 7, 24))
+
+def _merge_bucket_statistics(table, weekday, hour, values):
+    """
+    Merge a batch of readings into a baseline table.
+    
+    Uses the parallel variance algorithm (Chan et al.) so the table can be
+    refreshed with new readings without revisiting the raw history.
+    
+    Args:
+        table (np.ndarray): (3, 7, 24) array holding count, mean and M2 per bucket
+        weekday (np.ndarray): Day of week (0 = Monday) of each reading
+        hour (np.ndarray): Hour of day of each reading
+        values (np.ndarray): Reading values
+        
+    Returns:
+        np.ndarray: The updated table
+    """
+    bucket = weekday * 24 + hour
+    
+    # Per-bucket statistics of the new batch
+    batch_count = np.bincount(bucket, minlength=168).astype(float)
+    batch_sum = np.bincount(bucket, weights=values, minlength=168)
+    batch_mean = np.divide(batch_sum, batch_count, out=np.zeros(168), where=batch_count > 0)
+    deviation = values - batch_mean[bucket]
+    batch_m2 = np.bincount(bucket, weights=deviation * deviation, minlength=168)
+    
+    # Combine with the existing statistics
+    count, mean, m2 = table.reshape(3, 168)
+    total = count + batch_count
+    delta = batch_mean - mean
+    ratio = np.divide(batch_count, total, out=np.zeros(168), where=total > 0)
+    
+    merged = np.empty((3, 168))
+    merged[0] = total
+    merged[1] = mean + delta * ratio
+    merged[2] = m2 + batch_m2 + delta * delta * count * ratio
+    
+    return merged.reshape(3, 7, 24)
+
+def build_seasonal_baseline(data, baseline=None):
+    """
+    Build or incrementally refresh per-sensor hour-of-day / day-of-week baselines.
+    
+    Args:
+        data (pd.DataFrame): DataFrame containing 'id', 'timestamp', 'temperature',
+                             'humidity' and optionally 'sensor_id'
+        baseline (dict): Existing baseline to refresh. Readings with an id at or
+                         below its 'last_id' are skipped
+        
+    Returns:
+        dict: Baseline with 'last_id' and 'tables', where 'tables' maps
+              (sensor_id, metric) to a (3, 7, 24) array of count, mean and M2
+    """
+    if baseline is None:
+        baseline = {'last_id': 0, 'tables': {}}
+    
+    if data.empty:
+        return baseline
+    
+    # Skip readings that are already part of the baseline
+    if 'id' in data.columns:
+        data = data[data['id'] > baseline['last_id']]
+        if data.empty:
+            return baseline
+    
+    timestamps = pd.to_datetime(data['timestamp'])
+    weekday = timestamps.dt.dayofweek.to_numpy()
+    hour = timestamps.dt.hour.to_numpy()
+    
+    if 'sensor_id' in data.columns:
+        sensor_ids = data['sensor_id'].to_numpy()
+    else:
+        sensor_ids = np.full(len(data), DEFAULT_SENSOR_ID, dtype=object)
+    
+    for sensor_id in pd.unique(sensor_ids):
+        mask = sensor_ids == sensor_id
+        for metric in BASELINE_METRICS:
+            table = baseline['tables'].get((sensor_id, metric), _empty_baseline_table())
+            baseline['tables'][(sensor_id, metric)] = _merge_bucket_statistics(
+                table, weekday[mask], hour[mask], data[metric].to_numpy(dtype=float)[mask]
+            )
+    
+    if 'id' in data.columns:
+        baseline['last_id'] = max(baseline['last_id'], int(data['id'].max()))
+    
+    return baseline
+
+def score_against_baseline(data, baseline, metric, min_samples=BASELINE_MIN_SAMPLES):
+    """
+    Score readings against their weekday/hour bucket of the seasonal baseline.
+    
+    Args:
+        data (pd.DataFrame): DataFrame containing 'timestamp', the metric column and
+                             optionally 'sensor_id'
+        baseline (dict): Baseline from build_seasonal_baseline
+        metric (str): 'temperature' or 'humidity'
+        min_samples (int): Buckets with fewer readings than this are not scored
+        
+    Returns:
+        np.ndarray: Signed z-scores, NaN where the baseline has no usable bucket
+    """
+    timestamps = pd.to_datetime(data['timestamp'])
+    weekday = timestamps.dt.dayofweek.to_numpy()
+    hour = timestamps.dt.hour.to_numpy()
+    values = data[metric].to_numpy(dtype=float)
+    
+    if 'sensor_id' in data.columns:
+        sensor_ids = data['sensor_id'].to_numpy()
+    else:
+        sensor_ids = np.full(len(data), DEFAULT_SENSOR_ID, dtype=object)
+    
+    scores = np.full(len(data), np.nan)
+    for sensor_id in pd.unique(sensor_ids):
+        table = baseline['tables'].get((sensor_id, metric))
+        if table is None:
+            continue
+        
+        mask = sensor_ids == sensor_id
+        
+        # Single lookup of the expected statistics for each reading
+        count, mean, m2 = table[:, weekday[mask], hour[mask]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(m2 / (count - 1))
+            z = (values[mask] - mean) / std
+        
+        # Flat buckets (zero spread) score as normal unless the value moved
+        z = np.where(std > 0, z, np.where(values[mask] == mean, 0.0, np.inf))
+        scores[mask] = np.where(count >= min_samples, z, np.nan)
+    
+    return scores
+
+@timed()
+def refresh_seasonal_baseline(baseline=None):
+    """
+    Bring the stored seasonal baseline up to date with new database readings.
+    
+    Args:
+        baseline (dict): Baseline already in memory. Loaded from the database if None
+        
+    Returns:
+        dict: The refreshed baseline
+    """
+    if baseline is None:
+        baseline = {'last_id': 0, 'tables': {}}
+        stored = load_seasonal_baseline()
+        for row in stored.itertuples(index=False):
+            stats = np.frombuffer(row.stats, dtype=np.float64).reshape(3, 7, 24).copy()
+            baseline['tables'][(row.sensor_id, row.metric)] = stats
+            baseline['last_id'] = max(baseline['last_id'], int(row.last_id))
+    
+    new_readings = get_readings_after_id(baseline['last_id'])
+    if new_readings.empty:
+        return baseline
+    
+    baseline = build_seasonal_baseline(new_readings, baseline)
+    
+    # Persist only the compact tables, never the raw history
+    save_seasonal_baseline([
+        (sensor_id, metric, baseline['last_id'], table.astype(np.float64).tobytes())
+        for (sensor_id, metric), table in baseline['tables'].items()
+    ])
+    
+    return baseline
+
+def anomalies_to_events(anomalies, metric, after_id=0):
+    """
+    Convert detected anomalies into rows for the anomaly event table.
+    
+    Args:
+        anomalies (pd.DataFrame): Anomalous readings as returned by detect_anomalies
+        metric (str): 'temperature' or 'humidity'
+        after_id (int): Only readings with an id greater than this are converted
+        
+    Returns:
+        list: (reading_id, sensor_id, timestamp, metric, value, score, method) tuples
+    """
+    if anomalies.empty:
+        return []
+    
+    method = anomalies.attrs.get('method', 'unknown')
+    anomalies = anomalies[anomalies['id'] > after_id]
+    
+    if 'sensor_id' in anomalies.columns:
+        sensor_ids = anomalies['sensor_id']
+    else:
+        sensor_ids = [DEFAULT_SENSOR_ID] * len(anomalies)
+    if 'zscore' in anomalies.columns:
+        scores = anomalies['zscore'].astype(float)
+    else:
+        scores = [None] * len(anomalies)
+    
+    return [
+        (int(reading_id), sensor_id, timestamp.to_pydatetime(), metric, float(value), score, method)
+        for reading_id, sensor_id, timestamp, value, score in zip(
+            anomalies['id'], sensor_ids, anomalies['timestamp'], anomalies[metric], scores
+        )
+    ]
+
+@timed()
+def record_new_anomalies(data, threshold=ANOMALY_SCORE_FLOOR, baseline=None, last_id=0):
+    """
+    Detect anomalies and append events for readings that were not evaluated yet.
+    
+    Earlier readings keep the verdict they were recorded with, so the event table
+    is an append-only log rather than a result recomputed on every refresh.
+    Events are recorded with their score down to the lowest selectable threshold,
+    so viewers choose their sensitivity when reading the events
+    (get_anomaly_events(min_score=...)) and one cursor serves every threshold.
+    
+    Args:
+        data (pd.DataFrame): Readings window including 'id' (e.g. from get_readings_by_timeframe)
+        threshold (float): Lowest score recorded
+        baseline (dict): Optional seasonal baseline from build_seasonal_baseline
+        last_id (int): Highest reading id already evaluated
+        
+    Returns:
+        int: Highest reading id evaluated after this call
+    """
+    if data.empty:
+        return last_id
+    
+    new_readings = data[data['id'] > last_id]
+    if new_readings.empty:
+        return last_id
+    
+    # Baseline scoring is per reading, so only new readings need to be scored
+    window = data
+    if baseline is not None and not any(
+            np.isnan(score_against_baseline(new_readings, baseline, metric)).any()
+            for metric in BASELINE_METRICS):
+        window = new_readings
+    
+    temp_anomalies, humid_anomalies = detect_anomalies(window, threshold, baseline=baseline)
+    store_anomaly_events(
+        anomalies_to_events(temp_anomalies, 'temperature', after_id=last_id) +
+        anomalies_to_events(humid_anomalies, 'humidity', after_id=last_id)
+    )
+    
+    return int(data['id'].max())
+
+class PageHinkleyDetector:
+    """
+    Streaming two-sided Page-Hinkley change-point detector.
+    
+    Each reading is processed in constant time and memory, so the detector can
+    sit on the ingestion path and catch slow drifts (e.g. a failing chiller)
+    that never produce an isolated outlier.
+    """
+    
+    def __init__(self, delta=0.1, threshold=8.0, min_samples=30):
+        """
+        Args:
+            delta (float): Magnitude of change tolerated per reading
+            threshold (float): Cumulative deviation that triggers a change event
+            min_samples (int): Readings needed after a reset before events are raised
+        """
+        self.delta = delta
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reset()
+    
+    def reset(self):
+        """Forget all readings and start a new segment."""
+        self.count = 0
+        self.total = 0.0
+        self.cum_up = 0.0
+        self.min_up = float('inf')
+        self.min_up_count = 0
+        self.min_up_time = None
+        self.cum_down = 0.0
+        self.max_down = float('-inf')
+        self.max_down_count = 0
+        self.max_down_time = None
+    
+    def update(self, timestamp, value):
+        """
+        Process one reading.
+        
+        Args:
+            timestamp: Time of the reading
+            value (float): Reading value
+            
+        Returns:
+            dict: Change event with 'direction', 'onset_time', 'detected_time', 'shift'
+                  and 'statistic', or None if no change was detected
+        """
+        self.count += 1
+        self.total += value
+        mean = self.total / self.count
+        
+        # Cumulative deviations from the running mean, for upward and downward shifts
+        self.cum_up += value - mean - self.delta
+        self.cum_down += value - mean + self.delta
+        
+        # The extremes mark the last reading before a shift started
+        if self.cum_up < self.min_up:
+            self.min_up = self.cum_up
+            self.min_up_count = self.count
+            self.min_up_time = timestamp
+        if self.cum_down > self.max_down:
+            self.max_down = self.cum_down
+            self.max_down_count = self.count
+            self.max_down_time = timestamp
+        
+        if self.count < self.min_samples:
+            return None
+        
+        stat_up = self.cum_up - self.min_up
+        stat_down = self.max_down - self.cum_down
+        if max(stat_up, stat_down) <= self.threshold:
+            return None
+        
+        if stat_up >= stat_down:
+            event = _change_event('increase', self.min_up_time, timestamp, stat_up,
+                                  stat_up / max(self.count - self.min_up_count, 1) + self.delta)
+        else:
+            event = _change_event('decrease', self.max_down_time, timestamp, stat_down,
+                                  -(stat_down / max(self.count - self.max_down_count, 1) + self.delta))
+        
+        # Start a new segment after the change
+        self.reset()
+        return event
+
+def _change_event(direction, onset_time, detected_time, statistic, shift):
+    """Build a change event record."""
+    return {
+        'direction': direction,
+        'onset_time': onset_time,
+        'detected_time': detected_time,
+        'shift': shift,
+        'statistic': statistic
+    }
+
+def detect_change_points(data, metric='temperature', delta=None, threshold=None,
+                         min_samples=30, chunk_size=8192):
+    """
+    Run the Page-Hinkley detector vectorized over historical readings.
+    
+    Produces the same events as feeding every reading to PageHinkleyDetector,
+    but processes the history in NumPy chunks for backfilling.
+    
+    Args:
+        data (pd.DataFrame): DataFrame containing 'timestamp' and the metric column
+        metric (str): 'temperature' or 'humidity'
+        delta (float): Drift tolerated per reading (defaults from CHANGE_POINT_DEFAULTS)
+        threshold (float): Event threshold (defaults from CHANGE_POINT_DEFAULTS)
+        min_samples (int): Readings needed after a reset before events are raised
+        chunk_size (int): Number of readings processed per vectorized step
+        
+    Returns:
+        pd.DataFrame: One row per change event with 'metric', 'direction',
+                      'onset_time', 'detected_time', 'shift' and 'statistic'
+    """
+    columns = ['metric', 'direction', 'onset_time', 'detected_time', 'shift', 'statistic']
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+    
+    default_delta, default_threshold = CHANGE_POINT_DEFAULTS[metric]
+    delta = default_delta if delta is None else delta
+    threshold = default_threshold if threshold is None else threshold
+    
+    values = data[metric].to_numpy(dtype=float)
+    timestamps = data['timestamp'].to_numpy()
+    
+    events = []
+    start = 0
+    
+    # Detector state carried between chunks (see PageHinkleyDetector.reset)
+    segment_start, total = 0, 0.0
+    cum_up, min_up, min_up_idx = 0.0, np.inf, -1
+    cum_down, max_down, max_down_idx = 0.0, -np.inf, -1
+    
+    while start < len(values):
+        x = values[start:start + chunk_size]
+        idx = start + np.arange(len(x))
+        k = idx - segment_start + 1
+        
+        # Running sums accumulated in the same order as the streaming detector
+        sums = np.cumsum(np.r_[total, x])[1:]
+        mean = sums / k
+        up = np.cumsum(np.r_[cum_up, x - mean - delta])[1:]
+        down = np.cumsum(np.r_[cum_down, x - mean + delta])[1:]
+        up_min = np.minimum(min_up, np.minimum.accumulate(up))
+        down_max = np.maximum(max_down, np.maximum.accumulate(down))
+        stat_up = up - up_min
+        stat_down = down_max - down
+        
+        alarm = (np.maximum(stat_up, stat_down) > threshold) & (k >= min_samples)
+        end = int(np.argmax(alarm)) if alarm.any() else len(x) - 1
+        
+        # Index of the extreme as of the last processed reading (first occurrence wins)
+        if up_min[end] < min_up:
+            min_up_idx = start + int(np.argmax(up[:end + 1] == up_min[end]))
+        if down_max[end] > max_down:
+            max_down_idx = start + int(np.argmax(down[:end + 1] == down_max[end]))
+        
+        if alarm.any():
+            detected_idx = idx[end]
+            if stat_up[end] >= stat_down[end]:
+                events.append(_change_event(
+                    'increase', timestamps[min_up_idx], timestamps[detected_idx], stat_up[end],
+                    stat_up[end] / max(detected_idx - min_up_idx, 1) + delta
+                ))
+            else:
+                events.append(_change_event(
+                    'decrease', timestamps[max_down_idx], timestamps[detected_idx], stat_down[end],
+                    -(stat_down[end] / max(detected_idx - max_down_idx, 1) + delta)
+                ))
+            
+            # Start a new segment after the change
+            segment_start, total = detected_idx + 1, 0.0
+            cum_up, min_up, min_up_idx = 0.0, np.inf, -1
+            cum_down, max_down, max_down_idx = 0.0, -np.inf, -1
+        else:
+            total = float(sums[end])
+            cum_up, min_up = float(up[end]), float(up_min[end])
+            cum_down, max_down = float(down[end]), float(down_max[end])
+        
+        start += end + 1
+    
+    result = pd.DataFrame(events, columns=columns[1:])
+    result.insert(0, 'metric', metric)
+    return result
+
+def detect_change_points_by_sensor(data, metrics=BASELINE_METRICS):
+    """
+    Run detect_change_points over the readings of each sensor and metric.
+    
+    Args:
+        data (pd.DataFrame): Readings with 'timestamp', 'sensor_id' and the metric columns
+        metrics (tuple): Metrics to scan
+        
+    Returns:
+        pd.DataFrame: Change events as in detect_change_points plus 'sensor_id',
+                      ordered by onset time
+    """
+    columns = ['sensor_id', 'metric', 'direction', 'onset_time', 'detected_time', 'shift', 'statistic']
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+    
+    frames = []
+    for sensor_id, readings in data.groupby('sensor_id', sort=False):
+        readings = readings.sort_values('timestamp', kind='stable')
+        for metric in metrics:
+            events = detect_change_points(readings, metric)
+            if not events.empty:
+                frames.append(events.assign(sensor_id=sensor_id))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns].sort_values('onset_time', ignore_index=True)
+
+def update_change_detectors(detectors, readings, metrics=BASELINE_METRICS):
+    """
+    Feed new readings to streaming change-point detectors, one per sensor and metric.
+    
+    Args:
+        detectors (dict): (sensor_id, metric) -> PageHinkleyDetector, created with
+                          CHANGE_POINT_DEFAULTS on first use and updated in place
+        readings (pd.DataFrame): Readings not fed before, with 'timestamp', 'sensor_id'
+                                 and the metric columns
+        metrics (tuple): Metrics to monitor
+        
+    Returns:
+        list: Change events (see PageHinkleyDetector.update) with 'sensor_id' and 'metric'
+    """
+    events = []
+    readings = readings.sort_values('timestamp', kind='stable')
+    for sensor_id, sensor_readings in readings.groupby('sensor_id', sort=False):
+        for metric in metrics:
+            detector = detectors.get((sensor_id, metric))
+            if detector is None:
+                delta, threshold = CHANGE_POINT_DEFAULTS[metric]
+                detector = detectors[(sensor_id, metric)] = PageHinkleyDetector(delta, threshold)
+            for timestamp, value in zip(sensor_readings['timestamp'], sensor_readings[metric]):
+                event = detector.update(timestamp, float(value))
+                if event is not None:
+                    events.append({'sensor_id': sensor_id, 'metric': metric, **event})
+    return events
+
 def analyze_patterns(data, window_size=24):
     """
     Analyze temperature and humidity patterns over time.
@@ -0,0 +1,331 @@
+"""
+Read-only HTTP/JSON API over the readings database.
+
+Endpoints (all GET, times in ISO 8601):
+    /readings?start=&end=&sensor_id=&cursor=&limit=      range query, cursor paginated
+    /readings/latest?count=                              latest readings
+    /rollups?bucket=hour&start=&end=&sensor_id=          per-bucket count/mean/min/max
+    /anomalies?start=&end=&metric=&sensor_id=&min_score=&cursor=&limit=
+    /quantiles?metric=&q=0.5,0.95,0.99&start=&end=&sensor_id=   percentiles from sketches
+    /metrics                                             Prometheus text format (see metrics.py)
+
+Times with a UTC offset (e.g. 2026-01-01T00:00:00Z or +07:00) are converted
+to the server's local time, which is how readings are stored.
+
+Responses carry an ETag derived from the latest reading and event ids, so
+clients polling with If-None-Match get 304 Not Modified until new data arrives.
+Bodies are gzip-compressed when the client sends Accept-Encoding: gzip.
+/quantiles reads the stored hourly sketches, which a background thread brings
+up to date every --sketch-interval seconds (hours after the latest sketched
+one are read from the raw readings; backfilled older hours show up after the
+next refresh).
+
+Usage:
+    python api.py --host 0.0.0.0 --port 8502
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import database
+import metrics
+import sketches
+from instrumentation import stage
+
+DEFAULT_PORT = 8502
+
+# Page size used when the client does not pass a limit, and the largest allowed
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+# Anomaly score threshold applied when the client does not pass min_score
+# (the dashboard's default sensitivity)
+DEFAULT_MIN_SCORE = 3.0
+
+# Seconds between two refreshes of the quantile sketches
+SKETCH_REFRESH_SECONDS = 300
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+# Fields holding timestamps, rendered as ISO 8601 with a 'T' separator
+TIME_FIELDS = ('timestamp', 'detected_at', 'bucket')
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[0] if values else default
+
+# UTC offset whose '+' was decoded as a space by an unencoded query string
+_DECODED_OFFSET = re.compile(r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?) (\d{2}:?\d{2})$')
+
+def _parse_time(params, name):
+    value = _param(params, name)
+    if value is None:
+        return None
+    text = _DECODED_OFFSET.sub(r'\1+\2', value)
+    if text.endswith(('Z', 'z')):
+        # fromisoformat only accepts 'Z' from Python 3.11 on
+        text = text[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 time, got '{value}'")
+    # Stored timestamps are naive local time
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def _parse_int(params, name, default, minimum, maximum):
+    value = _param(params, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer, got '{value}'")
+    if not minimum <= number <= maximum:
+        raise ValueError(f"'{name}' must be between {minimum} and {maximum}")
+    return number
+
+def _parse_float(params, name, default):
+    value = _param(params, name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number, got '{value}'")
+
+def _format_records(records):
+    """Render timestamp fields as ISO 8601 strings."""
+    for record in records:
+        for field in TIME_FIELDS:
+            value = record.get(field)
+            if isinstance(value, str):
+                record[field] = value.replace(' ', 'T', 1)
+            elif hasattr(value, 'isoformat'):
+                record[field] = value.isoformat()
+    return records
+
+def _page(records, limit):
+    """Wrap a page of records with the cursor of the next page."""
+    next_cursor = records[-1]['id'] if len(records) == limit else None
+    return {'items': _format_records(records), 'next_cursor': next_cursor}
+
+def handle_readings(params):
+    limit = _parse_int(params, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    records = database.get_readings_page(
+        start=_parse_time(params, 'start'),
+        end=_parse_time(params, 'end'),
+        sensor_id=_param(params, 'sensor_id'),
+        after_id=_parse_int(params, 'cursor', 0, 0, sys.maxsize),
+        limit=limit
+    )
+    return _page(records, limit)
+
+def handle_latest(params):
+    count = _parse_int(params, 'count', 1, 1, MAX_PAGE_SIZE)
+    latest = database.get_latest_readings(count)
+    return {'items': _format_records(latest.to_dict('records'))}
+
+def handle_rollups(params):
+    bucket = _param(params, 'bucket', 'hour')
+    if bucket not in database.ROLLUP_BUCKETS:
+        raise ValueError(f"'bucket' must be one of {', '.join(database.ROLLUP_BUCKETS)}")
+    records = database.get_rollups(
+        bucket=bucket,
+        start=_parse_time(params, 'start'),
+        end=_parse_time(params, 'end'),
+        sensor_id=_param(params, 'sensor_id')
+    )
+    return {'items': _format_records(records)}
+
+def handle_anomalies(params):
+    metric = _param(params, 'metric')
+    if metric not in (None, 'temperature', 'humidity'):
+        raise ValueError("'metric' must be 'temperature' or 'humidity'")
+    limit = _parse_int(params, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    records = database.get_anomaly_events_page(
+        start=_parse_time(params, 'start'),
+        end=_parse_time(params, 'end'),
+        metric=metric,
+        sensor_id=_param(params, 'sensor_id'),
+        after_id=_parse_int(params, 'cursor', 0, 0, sys.maxsize),
+        limit=limit,
+        min_score=_parse_float(params, 'min_score', DEFAULT_MIN_SCORE)
+    )
+    return _page(records, limit)
+
+def handle_quantiles(params):
+    metric = _param(params, 'metric', 'temperature')
+    if metric not in sketches.SKETCH_METRICS:
+        raise ValueError("'metric' must be 'temperature' or 'humidity'")
+    try:
+        quantiles = [float(q) for q in _param(params, 'q', '0.5,0.95,0.99').split(',')]
+    except ValueError:
+        raise ValueError("'q' must be a comma-separated list of numbers")
+    if not all(0 <= q <= 1 for q in quantiles):
+        raise ValueError("'q' values must be between 0 and 1")
+
+    result = sketches.range_quantiles(
+        metric,
+        quantiles,
+        start=_parse_time(params, 'start'),
+        end=_parse_time(params, 'end'),
+        sensor_id=_param(params, 'sensor_id')
+    )
+    return {
+        'metric': metric,
+        'count': result['count'],
+        'min': result['min'],
+        'max': result['max'],
+        'quantiles': {f'{q:g}': result[q] for q in quantiles}
+    }
+
+ROUTES = {
+    '/readings': handle_readings,
+    '/readings/latest': handle_latest,
+    '/rollups': handle_rollups,
+    '/anomalies': handle_anomalies,
+    '/quantiles': handle_quantiles
+}
+
+def current_etag():
+    """ETag of the data set: changes whenever a reading or an event is added."""
+    return f'"{database.get_latest_reading_id()}-{database.get_latest_event_id()}"'
+
+class ApiHandler(BaseHTTPRequestHandler):
+    # Keep-alive lets polling clients reuse their connection
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+    server_version = "WarehouseMonitorAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') == '/metrics':
+            body = metrics.render_metrics().encode('utf-8')
+            self._send(200, body, content_type=metrics.CONTENT_TYPE)
+            return
+
+        handler = ROUTES.get(url.path.rstrip('/') or '/')
+        if handler is None:
+            self._send_json(404, {'error': f"Unknown endpoint: {url.path}"})
+            return
+
+        # Answer conditional requests before running the query
+        etag = current_etag()
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self._send(304, b'', etag=etag)
+            return
+
+        try:
+            with stage(f'api_{handler.__name__}'):
+                payload = handler(parse_qs(url.query))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        self._send_json(200, payload, etag=etag)
+
+    def _send_json(self, status, payload, etag=None):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self._send(status, body, etag=etag, content_type='application/json')
+
+    def _send(self, status, body, etag=None, content_type=None):
+        compress = (len(body) >= GZIP_MIN_BYTES and
+                    'gzip' in self.headers.get('Accept-Encoding', ''))
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        if etag:
+            self.send_header('ETag', etag)
+            # Clients may cache but must revalidate with If-None-Match
+            self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if getattr(self.server, 'verbose', False):
+            super().log_message(format, *args)
+
+def create_server(host='127.0.0.1', port=DEFAULT_PORT, verbose=False):
+    """
+    Create the API server (call serve_forever() to run it).
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port to listen on (0 picks a free port)
+        verbose (bool): Log every request to stderr
+
+    Returns:
+        ThreadingHTTPServer: The server, one thread per connection
+    """
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+def refresh_sketches_every(interval, stop):
+    """
+    Refresh the quantile sketches until stop is set (run in a thread).
+
+    Args:
+        interval (float): Seconds between two refreshes
+        stop (threading.Event): Set to end the loop
+    """
+    while True:
+        try:
+            sketches.refresh_sketches()
+        except Exception as e:
+            print(f"Could not refresh quantile sketches: {e}", file=sys.stderr)
+        if stop.wait(interval):
+            return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve readings and anomalies as JSON over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument('--db', default=database.DB_FILE, help="SQLite database file")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    parser.add_argument('--sketch-interval', type=float, default=SKETCH_REFRESH_SECONDS,
+                        help="Seconds between two refreshes of the quantile sketches")
+    args = parser.parse_args(argv)
+
+    database.DB_FILE = args.db
+    database.init_db()
+
+    server = create_server(args.host, args.port, args.verbose)
+    stop_refresh = threading.Event()
+    threading.Thread(target=refresh_sketches_every, args=(args.sketch_interval, stop_refresh),
+                     name="sketch-refresh", daemon=True).start()
+    print(f"Serving {args.db} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_refresh.set()
+        server.server_close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,15 @@
 import streamlit as st
 import pandas as pd
-import time
 from datetime import datetime, timedelta
-import sqlite3
 import os
+import tempfile
 
-from database import init_db, store_readings, get_readings_by_timeframe, get_latest_readings
-from mock_data import generate_mock_data
-from sensor import read_serial_data
-from anomaly_detection import detect_anomalies
+from database import ANOMALY_SCORE_FLOOR, DEFAULT_SENSOR_ID
+from cache import acquisition_hub, alert_engine, database_ready, load_history, metrics_exporter
+from alerts import threshold_rules
 from visualization import (
+    DEFAULT_WEBGL_THRESHOLD,
+    RenderStats,
     plot_real_time_temperature, 
     plot_real_time_humidity, 
     plot_historical_temperature,
@@ -17,7 +17,9 @@ from visualization import (
     plot_temperature_statistics,
     plot_humidity_statistics
 )
-from utils import export_to_csv
+from utils import export_csv_file, export_columnar_file
+from downsampling import DEFAULT_POINT_BUDGET, DOWNSAMPLING_METHODS
+from instrumentation import TIMINGS, stage, tick
 
 # App configuration
 st.set_page_config(
@@ -27,23 +29,29 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize database
-init_db()
+# Initialize database (once per process, shared by all sessions)
+database_ready()
 
-# Create placeholders at the global scope for toggle_monitoring_state to use
-status_container = None 
-temp_chart_placeholder = None
-humidity_chart_placeholder = None
-hist_temp_chart_placeholder = None
-hist_humidity_chart_placeholder = None
-temp_stats_placeholder = None
-humidity_stats_placeholder = None
+# Serve ingestion, query and detection metrics locally (once per process)
+_, metrics_error = metrics_exporter()
+if metrics_error:
+    st.warning(metrics_error)
+
+# Refresh intervals (seconds) of the independently scheduled dashboard panels
+REALTIME_REFRESH_SECONDS = 3
+HISTORICAL_REFRESH_SECONDS = 60
 
 # Define function to toggle monitoring state (defined before session state initialization)
 def toggle_monitoring_state():
     # Toggle state
     st.session_state.monitoring_active = not st.session_state.monitoring_active
     
+    # Leave the shared acquisition hub; it stops sampling once nobody is subscribed
+    if not st.session_state.monitoring_active and st.session_state.get('hub_subscription') is not None:
+        acquisition_hub().unsubscribe(st.session_state.hub_subscription)
+        st.session_state.hub_subscription = None
+        st.session_state.hub_settings = None
+    
     # Force refresh to update UI
     st.rerun()
 
@@ -124,7 +132,7 @@ with col2:
 st.sidebar.subheader("Phát Hiện Bất Thường")
 st.session_state.anomaly_threshold = st.sidebar.slider(
     "Độ Nhạy Phát Hiện", 
-    min_value=1.0, 
+    min_value=ANOMALY_SCORE_FLOOR, 
     max_value=5.0, 
     value=st.session_state.anomaly_threshold,
     step=0.1,
@@ -139,6 +147,45 @@ timeframe = st.sidebar.selectbox(
     index=3
 )
 
+# Chart rendering settings
+st.sidebar.subheader("Hiển Thị Biểu Đồ")
+point_budget = st.sidebar.number_input(
+    "Số Điểm Tối Đa Mỗi Biểu Đồ",
+    min_value=100,
+    max_value=1000000,
+    value=DEFAULT_POINT_BUDGET,
+    step=100,
+    help="Chuỗi dài hơn được giảm mẫu trước khi gửi tới trình duyệt"
+)
+downsampling_method = st.sidebar.selectbox(
+    "Phương Pháp Giảm Mẫu (Lịch Sử)",
+    DOWNSAMPLING_METHODS,
+    format_func={'lttb': "LTTB (giữ hình dạng)", 'minmax': "Đường bao Min/Max (giữ mọi cực trị)"}.get,
+    help="Điểm bất thường luôn được giữ lại khi giảm mẫu"
+)
+webgl_threshold = st.sidebar.number_input(
+    "Ngưỡng Chuyển Sang WebGL",
+    min_value=100,
+    max_value=1000000,
+    value=DEFAULT_WEBGL_THRESHOLD,
+    step=500,
+    help="Chuỗi có nhiều điểm hơn ngưỡng này được vẽ bằng WebGL thay vì SVG"
+)
+
+# Chart rendering diagnostics
+show_render_stats = st.sidebar.checkbox(
+    "Thống Kê Hiển Thị Biểu Đồ",
+    value=False,
+    help="Đo thời gian vẽ và kích thước dữ liệu gửi tới trình duyệt của mỗi biểu đồ"
+)
+
+# Per-stage timings of acquisition and dashboard refreshes
+show_timings = st.sidebar.checkbox(
+    "Bảng Gỡ Lỗi Hiệu Năng",
+    value=False,
+    help="Thời gian của từng giai đoạn thu thập và làm mới bảng điều khiển, cùng nhật ký các lượt chậm"
+)
+
 # Start/Stop monitoring
 monitoring_button = st.sidebar.button(
     "Dừng Giám Sát" if st.session_state.monitoring_active else "Bắt Đầu Giám Sát", 
@@ -146,6 +193,18 @@ monitoring_button = st.sidebar.button(
 )
 
 # Export data
+EXPORT_FORMATS = {
+    "CSV": ('csv', "text/csv"),
+    "CSV (gzip)": ('csv.gz', "application/gzip"),
+    "Parquet": ('parquet', "application/vnd.apache.parquet"),
+    "Arrow IPC": ('arrow', "application/vnd.apache.arrow.file")
+}
+export_format = st.sidebar.selectbox(
+    "Định Dạng Xuất",
+    list(EXPORT_FORMATS),
+    index=0,
+    help="Parquet và Arrow lưu dữ liệu dạng cột có kiểu, nhỏ hơn và đọc nhanh hơn CSV"
+)
 if st.sidebar.button("Xuất Dữ Liệu"):
     timeframe_dict = {
         "1 Giờ Qua": 1,
@@ -157,52 +216,33 @@ if st.sidebar.button("Xuất Dữ Liệu"):
         "Tất Cả Dữ Liệu": 0
     }
     hours = timeframe_dict[timeframe]
-    data = get_readings_by_timeframe(hours)
-    if not data.empty:
-        csv = export_to_csv(data)
-        st.sidebar.download_button(
-            label="Tải File CSV",
-            data=csv,
-            file_name=f"du_lieu_nhiet_do_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv"
-        )
-    else:
-        st.sidebar.warning("Không có dữ liệu để xuất")
+    extension, mime = EXPORT_FORMATS[export_format]
+    file_name = f"du_lieu_nhiet_do_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    
+    # Stream the timeframe to a temporary file in chunks instead of building it in memory
+    with tempfile.TemporaryDirectory() as export_dir:
+        export_path = os.path.join(export_dir, file_name)
+        if extension.startswith('csv'):
+            export_stats = export_csv_file(export_path, hours, compress=extension == 'csv.gz')
+        else:
+            export_stats = export_columnar_file(export_path, hours, extension)
+        if export_stats['rows']:
+            with open(export_path, 'rb') as export_file:
+                st.sidebar.download_button(
+                    label=f"Tải File {export_format}",
+                    data=export_file,
+                    file_name=file_name,
+                    mime=mime
+                )
+            st.sidebar.caption(
+                f"{export_stats['rows']:,} dòng · {export_stats['rows_per_second']:,.0f} dòng/giây"
+            )
+        else:
+            st.sidebar.warning("Không có dữ liệu để xuất")
 
 # Main content
 st.title("Hệ Thống Giám Sát Nhiệt Độ Kho Hàng")
 
-# Real-time monitoring section
-st.header("Giám Sát Thời Gian Thực")
-
-# Display the current status
-status_container = st.container()
-
-# Create placeholders for real-time charts
-col1, col2 = st.columns(2)
-with col1:
-    temp_chart_placeholder = st.empty()
-with col2:
-    humidity_chart_placeholder = st.empty()
-
-# Historical data section
-st.header("Phân Tích Dữ Liệu Lịch Sử")
-
-# Create placeholders for historical charts
-col1, col2 = st.columns(2)
-with col1:
-    hist_temp_chart_placeholder = st.empty()
-with col2:
-    hist_humidity_chart_placeholder = st.empty()
-
-# Statistics section
-st.header("Thống Kê & Phát Hiện Bất Thường")
-col1, col2 = st.columns(2)
-with col1:
-    temp_stats_placeholder = st.empty()
-with col2:
-    humidity_stats_placeholder = st.empty()
-
 # Get timeframe in hours
 def get_hours_from_timeframe(timeframe):
     if timeframe == "1 Giờ Qua":
@@ -220,68 +260,122 @@ def get_hours_from_timeframe(timeframe):
     else:  # Tất Cả Dữ Liệu
         return 0
 
-# Function to update data - separated this to avoid full page refreshes
+# Fetch the readings the shared acquisition hub published since the last tick
 def update_monitoring_data():
     if not st.session_state.monitoring_active:
         return
     
-    try:
-        # Get current time
-        current_time = datetime.now()
-        
-        # Read data from source
-        if st.session_state.use_real_sensors:
-            try:
-                # Get the port and baud rate from session state
-                serial_port = st.session_state.get('serial_port', '/dev/ttyUSB0')
-                baud_rate = st.session_state.get('baud_rate', 9600)
-                temperature, humidity = read_serial_data(serial_port, baud_rate)
-            except Exception as e:
-                st.session_state.error_message = f"Lỗi đọc từ cổng serial: {e}"
-                # Force stop monitoring when error occurs
-                st.session_state.monitoring_active = False
-                # Force a rerun to update the button text
-                st.rerun()
-                return
-        else:
-            temperature, humidity = generate_mock_data()
-        
-        # Store data if valid
-        if temperature is not None and humidity is not None:
-            store_readings(current_time, temperature, humidity)
-            
-            # Store current values in session state
-            st.session_state.current_temperature = temperature
-            st.session_state.current_humidity = humidity
-            
-            # Get latest readings for real-time display
-            st.session_state.latest_data = get_latest_readings(30)  # Last 30 readings
-            
-            # Get historical data based on selected timeframe
-            hours = get_hours_from_timeframe(timeframe)
-            st.session_state.historical_data = get_readings_by_timeframe(hours)
-            
-            # Check for anomalies
-            st.session_state.temp_anomalies, st.session_state.humid_anomalies = detect_anomalies(
-                st.session_state.historical_data, 
-                st.session_state.anomaly_threshold
-            )
-            
-            # Clear any previous error
-            if 'error_message' in st.session_state:
-                del st.session_state.error_message
-        else:
-            st.session_state.error_message = "Không nhận được dữ liệu hợp lệ"
-            # Force stop monitoring when no valid data
-            st.session_state.monitoring_active = False
-            # Force a rerun to update the button text
-            st.rerun()
-            
-    except Exception as e:
-        st.session_state.error_message = f"Đã xảy ra lỗi: {e}"
+    hub = acquisition_hub()
+    
+    # Apply the sidebar's data source when monitoring starts and whenever it changes
+    # while monitoring runs; the hub is shared, so the latest change wins for all viewers
+    settings = (
+        st.session_state.use_real_sensors,
+        st.session_state.get('serial_port', '/dev/ttyUSB0'),
+        st.session_state.get('baud_rate', 9600)
+    )
+    if st.session_state.get('hub_settings') != settings:
+        hub.configure(*settings)
+        st.session_state.hub_settings = settings
+    
+    # Subscribe once per monitoring session; the hub samples the sensor a single
+    # time for all viewers, so opening more dashboards adds no sensor or DB load
+    if st.session_state.get('hub_subscription') is None:
+        st.session_state.hub_subscription = hub.subscribe()
+    
+    # Wait briefly for the first sample when there is nothing to show yet
+    with stage('hub_poll'):
+        readings, error = hub.poll(
+            st.session_state.hub_subscription,
+            timeout=1.0 if st.session_state.latest_data.empty else 0
+        )
+    
+    if error is not None:
+        st.session_state.error_message = error
+        # Force stop monitoring when acquisition failed
         st.session_state.monitoring_active = False
-        # Force a rerun to update the button text
+        st.session_state.hub_subscription = None
+        st.session_state.hub_settings = None
+        # Rerun the whole app to update the button text and stop the fragments
         st.rerun()
+        return
+    
+    if readings or st.session_state.latest_data.empty:
+        # Get latest readings for real-time display from the hub's buffer
+        with stage('hub_snapshot'):
+            st.session_state.latest_data = hub.snapshot(30)  # Last 30 readings
+        
+        # Evaluate alert rules; readings another session already fed to the engine are skipped
+        with stage('alert_evaluation'):
+            alert_engine(alert_rules).evaluate(st.session_state.latest_data)
+    
+    if not st.session_state.latest_data.empty:
+        # Store current values in session state
+        st.session_state.current_temperature = st.session_state.latest_data['temperature'].iloc[-1]
+        st.session_state.current_humidity = st.session_state.latest_data['humidity'].iloc[-1]
+        
+        # Clear any previous error
+        if 'error_message' in st.session_state:
+            del st.session_state.error_message
+
+# Reload the historical window and anomalies - runs only when the inputs change
+# or the historical fragment's interval has elapsed
+def update_historical_data(hours):
+    # Readings, baseline refresh and anomaly detection are shared through the
+    # process-wide caches, so concurrent viewers of a timeframe cost one query
+    with stage('load_history'):
+        (st.session_state.historical_data,
+         st.session_state.temp_anomalies,
+         st.session_state.humid_anomalies,
+         st.session_state.change_points,
+         st.session_state.historical_stats) = load_history(hours, st.session_state.anomaly_threshold)
+    
+    st.session_state.historical_inputs = (hours, st.session_state.anomaly_threshold)
+    st.session_state.historical_loaded_at = datetime.now()
+
+def historical_data_stale(hours):
+    """
+    Check whether the historical panels need to reload their data.
+
+    Args:
+        hours (int): Selected timeframe in hours
+
+    Returns:
+        bool: True if the timeframe or threshold changed or the data is older
+            than the historical refresh interval
+    """
+    loaded_at = st.session_state.get('historical_loaded_at')
+    if loaded_at is None:
+        return True
+    if st.session_state.get('historical_inputs') != (hours, st.session_state.anomaly_threshold):
+        return True
+    return datetime.now() - loaded_at >= timedelta(seconds=HISTORICAL_REFRESH_SECONDS)
+
+# Stage timings and the slow tick log, shared by every session of the process
+def timings_panel():
+    with st.expander("Bảng Gỡ Lỗi Hiệu Năng", expanded=True):
+        summary = pd.DataFrame(TIMINGS.summary())
+        if summary.empty:
+            st.info("Chưa có số liệu thời gian")
+            return
+        st.dataframe(summary.drop(columns='total_s').set_index('stage').round(2))
+        
+        slow_ticks = TIMINGS.slow_ticks()
+        st.caption(f"Lượt chậm (≥ {TIMINGS.slow_tick_seconds * 1000:.0f} ms), mới nhất trước")
+        if slow_ticks:
+            st.dataframe(pd.DataFrame([
+                {
+                    'time': slow['time'],
+                    'tick': slow['tick'],
+                    'total_ms': round(slow['total_ms'], 1),
+                    'stages': ", ".join(f"{name} {ms:.0f} ms" for name, ms in
+                                        sorted(slow['stages'].items(), key=lambda item: item[1], reverse=True))
+                }
+                for slow in slow_ticks
+            ]), hide_index=True)
+        
+        if st.button("Đặt Lại Số Liệu"):
+            TIMINGS.reset()
 
 # Initialize session state variables for monitoring
 if 'current_temperature' not in st.session_state:
@@ -296,92 +390,165 @@ if 'temp_anomalies' not in st.session_state:
     st.session_state.temp_anomalies = pd.DataFrame()
 if 'humid_anomalies' not in st.session_state:
     st.session_state.humid_anomalies = pd.DataFrame()
+if 'change_points' not in st.session_state:
+    st.session_state.change_points = pd.DataFrame()
+if 'historical_stats' not in st.session_state:
+    st.session_state.historical_stats = {'temperature': None, 'humidity': None}
 if 'error_message' not in st.session_state:
     st.session_state.error_message = None
+if 'render_stats' not in st.session_state:
+    st.session_state.render_stats = RenderStats()
+st.session_state.render_stats.measure = show_render_stats
+
+# Alert rules built from the sidebar thresholds
+alert_rules = threshold_rules(
+    st.session_state.alert_threshold_temp_min,
+    st.session_state.alert_threshold_temp_max,
+    st.session_state.alert_threshold_humid_min,
+    st.session_state.alert_threshold_humid_max
+)
 
-# Remove this duplicate function since it's already defined at the top
-
-# Main app logic for monitoring
-if st.session_state.monitoring_active:
-    # Update data first
+# Fragments only schedule themselves while monitoring; the start/stop button
+# triggers a full rerun which re-registers them with the new interval
+realtime_interval = REALTIME_REFRESH_SECONDS if st.session_state.monitoring_active else None
+historical_interval = HISTORICAL_REFRESH_SECONDS if st.session_state.monitoring_active else None
+
+# Real-time status and charts - reruns on its own every few seconds without
+# re-executing the sidebar or the historical panels
+@st.fragment(run_every=realtime_interval)
+@tick('realtime_refresh')
+def realtime_panel():
+    st.header("Giám Sát Thời Gian Thực")
+    
+    if not st.session_state.monitoring_active:
+        if st.session_state.get('error_message'):
+            st.error(st.session_state.error_message)
+        st.info("Hệ thống giám sát hiện đang không hoạt động. Nhấn 'Bắt Đầu Giám Sát' để bắt đầu.")
+        return
+    
     update_monitoring_data()
     
-    # Now display the data if we have it
+    # Data source the shared hub is reading (another viewer may have changed it)
+    use_real_sensors, serial_port, baud_rate = acquisition_hub().settings
+    if use_real_sensors:
+        st.caption(f"Nguồn dữ liệu đang dùng: Cổng Serial {serial_port} ({baud_rate} baud)")
+    else:
+        st.caption("Nguồn dữ liệu đang dùng: Dữ Liệu Mẫu")
+    
     if st.session_state.current_temperature is not None and st.session_state.current_humidity is not None:
-        # Update status
-        with status_container:
-            status_cols = st.columns(4)
-            
-            # Current temperature
-            with status_cols[0]:
-                st.metric(
-                    "Nhiệt Độ Hiện Tại", 
-                    f"{st.session_state.current_temperature:.1f} °C",
-                    delta=f"{st.session_state.current_temperature - st.session_state.latest_data['temperature'].iloc[-2] if len(st.session_state.latest_data) > 1 else 0:.1f} °C"
-                )
-                
-            # Current humidity
-            with status_cols[1]:
-                st.metric(
-                    "Độ Ẩm Hiện Tại", 
-                    f"{st.session_state.current_humidity:.1f} %",
-                    delta=f"{st.session_state.current_humidity - st.session_state.latest_data['humidity'].iloc[-2] if len(st.session_state.latest_data) > 1 else 0:.1f} %"
-                )
-            
-            # Anomaly status
-            with status_cols[2]:
-                if not st.session_state.temp_anomalies.empty:
-                    st.error("⚠️ Phát hiện nhiệt độ bất thường!")
-                else:
-                    st.success("✅ Nhiệt độ bình thường")
-            
-            with status_cols[3]:
-                if not st.session_state.humid_anomalies.empty:
-                    st.error("⚠️ Phát hiện độ ẩm bất thường!")
-                else:
-                    st.success("✅ Độ ẩm bình thường")
-            
-            # Alert based on thresholds
-            if (st.session_state.current_temperature < st.session_state.alert_threshold_temp_min or 
-                st.session_state.current_temperature > st.session_state.alert_threshold_temp_max):
-                st.warning(f"⚠️ Nhiệt độ ngoài phạm vi cho phép: {st.session_state.alert_threshold_temp_min} - {st.session_state.alert_threshold_temp_max} °C")
-            
-            if (st.session_state.current_humidity < st.session_state.alert_threshold_humid_min or 
-                st.session_state.current_humidity > st.session_state.alert_threshold_humid_max):
-                st.warning(f"⚠️ Độ ẩm ngoài phạm vi cho phép: {st.session_state.alert_threshold_humid_min} - {st.session_state.alert_threshold_humid_max} %")
+        status_cols = st.columns(4)
         
-        # Update real-time charts
-        with temp_chart_placeholder:
-            plot_real_time_temperature(st.session_state.latest_data, 
-                                     st.session_state.alert_threshold_temp_min,
-                                     st.session_state.alert_threshold_temp_max)
-            
-        with humidity_chart_placeholder:
-            plot_real_time_humidity(st.session_state.latest_data,
-                                  st.session_state.alert_threshold_humid_min,
-                                  st.session_state.alert_threshold_humid_max)
-            
-        # Update historical charts
-        with hist_temp_chart_placeholder:
-            plot_historical_temperature(st.session_state.historical_data)
-            
-        with hist_humidity_chart_placeholder:
-            plot_historical_humidity(st.session_state.historical_data)
-            
-        # Update statistics
-        with temp_stats_placeholder:
-            plot_temperature_statistics(st.session_state.historical_data, st.session_state.temp_anomalies)
+        # Current temperature
+        with status_cols[0]:
+            st.metric(
+                "Nhiệt Độ Hiện Tại", 
+                f"{st.session_state.current_temperature:.1f} °C",
+                delta=f"{st.session_state.current_temperature - st.session_state.latest_data['temperature'].iloc[-2] if len(st.session_state.latest_data) > 1 else 0:.1f} °C"
+            )
             
-        with humidity_stats_placeholder:
-            plot_humidity_statistics(st.session_state.historical_data, st.session_state.humid_anomalies)
+        # Current humidity
+        with status_cols[1]:
+            st.metric(
+                "Độ Ẩm Hiện Tại", 
+                f"{st.session_state.current_humidity:.1f} %",
+                delta=f"{st.session_state.current_humidity - st.session_state.latest_data['humidity'].iloc[-2] if len(st.session_state.latest_data) > 1 else 0:.1f} %"
+            )
+        
+        # Anomaly status
+        with status_cols[2]:
+            if not st.session_state.temp_anomalies.empty:
+                st.error("⚠️ Phát hiện nhiệt độ bất thường!")
+            else:
+                st.success("✅ Nhiệt độ bình thường")
+        
+        with status_cols[3]:
+            if not st.session_state.humid_anomalies.empty:
+                st.error("⚠️ Phát hiện độ ẩm bất thường!")
+            else:
+                st.success("✅ Độ ẩm bình thường")
+        
+        # Alerts currently raised by the rule engine (held with hysteresis until they clear)
+        for alert in alert_engine(alert_rules).active_alerts():
+            prefix = f"[{alert['sensor_id']}] " if alert['sensor_id'] != DEFAULT_SENSOR_ID else ""
+            st.warning(prefix + alert['message'])
+        
+        # Real-time charts
+        with stage('render_realtime'):
+            col1, col2 = st.columns(2)
+            with col1:
+                plot_real_time_temperature(st.session_state.latest_data, 
+                                         st.session_state.alert_threshold_temp_min,
+                                         st.session_state.alert_threshold_temp_max,
+                                         point_budget=point_budget,
+                                         render_stats=st.session_state.render_stats,
+                                         webgl_threshold=webgl_threshold)
+            with col2:
+                plot_real_time_humidity(st.session_state.latest_data,
+                                      st.session_state.alert_threshold_humid_min,
+                                      st.session_state.alert_threshold_humid_max,
+                                      point_budget=point_budget,
+                                      render_stats=st.session_state.render_stats,
+                                      webgl_threshold=webgl_threshold)
+        
+        # Show per-chart render time and payload size (fragments cannot write to the sidebar)
+        if show_render_stats:
+            with st.expander("Thống Kê Hiển Thị Biểu Đồ", expanded=True):
+                st.dataframe(st.session_state.render_stats.stats_frame())
+        
+        if show_timings:
+            timings_panel()
     
     # Show any errors
-    if 'error_message' in st.session_state and st.session_state.error_message:
-        status_container.error(st.session_state.error_message)
+    if st.session_state.get('error_message'):
+        st.error(st.session_state.error_message)
+
+# Historical and statistics panels - reload only when the timeframe or
+# threshold changes, or once per historical refresh interval
+@st.fragment(run_every=historical_interval)
+@tick('historical_refresh')
+def historical_panel():
+    if not st.session_state.monitoring_active:
+        return
     
-    # Schedule the next update without rerunning the entire app
-    time.sleep(3)
-    st.rerun()
-
-if not st.session_state.monitoring_active:
-    status_container.info("Hệ thống giám sát hiện đang không hoạt động. Nhấn 'Bắt Đầu Giám Sát' để bắt đầu.")
+    hours = get_hours_from_timeframe(timeframe)
+    if historical_data_stale(hours):
+        update_historical_data(hours)
+    
+    with stage('render_historical'):
+        # Historical data section
+        st.header("Phân Tích Dữ Liệu Lịch Sử")
+        col1, col2 = st.columns(2)
+        with col1:
+            plot_historical_temperature(st.session_state.historical_data, point_budget=point_budget,
+                                        render_stats=st.session_state.render_stats, webgl_threshold=webgl_threshold,
+                                        summary=st.session_state.historical_stats['temperature'],
+                                        change_points=st.session_state.change_points,
+                                        anomalies=st.session_state.temp_anomalies,
+                                        method=downsampling_method)
+        with col2:
+            plot_historical_humidity(st.session_state.historical_data, point_budget=point_budget,
+                                     render_stats=st.session_state.render_stats, webgl_threshold=webgl_threshold,
+                                     summary=st.session_state.historical_stats['humidity'],
+                                     change_points=st.session_state.change_points,
+                                     anomalies=st.session_state.humid_anomalies,
+                                     method=downsampling_method)
+        
+        # Level shifts (slow drifts that never produce an isolated outlier)
+        if not st.session_state.change_points.empty:
+            with st.expander(f"Điểm Thay Đổi Xu Hướng ({len(st.session_state.change_points)})"):
+                st.dataframe(st.session_state.change_points, hide_index=True)
+        
+        # Statistics section
+        st.header("Thống Kê & Phát Hiện Bất Thường")
+        col1, col2 = st.columns(2)
+        with col1:
+            plot_temperature_statistics(st.session_state.historical_data, st.session_state.temp_anomalies,
+                                        render_stats=st.session_state.render_stats, webgl_threshold=webgl_threshold,
+                                        summary=st.session_state.historical_stats['temperature'])
+        with col2:
+            plot_humidity_statistics(st.session_state.historical_data, st.session_state.humid_anomalies,
+                                     render_stats=st.session_state.render_stats, webgl_threshold=webgl_threshold,
+                                     summary=st.session_state.historical_stats['humidity'])
+
+realtime_panel()
+historical_panel()
@@ -0,0 +1,593 @@
+"""
+Benchmark suite for the analysis and storage hot paths.
+
+Generates reproducible synthetic datasets with the vectorized mock sensor model, times each
+hot function and reports throughput, latency percentiles and peak memory.
+
+Usage:
+    python benchmark.py run --sizes 1000 10000 100000 --save baseline.json
+    python benchmark.py run --sizes 10000000 --benchmarks calculate_statistics
+    python benchmark.py compare baseline.json --tolerance 0.15
+    python benchmark.py run --sizes 1000 --benchmarks startup_dashboard startup_analysis
+"""
+
+import argparse
+import ast
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import database
+from mock_data import generate_mock_arrays
+from anomaly_detection import detect_anomalies, analyze_patterns
+from utils import calculate_statistics, export_to_csv, export_csv_file, export_columnar_file
+from bulk_import import import_arrays
+
+# Dataset sizes used when none are given on the command line
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Seconds between generated readings (matches the dashboard refresh interval)
+SAMPLE_INTERVAL_SECONDS = 3
+
+class Dataset:
+    """Synthetic readings of a given size, with a lazily populated database copy."""
+
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.seed = seed
+        self.frame = self._generate_frame()
+        self._db_file = None
+
+    def _generate_frame(self):
+        """Generate the readings with the mock model; equal seeds give identical data."""
+        # Readings end at a fixed point in time so the data is identical across runs
+        end = datetime(2025, 1, 1)
+        data = generate_mock_arrays(
+            self.size,
+            seed=self.seed,
+            start=end - timedelta(seconds=(self.size - 1) * SAMPLE_INTERVAL_SECONDS),
+            interval_seconds=SAMPLE_INTERVAL_SECONDS
+        )
+        # Injected spikes, the ground truth for scoring detectors
+        self.labels = {
+            'temperature': data['temperature_anomaly'],
+            'humidity': data['humidity_anomaly']
+        }
+
+        return pd.DataFrame({
+            'id': np.arange(1, self.size + 1),
+            'timestamp': pd.to_datetime(data['timestamp']),
+            'temperature': data['temperature'],
+            'humidity': data['humidity'],
+            'sensor_id': database.DEFAULT_SENSOR_ID
+        })
+
+    @property
+    def db_file(self):
+        """Path of a temporary database holding the dataset."""
+        if self._db_file is None:
+            self._db_file = os.path.join(tempfile.mkdtemp(prefix="warehouse_benchmark_"), "benchmark.db")
+            database.DB_FILE = self._db_file
+            database.init_db()
+            import_arrays(
+                self.frame['timestamp'].to_numpy(),
+                self.frame['temperature'].to_numpy(),
+                self.frame['humidity'].to_numpy(),
+                self.frame['sensor_id'].to_numpy(),
+                rebuild_rollups=False
+            )
+
+        database.DB_FILE = self._db_file
+        return self._db_file
+
+    def scratch_db_file(self):
+        """
+        Path of a fresh copy of the dataset database, for benchmarks that write.
+
+        Writes to the copy don't leak into later benchmarks, so results don't
+        depend on the order the benchmarks run in.
+        """
+        path = os.path.join(tempfile.mkdtemp(prefix="warehouse_benchmark_scratch_"), "benchmark.db")
+        source, target = sqlite3.connect(self.db_file), sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+
+        database.DB_FILE = path
+        return path
+
+# Each benchmark takes a Dataset and returns (callable, rows processed per call, repeat override)
+
+def bench_detect_anomalies(dataset):
+    frame = dataset.frame
+
+    def detect():
+        temp_anomalies, humid_anomalies = detect_anomalies(frame, 3.0)
+        # Score the temperature detections against the injected spikes
+        truth = dataset.labels['temperature']
+        flagged = np.zeros(len(frame), dtype=bool)
+        if not temp_anomalies.empty:
+            flagged[temp_anomalies['id'].to_numpy() - 1] = True
+        hits = np.count_nonzero(flagged & truth)
+        detect.extra = {
+            'precision': hits / max(np.count_nonzero(flagged), 1),
+            'recall': hits / max(np.count_nonzero(truth), 1)
+        }
+
+    return detect, len(frame), None
+
+def bench_analyze_patterns(dataset):
+    frame = dataset.frame
+    return lambda: analyze_patterns(frame), len(frame), None
+
+def bench_calculate_statistics(dataset):
+    frame = dataset.frame
+    return lambda: calculate_statistics(frame), len(frame), None
+
+def bench_store_readings(dataset):
+    dataset.scratch_db_file()
+    timestamp = datetime(2025, 1, 1)
+    # Single-row inserts: each repetition is one call
+    return lambda: database.store_readings(timestamp, 23.0, 50.0), 1, 200
+
+def bench_bulk_import(dataset):
+    frame = dataset.frame
+    directory = tempfile.mkdtemp(prefix="warehouse_benchmark_import_")
+    path = os.path.join(directory, "import.db")
+
+    def load():
+        # A fresh database per call: the import includes creating the table and its index
+        if os.path.exists(path):
+            os.remove(path)
+        original_db_file = database.DB_FILE
+        database.DB_FILE = path
+        try:
+            database.init_db()
+            import_arrays(frame['timestamp'].to_numpy(), frame['temperature'].to_numpy(),
+                          frame['humidity'].to_numpy(), frame['sensor_id'].to_numpy(),
+                          rebuild_rollups=False)
+        finally:
+            database.DB_FILE = original_db_file
+
+    return load, len(frame), None
+
+def bench_get_readings_by_timeframe(dataset):
+    dataset.db_file
+    # Look back far enough to cover the whole fixed-date dataset
+    hours = int((datetime.now() - datetime(2024, 1, 1)).total_seconds() // 3600)
+    return lambda: database.get_readings_by_timeframe(hours), dataset.size, None
+
+def bench_get_all_readings(dataset):
+    dataset.db_file
+    return lambda: database.get_readings_by_timeframe(0), dataset.size, None
+
+def bench_get_latest_readings(dataset):
+    dataset.db_file
+    return lambda: database.get_latest_readings(30), 30, 50
+
+def bench_export_csv(dataset):
+    dataset.db_file
+    # Whole timeframe loaded into a DataFrame and formatted in memory
+    return lambda: export_to_csv(database.get_readings_by_timeframe(0)), dataset.size, None
+
+def _export_file(dataset, file_format):
+    """Export the whole dataset to a file; the file size is reported as the payload."""
+    path = os.path.join(os.path.dirname(dataset.db_file), f"export.{file_format}")
+
+    def export():
+        if file_format == 'csv':
+            stats = export_csv_file(path, 0)
+        elif file_format == 'csv.gz':
+            stats = export_csv_file(path, 0, compress=True)
+        else:
+            stats = export_columnar_file(path, 0, file_format)
+        export.extra = {'payload_bytes': stats['bytes']}
+
+    return export, dataset.size, None
+
+def bench_export_csv_stream(dataset):
+    return _export_file(dataset, 'csv')
+
+def bench_export_csv_gzip(dataset):
+    return _export_file(dataset, 'csv.gz')
+
+def bench_export_parquet(dataset):
+    return _export_file(dataset, 'parquet')
+
+def bench_export_arrow(dataset):
+    return _export_file(dataset, 'arrow')
+
+def bench_figures_rebuild(dataset):
+    """
+    Simulate dashboard refresh ticks that build all six charts.
+
+    Each call advances the window by one reading, like one monitoring tick.
+    The serialized payload of one tick is reported as an extra.
+    """
+    import streamlit.config
+    import streamlit.logger
+    import visualization
+
+    # Rendering outside a Streamlit script run only logs context warnings
+    streamlit.config.set_option('logger.level', 'error')
+    streamlit.logger.set_log_level('error')
+
+    frame = dataset.frame
+    anomalies = frame.iloc[::max(len(frame) // 20, 1)]
+    state = {'end': max(len(frame) // 2, 31)}
+
+    def tick(render_stats=None):
+        state['end'] = min(state['end'] + 1, len(frame))
+        window = frame.iloc[:state['end']]
+        latest = window.iloc[-30:]
+        visualization.plot_real_time_temperature(latest, render_stats=render_stats)
+        visualization.plot_real_time_humidity(latest, render_stats=render_stats)
+        visualization.plot_historical_temperature(window, render_stats=render_stats)
+        visualization.plot_historical_humidity(window, render_stats=render_stats)
+        visualization.plot_temperature_statistics(window, anomalies, render_stats=render_stats)
+        visualization.plot_humidity_statistics(window, anomalies, render_stats=render_stats)
+
+    # Serialized payload of one tick, measured once outside the timed calls
+    probe = visualization.RenderStats(measure=True)
+    tick(probe)
+    tick.extra = {'payload_bytes': int(sum(stats['payload_bytes'] for stats in probe.stats.values()))}
+
+    return tick, dataset.size, None
+
+# Analysis modules whose cold import time is tracked
+ANALYSIS_MODULES = ('anomaly_detection', 'sketches', 'utils')
+
+# Libraries that should only load when a code path needs them
+HEAVY_MODULES = ('scipy', 'sklearn', 'matplotlib', 'plotly.express')
+
+def dashboard_modules():
+    """Modules app.py imports at the top level, read from its source."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+def _cold_import(modules):
+    """
+    Import modules in a fresh interpreter; the timed call includes interpreter startup.
+
+    The child reports its own import time and which HEAVY_MODULES got loaded.
+    """
+    script = "\n".join(
+        ["import sys, time", "start = time.perf_counter()"] +
+        [f"import {module}" for module in modules] +
+        ["print(time.perf_counter() - start)",
+         f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"]
+    )
+
+    def run():
+        output = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        run.extra = {'import_seconds': float(output[0]), 'heavy_modules': output[1] if len(output) > 1 else ''}
+    run.extra = {}
+    return run
+
+# The startup benchmarks don't depend on the dataset size; run them with a single size
+
+def bench_startup_dashboard(dataset):
+    modules = dashboard_modules()
+    return _cold_import(modules), len(modules), 3
+
+def bench_startup_analysis(dataset):
+    return _cold_import(ANALYSIS_MODULES), len(ANALYSIS_MODULES), 3
+
+def bench_alert_rules(dataset):
+    from alerts import AlertEngine, threshold_rules
+    frame = dataset.frame
+    rules = threshold_rules(20.0, 26.0, 40.0, 60.0)
+    # A fresh engine per call so every reading is evaluated
+    return lambda: AlertEngine(rules, log=False).evaluate(frame), len(frame), None
+
+# Requests sent per timed call of the API benchmarks, spread over concurrent clients
+API_REQUESTS_PER_CALL = 200
+API_CLIENTS = 4
+
+def _api_requests(dataset, path, conditional):
+    """
+    Send a burst of requests to a local API server from concurrent keep-alive clients.
+
+    With conditional=True every request carries the current ETag, so the server
+    answers 304 Not Modified without running the query.
+    """
+    import http.client
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import api
+
+    dataset.db_file
+    server = api.create_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    headers = {'Accept-Encoding': 'gzip'}
+    if conditional:
+        headers['If-None-Match'] = api.current_etag()
+
+    def client(count):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        received = 0
+        for _ in range(count):
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            received += len(response.read())
+        conn.close()
+        return received
+
+    def burst():
+        with ThreadPoolExecutor(API_CLIENTS) as pool:
+            sizes = list(pool.map(client, [API_REQUESTS_PER_CALL // API_CLIENTS] * API_CLIENTS))
+        burst.extra = {'payload_bytes': sum(sizes) // API_REQUESTS_PER_CALL}
+
+    burst()
+    return burst
+
+def bench_api_readings_page(dataset):
+    # Throughput is reported in requests/s: each call sends API_REQUESTS_PER_CALL requests
+    return _api_requests(dataset, '/readings?limit=500', conditional=False), API_REQUESTS_PER_CALL, None
+
+def bench_api_not_modified(dataset):
+    return _api_requests(dataset, '/readings?limit=500', conditional=True), API_REQUESTS_PER_CALL, None
+
+# Quantiles compared between exact computation and the stored sketches
+BENCHMARK_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+def bench_quantiles_exact(dataset):
+    dataset.db_file
+    # Load every reading of the range and sort it
+    return (lambda: np.quantile(database.get_readings_by_timeframe(0)['temperature'], BENCHMARK_QUANTILES),
+            dataset.size, None)
+
+def bench_quantiles_sketch(dataset):
+    import sketches
+
+    # Building the sketches writes to the database
+    dataset.scratch_db_file()
+    sketches.refresh_sketches()
+    exact = np.sort(dataset.frame['temperature'].to_numpy())
+
+    def query():
+        result = sketches.range_quantiles('temperature', BENCHMARK_QUANTILES)
+        estimates = np.array([result[q] for q in BENCHMARK_QUANTILES])
+        # Readings are quantized to the sensor resolution: rank the nearest observed value,
+        # then take the distance of its run of ties from the requested quantile
+        index = np.clip(np.searchsorted(exact, estimates), 1, len(exact) - 1)
+        below, above = exact[index - 1], exact[index]
+        nearest = np.where(estimates - below <= above - estimates, below, above)
+        low = np.searchsorted(exact, nearest, 'left') / len(exact)
+        high = np.searchsorted(exact, nearest, 'right') / len(exact)
+        quantiles = np.array(BENCHMARK_QUANTILES)
+        rank_error = np.maximum(np.maximum(low - quantiles, quantiles - high), 0)
+        query.extra = {
+            'rank_error': float(rank_error.max()),
+            'value_error': float(np.abs(estimates - np.quantile(exact, quantiles)).max())
+        }
+
+    return query, dataset.size, None
+
+BENCHMARKS = {
+    'detect_anomalies': bench_detect_anomalies,
+    'analyze_patterns': bench_analyze_patterns,
+    'calculate_statistics': bench_calculate_statistics,
+    'store_readings': bench_store_readings,
+    'bulk_import': bench_bulk_import,
+    'get_readings_by_timeframe': bench_get_readings_by_timeframe,
+    'get_all_readings': bench_get_all_readings,
+    'get_latest_readings': bench_get_latest_readings,
+    'export_csv': bench_export_csv,
+    'export_csv_stream': bench_export_csv_stream,
+    'export_csv_gzip': bench_export_csv_gzip,
+    'export_parquet': bench_export_parquet,
+    'export_arrow': bench_export_arrow,
+    'figures_rebuild': bench_figures_rebuild,
+    'alert_rules': bench_alert_rules,
+    'api_readings_page': bench_api_readings_page,
+    'api_not_modified': bench_api_not_modified,
+    'quantiles_exact': bench_quantiles_exact,
+    'quantiles_sketch': bench_quantiles_sketch,
+    'startup_dashboard': bench_startup_dashboard,
+    'startup_analysis': bench_startup_analysis
+}
+
+def measure(fn, rows, repeat):
+    """
+    Time a benchmark callable.
+
+    Args:
+        fn (callable): Function to benchmark
+        rows (int): Rows processed per call, used for throughput
+        repeat (int): Number of timed calls
+
+    Returns:
+        dict: Latency percentiles (seconds), throughput (rows/s) and peak memory (bytes)
+    """
+    # Warm up caches and lazy initialisation
+    fn()
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    # Peak memory is measured in a separate call since tracing slows execution
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    result = {
+        'rows': rows,
+        'repeat': repeat,
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': float(max(latencies)),
+        'throughput': rows / p50 if p50 > 0 else float('inf'),
+        'peak_memory': int(peak)
+    }
+
+    # Benchmark-specific measurements (e.g. serialized payload size)
+    result.update(getattr(fn, 'extra', {}))
+    return result
+
+def run_benchmarks(sizes, names, repeat=5, seed=42):
+    """
+    Run the selected benchmarks for every dataset size.
+
+    Returns:
+        dict: Results keyed by '<benchmark>@<size>'
+    """
+    results = {}
+    original_db_file = database.DB_FILE
+
+    try:
+        for size in sizes:
+            dataset = Dataset(size, seed)
+            for name in names:
+                fn, rows, repeat_override = BENCHMARKS[name](dataset)
+                result = measure(fn, rows, repeat_override or repeat)
+                results[f"{name}@{size}"] = result
+                print_result(name, size, result)
+    finally:
+        database.DB_FILE = original_db_file
+
+    return results
+
+def format_bytes(value):
+    """Format a byte count for display."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+def print_result(name, size, result):
+    """Print one benchmark result line."""
+    print(
+        f"{name:<28} {size:>10,} rows | p50 {result['p50'] * 1000:10.3f} ms"
+        f" | p95 {result['p95'] * 1000:10.3f} ms | {result['throughput']:14,.0f} rows/s"
+        f" | peak {format_bytes(result['peak_memory'])}"
+        + (f" | payload {format_bytes(result['payload_bytes'])}" if 'payload_bytes' in result else "")
+        + (f" | rank err {result['rank_error']:.4%} | value err {result['value_error']:.3f}"
+           if 'rank_error' in result else "")
+        + (f" | precision {result['precision']:.2f} | recall {result['recall']:.2f}"
+           if 'precision' in result else "")
+        + (f" | imports {result['import_seconds'] * 1000:.0f} ms | heavy: {result['heavy_modules'] or 'none'}"
+           if 'import_seconds' in result else "")
+    )
+
+def environment_info():
+    """Describe the machine and library versions the results were taken on."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'created': datetime.now().isoformat(timespec='seconds')
+    }
+
+def compare_results(baseline, current, tolerance):
+    """
+    Compare current results against a saved baseline.
+
+    Args:
+        baseline (dict): Baseline results keyed by '<benchmark>@<size>'
+        current (dict): Current results keyed the same way
+        tolerance (float): Allowed relative slowdown of the median latency
+
+    Returns:
+        list: Keys of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline p50':>14} {'current p50':>14} {'change':>9}")
+    for key, result in current.items():
+        if key not in baseline:
+            continue
+
+        before, after = baseline[key]['p50'], result['p50']
+        change = (after - before) / before if before > 0 else 0.0
+        status = ""
+        if change > tolerance:
+            status = "REGRESSION"
+            regressions.append(key)
+        elif change < -tolerance:
+            status = "faster"
+        print(f"{key:<40} {before * 1000:11.3f} ms {after * 1000:11.3f} ms {change:+8.1%} {status}")
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis and storage hot paths")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run benchmarks and optionally save a baseline")
+    run_parser.add_argument('--save', help="Write results to this JSON file")
+
+    compare_parser = subparsers.add_parser('compare', help="Run benchmarks and compare with a baseline")
+    compare_parser.add_argument('baseline', help="Baseline JSON file written by 'run --save'")
+    compare_parser.add_argument('--tolerance', type=float, default=0.15,
+                                help="Allowed relative slowdown of the median latency")
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--sizes', type=int, nargs='+', help="Dataset sizes in readings")
+        sub.add_argument('--benchmarks', nargs='+', choices=sorted(BENCHMARKS),
+                         help="Benchmarks to run (default: all)")
+        sub.add_argument('--repeat', type=int, default=5, help="Timed calls per benchmark")
+        sub.add_argument('--seed', type=int, default=42, help="Seed for the mock data model")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+        # Default to the benchmarks and sizes recorded in the baseline
+        keys = [key.split('@') for key in baseline]
+        sizes = args.sizes or sorted({int(size) for _, size in keys})
+        names = args.benchmarks or [name for name in BENCHMARKS if any(name == k for k, _ in keys)]
+
+        current = run_benchmarks(sizes, names, args.repeat, args.seed)
+        regressions = compare_results(baseline, current, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+            return 1
+        print("\nNo regressions")
+        return 0
+
+    sizes = args.sizes or DEFAULT_SIZES
+    names = args.benchmarks or list(BENCHMARKS)
+    results = run_benchmarks(sizes, names, args.repeat, args.seed)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'results': results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
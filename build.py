@@ -99,6 +99,17 @@ if __name__ == "__main__":
             "--add-data=sensor.py:.",
             "--add-data=utils.py:.",
             "--add-data=visualization.py:.",
+            "--add-data=downsampling.py:.",
+            "--add-data=cache.py:.",
+            "--add-data=hub.py:.",
+            "--add-data=alerts.py:.",
+            "--add-data=instrumentation.py:.",
+            "--add-data=metrics.py:.",
+            "--add-data=benchmark.py:.",
+            "--add-data=bulk_import.py:.",
+            "--add-data=sketches.py:.",
+            "--add-data=api.py:.",
+            "--add-data=pages:pages",
             "--icon=generated-icon.png",
             "run_app.py"
         ], check=True)
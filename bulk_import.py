@@ -0,0 +1,259 @@
+"""
+Bulk import of readings from arrays, CSV, Parquet or Arrow IPC files.
+
+Readings are loaded in one transaction with relaxed pragmas and the reading
+indexes rebuilt once at the end (see database.store_readings_bulk), then the
+hourly quantile sketches are brought up to date. The anomaly baseline catches
+up on its own with the next detection run.
+
+Files in the export formats of utils.py (including .csv.gz) can be imported
+as they are; the 'id' column is ignored and new ids are assigned.
+
+Usage:
+    python bulk_import.py export.csv.gz
+    python bulk_import.py archive.parquet --db warehouse_temperature.db
+    python bulk_import.py --mock 5000000 --sensors 10
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import database
+from database import DEFAULT_SENSOR_ID, init_db, store_readings_bulk
+
+# Readings handed to SQLite per executemany call
+IMPORT_CHUNK_ROWS = 100000
+
+# Columns read from import files ('sensor_id' is optional)
+IMPORT_COLUMNS = ['timestamp', 'temperature', 'humidity', 'sensor_id']
+
+def _timestamp_text(timestamps):
+    """
+    Format datetime64 values the way the sqlite3 datetime adapter stores them.
+
+    Whole seconds are stored without a fraction, everything else with microseconds.
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[us]')
+    whole = timestamps == timestamps.astype('datetime64[s]')
+    text = np.empty(len(timestamps), dtype=object)
+    text[whole] = np.datetime_as_string(timestamps[whole], unit='s')
+    text[~whole] = np.datetime_as_string(timestamps[~whole], unit='us')
+    return [value.replace('T', ' ', 1) for value in text]
+
+def _chunk_rows(timestamps, temperatures, humidities, sensor_ids):
+    """Build the insert tuples of one chunk of column arrays."""
+    temperatures = np.asarray(temperatures)
+    humidities = np.asarray(humidities)
+    # Columnar exports store float32; round back to the sensor resolution
+    if temperatures.dtype == np.float32:
+        temperatures = temperatures.astype(np.float64).round(1)
+    if humidities.dtype == np.float32:
+        humidities = humidities.astype(np.float64).round(1)
+    if sensor_ids is None:
+        sensor_ids = [DEFAULT_SENSOR_ID] * len(temperatures)
+    elif isinstance(sensor_ids, str):
+        sensor_ids = [sensor_ids] * len(temperatures)
+    else:
+        sensor_ids = np.asarray(sensor_ids).astype(str).tolist()
+
+    return list(zip(
+        _timestamp_text(timestamps),
+        temperatures.astype(np.float64).tolist(),
+        humidities.astype(np.float64).tolist(),
+        sensor_ids
+    ))
+
+def iter_array_chunks(timestamps, temperatures, humidities, sensor_ids=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Split column arrays into insert chunks.
+
+    Args:
+        timestamps (array-like): datetime64 (or datetime) timestamps
+        temperatures (array-like): Temperatures
+        humidities (array-like): Humidities
+        sensor_ids (array-like or str): Sensor id per reading, one id for all, or
+            None for the default sensor
+        chunk_rows (int): Readings per chunk
+
+    Yields:
+        list: (timestamp, temperature, humidity, sensor_id) tuples
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[us]')
+    for start in range(0, len(timestamps), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        yield _chunk_rows(
+            timestamps[rows],
+            np.asarray(temperatures)[rows],
+            np.asarray(humidities)[rows],
+            sensor_ids if sensor_ids is None or isinstance(sensor_ids, str) else np.asarray(sensor_ids)[rows]
+        )
+
+def iter_csv_chunks(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Read a CSV file (optionally gzip-compressed) in insert chunks."""
+    import pandas as pd
+
+    for frame in pd.read_csv(path, usecols=lambda column: column in IMPORT_COLUMNS,
+                             chunksize=chunk_rows, compression='infer'):
+        yield _chunk_rows(
+            pd.to_datetime(frame['timestamp'], format='ISO8601').to_numpy(),
+            frame['temperature'].to_numpy(),
+            frame['humidity'].to_numpy(),
+            frame['sensor_id'].to_numpy() if 'sensor_id' in frame.columns else None
+        )
+
+def _batch_chunk(batch):
+    """Build insert tuples from a pyarrow record batch."""
+    names = batch.schema.names
+    sensor_ids = None
+    if 'sensor_id' in names:
+        sensor_ids = batch.column(names.index('sensor_id')).to_numpy(zero_copy_only=False)
+    return _chunk_rows(
+        batch.column(names.index('timestamp')).to_numpy(zero_copy_only=False),
+        batch.column(names.index('temperature')).to_numpy(zero_copy_only=False),
+        batch.column(names.index('humidity')).to_numpy(zero_copy_only=False),
+        sensor_ids
+    )
+
+def iter_parquet_chunks(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Read a Parquet file in insert chunks."""
+    # pyarrow is only needed for columnar imports; import it on first use
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    columns = [name for name in IMPORT_COLUMNS if name in parquet_file.schema_arrow.names]
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+        yield _batch_chunk(batch)
+
+def iter_arrow_chunks(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Read an Arrow IPC file in insert chunks."""
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield _batch_chunk(batch.slice(offset, chunk_rows))
+
+# Readers by file suffix
+FILE_READERS = {
+    '.csv': iter_csv_chunks,
+    '.csv.gz': iter_csv_chunks,
+    '.parquet': iter_parquet_chunks,
+    '.arrow': iter_arrow_chunks
+}
+
+def _reader_for(path):
+    for suffix, reader in FILE_READERS.items():
+        if path.lower().endswith(suffix):
+            return reader
+    raise ValueError(f"Unsupported file type: {path} (expected {', '.join(FILE_READERS)})")
+
+def import_chunks(chunks, defer_indexes=True, rebuild_rollups=True):
+    """
+    Load insert chunks and bring derived tables up to date.
+
+    Args:
+        chunks (iterable): Lists of (timestamp, temperature, humidity, sensor_id) tuples
+        defer_indexes (bool): Rebuild the reading indexes after the load (see
+            database.store_readings_bulk)
+        rebuild_rollups (bool): Refresh the hourly quantile sketches afterwards
+
+    Returns:
+        dict: 'rows' stored, 'load_seconds' and 'rollup_seconds'
+    """
+    started = time.perf_counter()
+    rows = store_readings_bulk(chunks, defer_indexes=defer_indexes)
+    loaded = time.perf_counter()
+
+    if rebuild_rollups and rows:
+        # Imported only when needed; sketches pulls in pandas
+        from sketches import refresh_sketches
+        refresh_sketches()
+
+    return {
+        'rows': rows,
+        'load_seconds': loaded - started,
+        'rollup_seconds': time.perf_counter() - loaded
+    }
+
+def import_arrays(timestamps, temperatures, humidities, sensor_ids=None, **options):
+    """
+    Import readings held in column arrays.
+
+    Args:
+        timestamps (array-like): datetime64 (or datetime) timestamps
+        temperatures (array-like): Temperatures
+        humidities (array-like): Humidities
+        sensor_ids (array-like or str): Sensor ids (see iter_array_chunks)
+        **options: defer_indexes / rebuild_rollups (see import_chunks)
+
+    Returns:
+        dict: Import statistics (see import_chunks)
+    """
+    return import_chunks(iter_array_chunks(timestamps, temperatures, humidities, sensor_ids), **options)
+
+def import_file(path, **options):
+    """
+    Import a CSV (.csv, .csv.gz), Parquet or Arrow IPC file.
+
+    Args:
+        path (str): File with 'timestamp', 'temperature', 'humidity' and optionally
+            'sensor_id' columns
+        **options: defer_indexes / rebuild_rollups (see import_chunks)
+
+    Returns:
+        dict: Import statistics (see import_chunks)
+    """
+    return import_chunks(_reader_for(path)(path), **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import readings into the database")
+    parser.add_argument('path', nargs='?', help="CSV (.csv/.csv.gz), Parquet or Arrow IPC file")
+    parser.add_argument('--mock', type=int, metavar='N', help="Import N mock readings per sensor instead of a file")
+    parser.add_argument('--sensors', type=int, default=1, help="Mock sensors (with --mock)")
+    parser.add_argument('--interval', type=float, default=3.0, help="Seconds between mock readings (with --mock)")
+    parser.add_argument('--seed', type=int, help="Seed of the mock data (with --mock)")
+    parser.add_argument('--db', default=database.DB_FILE, help="SQLite database file")
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help="Update indexes row by row (faster for small imports into large tables)")
+    parser.add_argument('--skip-rollups', action='store_true', help="Don't refresh the quantile sketches")
+    args = parser.parse_args(argv)
+
+    if (args.path is None) == (args.mock is None):
+        parser.error("give either a file or --mock")
+
+    database.DB_FILE = args.db
+    init_db()
+
+    options = {'defer_indexes': not args.keep_indexes, 'rebuild_rollups': not args.skip_rollups}
+    if args.mock is not None:
+        from mock_data import generate_mock_arrays
+        # Mock history ends now
+        start = datetime.now() - timedelta(seconds=args.mock * args.interval)
+        data = generate_mock_arrays(args.mock, args.sensors, seed=args.seed, start=start,
+                                    interval_seconds=args.interval)
+        stats = import_arrays(data['timestamp'], data['temperature'], data['humidity'], data['sensor_id'], **options)
+        source = f"{args.mock:,} mock readings x {args.sensors} sensor(s)"
+    else:
+        if not os.path.exists(args.path):
+            parser.error(f"no such file: {args.path}")
+        stats = import_file(args.path, **options)
+        source = args.path
+
+    rate = stats['rows'] / stats['load_seconds'] if stats['load_seconds'] else 0
+    print(f"Imported {stats['rows']:,} readings from {source} into {args.db}"
+          f" in {stats['load_seconds']:.1f} s ({rate * 60:,.0f} rows/min)"
+          + (f", sketches refreshed in {stats['rollup_seconds']:.1f} s" if not args.skip_rollups else ""))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from database import (
+    DB_FILE,
+    init_db,
+    get_latest_reading_id,
+    get_readings_by_timeframe,
+    get_anomaly_events
+)
+from anomaly_detection import detect_change_points_by_sensor, record_new_anomalies, refresh_seasonal_baseline
+from hub import AcquisitionHub
+from utils import describe_columns
+from sketches import SKETCH_SUMMARY_MIN_HOURS, describe_range, refresh_sketches
+from alerts import AlertEngine
+from instrumentation import count
+from metrics import DEFAULT_METRICS_PORT, MetricsExporter
+
+# Cached historical queries and analysis results are keyed on refresh periods of
+# this many seconds: sessions share one entry per timeframe and period however
+# fast readings arrive, and the entries of past periods expire
+HISTORY_TTL_SECONDS = 60
+
+# Distinct (timeframe, period) entries kept per cached function
+HISTORY_MAX_ENTRIES = 32
+
+# Alert engines kept at once (one per distinct rule set, i.e. slider combination)
+ALERT_ENGINE_MAX_ENTRIES = 8
+
+# Port of the dashboard's /metrics endpoint (WAREHOUSE_METRICS_PORT, 0 disables it)
+# and the metrics file it rewrites periodically (WAREHOUSE_METRICS_FILE, none
+# unless set; see metrics.py)
+DASHBOARD_METRICS_PORT = int(os.environ.get('WAREHOUSE_METRICS_PORT', DEFAULT_METRICS_PORT)) or None
+DASHBOARD_METRICS_FILE = os.environ.get('WAREHOUSE_METRICS_FILE') or None
+
+class SharedAnalysis:
+    """
+    Seasonal baseline, anomaly detection cursor and sketch refresh shared by every session.
+
+    Detection appends scored events down to ANOMALY_SCORE_FLOOR to the event
+    table, so running it once per new reading is enough no matter how many
+    viewers are connected or which sensitivity each of them picked.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.baseline = None
+        self.last_detection_id = 0
+
+    def update(self, data):
+        """
+        Fold new readings into the baseline and record anomalies among them.
+
+        Args:
+            data (pd.DataFrame): Readings window including 'id'
+        """
+        with self.lock:
+            # Cheap no-op until the window holds readings not evaluated yet
+            if data.empty or data['id'].max() <= self.last_detection_id:
+                return
+            self.baseline = refresh_seasonal_baseline(self.baseline)
+            self.last_detection_id = record_new_anomalies(
+                data,
+                baseline=self.baseline,
+                last_id=self.last_detection_id
+            )
+            # Fold the new readings into the hourly quantile sketches
+            refresh_sketches()
+
+@st.cache_resource(show_spinner=False)
+def database_ready(db_file=DB_FILE):
+    """
+    Create the database schema once per process instead of once per rerun.
+
+    Connections stay per call (see database.py): sqlite3 connections cannot be
+    shared between the threads Streamlit runs sessions on.
+
+    Args:
+        db_file (str): Database file, part of the cache key
+
+    Returns:
+        str: The initialized database file
+    """
+    init_db()
+    return db_file
+
+@st.cache_resource(show_spinner=False)
+def metrics_exporter(port=DASHBOARD_METRICS_PORT, path=DASHBOARD_METRICS_FILE):
+    """
+    Start exporting the process metrics once per process.
+
+    Args:
+        port (int): Port of the local /metrics endpoint, None to disable it
+        path (str): Metrics file rewritten periodically, None to disable it
+
+    Returns:
+        tuple: (exporter, error) where exporter is the running MetricsExporter and
+            error a message for the dashboard if the endpoint could not start, else None
+    """
+    try:
+        return MetricsExporter(port, path).start(), None
+    except OSError as e:
+        # Port taken (e.g. by a second dashboard process); keep the file dump if any
+        return MetricsExporter(None, path).start(), f"Không mở được cổng số liệu {port}: {e}"
+
+@st.cache_resource(show_spinner=False)
+def acquisition_hub():
+    """
+    Get the process-wide acquisition hub.
+
+    Returns:
+        AcquisitionHub: Hub that samples the sensor once for all sessions
+    """
+    return AcquisitionHub()
+
+@st.cache_resource(max_entries=ALERT_ENGINE_MAX_ENTRIES, show_spinner=False)
+def alert_engine(rules):
+    """
+    Get the alert engine for a rule set, shared by sessions using the same rules.
+
+    A new engine starts after the latest stored reading, so changing the
+    thresholds does not re-evaluate the readings already in the buffer. Engines
+    of other rule sets evaluate the same readings; the alert log keeps one
+    transition per reading, rule and rule parameters, so shared rules are
+    logged once and different thresholds are logged apart.
+
+    Args:
+        rules (list): Rule definitions (see alerts.threshold_rules), part of the cache key
+
+    Returns:
+        AlertEngine: Engine holding the alert state and writing the alert log
+    """
+    return AlertEngine(rules, start_id=get_latest_reading_id())
+
+@st.cache_resource(show_spinner=False)
+def shared_analysis():
+    """
+    Get the process-wide analysis state.
+
+    Returns:
+        SharedAnalysis: Baseline and detection cursor shared by all sessions
+    """
+    return SharedAnalysis()
+
+def refresh_period():
+    """Number of the current HISTORY_TTL_SECONDS refresh period (part of the history cache keys)."""
+    return int(time.time() // HISTORY_TTL_SECONDS)
+
+@st.cache_data(ttl=HISTORY_TTL_SECONDS, max_entries=HISTORY_MAX_ENTRIES, show_spinner=False)
+def cached_readings(hours, period):
+    """
+    Retrieve readings for a timeframe, shared by all sessions.
+
+    Args:
+        hours (int): Number of hours to look back. If 0, returns all data.
+        period (int): Refresh period (see refresh_period); a new period produces a new cache entry
+
+    Returns:
+        pandas.DataFrame: DataFrame containing the readings
+    """
+    # Only runs on a cache miss; load_history counts the requests
+    count('history_cache_misses')
+    return get_readings_by_timeframe(hours)
+
+@st.cache_data(ttl=HISTORY_TTL_SECONDS, max_entries=HISTORY_MAX_ENTRIES, show_spinner=False)
+def cached_anomalies(hours, threshold, period):
+    """
+    Load the recorded events scoring at least the threshold.
+
+    Args:
+        hours (int): Number of hours to look back. If 0, returns all data.
+        threshold (float): The threshold for anomaly detection
+        period (int): Refresh period (see refresh_period); a new period produces a new cache entry
+
+    Returns:
+        tuple: (temperature_anomalies, humidity_anomalies) DataFrames
+    """
+    return (
+        get_anomaly_events(hours, 'temperature', min_score=threshold),
+        get_anomaly_events(hours, 'humidity', min_score=threshold)
+    )
+
+@st.cache_data(ttl=HISTORY_TTL_SECONDS, max_entries=HISTORY_MAX_ENTRIES, show_spinner=False)
+def cached_statistics(hours, period, sensor_id=None):
+    """
+    Summarize a timeframe once and share the result with every session and plot.
+
+    Long timeframes (SKETCH_SUMMARY_MIN_HOURS and more, or all data) are
+    summarized from the hourly quantile sketches instead of sorting every reading.
+
+    Args:
+        hours (int): Number of hours to look back. If 0, returns all data.
+        period (int): Refresh period (see refresh_period); a new period produces a new cache entry
+        sensor_id (str): Only summarize readings from this sensor (all sensors if None)
+
+    Returns:
+        dict: Per metric, the summary from utils.describe_columns
+    """
+    if hours == 0 or hours >= SKETCH_SUMMARY_MIN_HOURS:
+        start = datetime.now() - timedelta(hours=hours) if hours else None
+        return describe_range(('temperature', 'humidity'), start=start, sensor_id=sensor_id)
+
+    readings = cached_readings(hours, period)
+    if sensor_id is not None and not readings.empty:
+        readings = readings[readings['sensor_id'] == sensor_id]
+    if readings.empty:
+        return {'temperature': None, 'humidity': None}
+    return describe_columns(readings, ('temperature', 'humidity'))
+
+@st.cache_data(ttl=HISTORY_TTL_SECONDS, max_entries=HISTORY_MAX_ENTRIES, show_spinner=False)
+def cached_change_points(hours, period):
+    """
+    Detect level shifts in a timeframe once and share them with every session.
+
+    Args:
+        hours (int): Number of hours to look back. If 0, returns all data.
+        period (int): Refresh period (see refresh_period); a new period produces a new cache entry
+
+    Returns:
+        pd.DataFrame: Change events per sensor and metric (see detect_change_points_by_sensor)
+    """
+    return detect_change_points_by_sensor(cached_readings(hours, period))
+
+def load_history(hours, threshold):
+    """
+    Load the historical window, its anomalies, level shifts and statistics through the shared caches.
+
+    Results are at most one refresh period (HISTORY_TTL_SECONDS) old.
+
+    Args:
+        hours (int): Number of hours to look back. If 0, returns all data.
+        threshold (float): The threshold for anomaly detection
+
+    Returns:
+        tuple: (readings, temperature_anomalies, humidity_anomalies, change_points, statistics)
+            where statistics is the cached_statistics summary
+    """
+    period = refresh_period()
+    count('history_cache_requests')
+    readings = cached_readings(hours, period)
+    # Detection writes to the event table, so it must not live inside a data
+    # cache (it would only run on misses); the shared cursor keeps it cheap
+    shared_analysis().update(readings)
+    temp_anomalies, humid_anomalies = cached_anomalies(hours, threshold, period)
+    change_points = cached_change_points(hours, period)
+    statistics = cached_statistics(hours, period)
+    return readings, temp_anomalies, humid_anomalies, change_points, statistics
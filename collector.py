@@ -0,0 +1,240 @@
+"""
+Headless data collector for edge boxes.
+
+Samples one or more sensors at a fixed rate and writes the readings to the
+database in batches, without Streamlit, pandas or the analysis stack. Anomaly
+detection is optional and only imported when enabled.
+
+Usage:
+    python collector.py
+    python collector.py --interval 10 --sensor dock=/dev/ttyUSB0@115200 --sensor cold_room=/dev/ttyUSB1
+    python collector.py --batch-size 50 --flush-interval 60 --detect-interval 300
+    python collector.py --metrics-port 9108 --metrics-file /var/lib/node_exporter/collector.prom
+"""
+
+import argparse
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+import database
+from database import ANOMALY_SCORE_FLOOR, DEFAULT_SENSOR_ID, init_db, store_readings_batch
+from mock_data import SensorSimulator
+
+# Seconds between two samples of every sensor (matches the dashboard refresh interval)
+DEFAULT_INTERVAL = 3.0
+
+# Readings buffered before they are written in one transaction
+DEFAULT_BATCH_SIZE = 20
+
+# Buffered readings are written at least this often (seconds)
+DEFAULT_FLUSH_INTERVAL = 30.0
+
+# Window of readings (hours) handed to anomaly detection
+DETECTION_WINDOW_HOURS = 24
+
+def parse_sensor(spec):
+    """
+    Parse a sensor specification from the command line.
+
+    Args:
+        spec (str): 'ID' for a mock sensor, or 'ID=PORT' / 'ID=PORT@BAUD' for a
+            serial sensor (e.g. 'dock=/dev/ttyUSB0@115200')
+
+    Returns:
+        tuple: (sensor_id, port, baud_rate) where port is None for mock sensors
+    """
+    sensor_id, _, port = spec.partition('=')
+    if not sensor_id:
+        raise argparse.ArgumentTypeError(f"Missing sensor id in '{spec}'")
+    if not port:
+        return sensor_id, None, None
+
+    port, _, baud_rate = port.partition('@')
+    try:
+        return sensor_id, port, int(baud_rate) if baud_rate else 9600
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid baud rate in '{spec}'")
+
+class Collector:
+    """
+    Sampling loop with batched writes and optional anomaly detection.
+
+    Args:
+        sensors (list): (sensor_id, port, baud_rate) tuples from parse_sensor
+        interval (float): Seconds between two samples of every sensor
+        batch_size (int): Readings buffered before a write
+        flush_interval (float): Maximum seconds between two writes
+        detect_interval (float): Seconds between anomaly detection runs, 0 to disable
+        threshold (float): Lowest anomaly score recorded (viewers filter higher scores)
+    """
+
+    def __init__(self, sensors, interval=DEFAULT_INTERVAL, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, detect_interval=0, threshold=ANOMALY_SCORE_FLOOR):
+        self.sensors = sensors
+        self.interval = interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.detect_interval = detect_interval
+        self.threshold = threshold
+        self.stop_event = threading.Event()
+        self.pending = []
+        self.stored = 0
+        self.failed_reads = 0
+        self.last_flush = time.monotonic()
+        self.last_detection = time.monotonic()
+        self.baseline = None
+        self.last_detection_id = 0
+        self.change_detectors = {}
+        self.change_points = 0
+        self.read_serial_data = None
+
+        # Mock sensors are independent simulators advanced together
+        mock_ids = [sensor_id for sensor_id, port, _ in sensors if port is None]
+        self.simulator = SensorSimulator(mock_ids) if mock_ids else None
+
+        if any(port is not None for _, port, _ in sensors):
+            # Imported only when a serial sensor is configured so mock setups don't need pyserial
+            from sensor import read_serial_data
+            self.read_serial_data = read_serial_data
+
+    def stop(self, *_):
+        """Request a graceful shutdown (also used as a signal handler)."""
+        self.stop_event.set()
+
+    def sample(self):
+        """Read every sensor once and buffer the valid readings."""
+        timestamp = datetime.now()
+        mock_readings = iter(())
+        if self.simulator is not None:
+            temperatures, humidities = self.simulator.read()
+            mock_readings = zip(temperatures.tolist(), humidities.tolist())
+
+        for sensor_id, port, baud_rate in self.sensors:
+            if port is None:
+                temperature, humidity = next(mock_readings)
+            else:
+                temperature, humidity = self.read_serial_data(port, baud_rate)
+
+            if temperature is None or humidity is None:
+                self.failed_reads += 1
+                print(f"{timestamp:%Y-%m-%d %H:%M:%S} no valid data from sensor '{sensor_id}'")
+                continue
+
+            self.pending.append((timestamp, temperature, humidity, sensor_id))
+
+    def flush(self):
+        """Write the buffered readings in one transaction."""
+        if self.pending:
+            self.stored += store_readings_batch(self.pending)
+            self.pending = []
+        self.last_flush = time.monotonic()
+
+    def detect(self):
+        """Record anomalies and report level shifts among the readings stored since the last run."""
+        # The analysis stack is heavy; import it only when detection is enabled
+        from anomaly_detection import record_new_anomalies, refresh_seasonal_baseline, update_change_detectors
+        from sketches import refresh_sketches
+
+        self.flush()
+        self.baseline = refresh_seasonal_baseline(self.baseline)
+        data = database.get_readings_by_timeframe(DETECTION_WINDOW_HOURS)
+
+        # Slow drifts (e.g. a failing chiller) never produce an isolated outlier
+        new_readings = data[data['id'] > self.last_detection_id]
+        for event in update_change_detectors(self.change_detectors, new_readings):
+            self.change_points += 1
+            print(f"{event['detected_time']:%Y-%m-%d %H:%M:%S} {event['metric']} of sensor "
+                  f"'{event['sensor_id']}' shifted by {event['shift']:+.2f} "
+                  f"({event['direction']}) since {event['onset_time']:%H:%M:%S}")
+
+        self.last_detection_id = record_new_anomalies(
+            data, self.threshold, baseline=self.baseline, last_id=self.last_detection_id
+        )
+        # Keep the long-range summaries cheap for the dashboard and the API
+        refresh_sketches()
+        self.last_detection = time.monotonic()
+
+    def run(self, duration=None):
+        """
+        Sample until stopped, then write any buffered readings.
+
+        Args:
+            duration (float): Stop after this many seconds (run until stopped if None)
+        """
+        started = time.monotonic()
+        while not self.stop_event.is_set():
+            tick = time.monotonic()
+            self.sample()
+
+            if len(self.pending) >= self.batch_size or tick - self.last_flush >= self.flush_interval:
+                self.flush()
+            if self.detect_interval and tick - self.last_detection >= self.detect_interval:
+                self.detect()
+
+            if duration is not None and tick - started >= duration:
+                break
+
+            # Keep a steady cadence regardless of how long the reads took
+            self.stop_event.wait(max(self.interval - (time.monotonic() - tick), 0))
+
+        self.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect sensor readings without the dashboard")
+    parser.add_argument('--sensor', dest='sensors', type=parse_sensor, action='append',
+                        help="Sensor as ID (mock data) or ID=PORT[@BAUD] (serial); repeatable "
+                             f"(default: one mock sensor '{DEFAULT_SENSOR_ID}')")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds between samples")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Readings buffered before a database write")
+    parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="Maximum seconds between database writes")
+    parser.add_argument('--detect-interval', type=float, default=0,
+                        help="Seconds between anomaly detection runs (0 disables detection)")
+    parser.add_argument('--threshold', type=float, default=ANOMALY_SCORE_FLOOR,
+                        help="Lowest anomaly score recorded (viewers filter higher scores)")
+    parser.add_argument('--db', default=database.DB_FILE, help="SQLite database file")
+    parser.add_argument('--duration', type=float, help="Stop after this many seconds")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument('--metrics-file', help="Rewrite Prometheus metrics to this file periodically")
+    args = parser.parse_args(argv)
+
+    database.DB_FILE = args.db
+    init_db()
+
+    collector = Collector(
+        args.sensors or [(DEFAULT_SENSOR_ID, None, None)],
+        interval=args.interval,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        detect_interval=args.detect_interval,
+        threshold=args.threshold
+    )
+
+    # Flush buffered readings before exiting on Ctrl+C or a service stop
+    signal.signal(signal.SIGINT, collector.stop)
+    signal.signal(signal.SIGTERM, collector.stop)
+
+    exporter = None
+    if args.metrics_port is not None or args.metrics_file:
+        # Stdlib only; doesn't add to the collector's footprint
+        from metrics import MetricsExporter
+        exporter = MetricsExporter(args.metrics_port, args.metrics_file).start()
+
+    print(f"Collecting from {len(collector.sensors)} sensor(s) every {args.interval:g} s into {args.db}")
+    collector.run(args.duration)
+    if exporter is not None:
+        exporter.stop()
+    print(f"Stopped: {collector.stored} readings stored, {collector.failed_reads} failed reads, "
+          f"{collector.change_points} change points")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,236 @@
 import sqlite3
-import pandas as pd
 from datetime import datetime, timedelta
 
+from instrumentation import count, timed
+
+# pandas is imported inside the query functions so that write-only users such
+# as collector.py don't pay its import time and memory
+
 # Database file name
 DB_FILE = "warehouse_temperature.db"
 
+# Sensor id used for readings that don't specify one (single-sensor setups)
+DEFAULT_SENSOR_ID = "default"
+
+# Lowest anomaly score recorded in anomaly_events (the most sensitive dashboard
+# setting); views pick their own threshold by filtering on the stored score.
+# About 5% of normally distributed readings score 2 or more
+ANOMALY_SCORE_FLOOR = 2.0
+
+# Pragmas for bulk loads: no fsync and an in-memory rollback journal trade crash
+# safety during the load for speed (an interrupted load can corrupt the file)
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA synchronous = OFF",
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144"
+)
+
+# Indexes on sensor_readings, dropped during bulk loads and recreated afterwards
+READING_INDEXES = {
+    'idx_sensor_readings_timestamp': "CREATE INDEX IF NOT EXISTS idx_sensor_readings_timestamp "
+                                     "ON sensor_readings (timestamp)"
+}
+
 def init_db():
     """Initialize the database with required tables if they don't exist."""
     conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
     
     # Create table for temperature and humidity readings
-    c.execute('''
+    c.execute(f'''
     CREATE TABLE IF NOT EXISTS sensor_readings (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp DATETIME NOT NULL,
         temperature REAL NOT NULL,
-        humidity REAL NOT NULL
+        humidity REAL NOT NULL,
+        sensor_id TEXT NOT NULL DEFAULT '{DEFAULT_SENSOR_ID}'
+    )
+    ''')
+    
+    # Databases created before multi-sensor support lack the sensor_id column
+    c.execute("PRAGMA table_info(sensor_readings)")
+    columns = [row[1] for row in c.fetchall()]
+    if 'sensor_id' not in columns:
+        c.execute(
+            f"ALTER TABLE sensor_readings ADD COLUMN sensor_id TEXT NOT NULL DEFAULT '{DEFAULT_SENSOR_ID}'"
+        )
+    
+    # Create table for the hour-of-day / day-of-week baseline lookup tables
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS seasonal_baselines (
+        sensor_id TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        last_id INTEGER NOT NULL,
+        stats BLOB NOT NULL,
+        PRIMARY KEY (sensor_id, metric)
+    )
+    ''')
+    
+    # Create table for detected anomalies (one event per reading and metric)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS anomaly_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reading_id INTEGER NOT NULL,
+        sensor_id TEXT NOT NULL,
+        timestamp DATETIME NOT NULL,
+        metric TEXT NOT NULL,
+        value REAL NOT NULL,
+        score REAL,
+        method TEXT NOT NULL,
+        detected_at DATETIME NOT NULL,
+        UNIQUE (reading_id, metric)
     )
     ''')
     
+    # Create table for the append-only alert log (one row per raise / clear transition)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS alert_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME NOT NULL,
+        sensor_id TEXT NOT NULL,
+        rule TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        event TEXT NOT NULL,
+        value REAL NOT NULL,
+        severity TEXT NOT NULL,
+        logged_at DATETIME NOT NULL,
+        reading_id INTEGER,
+        parameters TEXT
+    )
+    ''')
+    
+    # Logs created before transitions were tied to their reading and rule
+    # parameters lack reading_id and parameters
+    c.execute("PRAGMA table_info(alert_log)")
+    columns = [row[1] for row in c.fetchall()]
+    if 'reading_id' not in columns:
+        c.execute("ALTER TABLE alert_log ADD COLUMN reading_id INTEGER")
+    if 'parameters' not in columns:
+        c.execute("ALTER TABLE alert_log ADD COLUMN parameters TEXT")
+    
+    # Create table for per-hour quantile sketches of each sensor and metric (see sketches.py)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS reading_sketches (
+        bucket DATETIME NOT NULL,
+        sensor_id TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        last_id INTEGER NOT NULL,
+        sketch BLOB NOT NULL,
+        PRIMARY KEY (bucket, sensor_id, metric)
+    )
+    ''')
+    
+    # Indexes for time range queries
+    for statement in READING_INDEXES.values():
+        c.execute(statement)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_anomaly_events_timestamp ON anomaly_events (timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_anomaly_events_sensor_time ON anomaly_events (sensor_id, timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_alert_log_timestamp ON alert_log (timestamp)")
+    # One transition per reading, rule and rule parameters, however many engines evaluate it
+    c.execute("DROP INDEX IF EXISTS idx_alert_log_reading_rule")
+    c.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_alert_log_reading_rule_parameters "
+        "ON alert_log (reading_id, rule, parameters)"
+    )
+    
     conn.commit()
     conn.close()
 
-def store_readings(timestamp, temperature, humidity):
-    """Store temperature and humidity readings in the database."""
+@timed()
+def store_readings(timestamp, temperature, humidity, sensor_id=DEFAULT_SENSOR_ID):
+    """Store temperature and humidity readings in the database and return the new row id."""
     conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
     
     c.execute(
-        "INSERT INTO sensor_readings (timestamp, temperature, humidity) VALUES (?, ?, ?)",
-        (timestamp, temperature, humidity)
+        "INSERT INTO sensor_readings (timestamp, temperature, humidity, sensor_id) VALUES (?, ?, ?, ?)",
+        (timestamp, temperature, humidity, sensor_id)
+    )
+    
+    conn.commit()
+    conn.close()
+    count('readings_stored')
+    
+    return c.lastrowid
+
+@timed()
+def store_readings_batch(readings):
+    """
+    Store many readings in a single transaction.
+    
+    Args:
+        readings (list): List of (timestamp, temperature, humidity, sensor_id) tuples
+        
+    Returns:
+        int: Number of readings stored
+    """
+    if not readings:
+        return 0
+    
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    c.executemany(
+        "INSERT INTO sensor_readings (timestamp, temperature, humidity, sensor_id) VALUES (?, ?, ?, ?)",
+        readings
     )
     
     conn.commit()
     conn.close()
+    count('readings_stored', len(readings))
+    
+    return len(readings)
 
+@timed()
+def store_readings_bulk(chunks, defer_indexes=True):
+    """
+    Load large numbers of readings in one transaction with relaxed pragmas.
+    
+    Args:
+        chunks (iterable): Lists of (timestamp, temperature, humidity, sensor_id) tuples;
+                           timestamps as datetime or as text in the stored ISO format
+        defer_indexes (bool): Drop the reading indexes during the load and rebuild them
+                              afterwards (one sort instead of a B-tree update per row);
+                              worth it unless the table is much larger than the import
+        
+    Returns:
+        int: Number of readings stored
+    """
+    conn = sqlite3.connect(DB_FILE, isolation_level=None)
+    c = conn.cursor()
+    
+    for pragma in BULK_LOAD_PRAGMAS:
+        c.execute(pragma)
+    
+    stored = 0
+    c.execute("BEGIN")
+    try:
+        if defer_indexes:
+            for name in READING_INDEXES:
+                c.execute(f"DROP INDEX IF EXISTS {name}")
+        
+        for chunk in chunks:
+            c.executemany(
+                "INSERT INTO sensor_readings (timestamp, temperature, humidity, sensor_id) VALUES (?, ?, ?, ?)",
+                chunk
+            )
+            stored += len(chunk)
+        
+        for statement in READING_INDEXES.values():
+            c.execute(statement)
+        c.execute("COMMIT")
+    except BaseException:
+        c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    count('readings_stored', stored)
+    
+    return stored
+
+@timed()
 def get_readings_by_timeframe(hours=24):
     """
     Retrieve readings from a specific timeframe.
@@ -46,6 +241,8 @@ def get_readings_by_timeframe(hours=24):
     Returns:
         pandas.DataFrame: DataFrame containing the readings
     """
+    import pandas as pd
+    
     conn = sqlite3.connect(DB_FILE)
     
     if hours > 0:
@@ -62,10 +259,11 @@ def get_readings_by_timeframe(hours=24):
     
     # Convert timestamp to datetime
     if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
     
     return df
 
+@timed()
 def get_latest_readings(count=1):
     """
     Retrieve the latest readings from the database.
@@ -76,6 +274,8 @@ def get_latest_readings(count=1):
     Returns:
         pandas.DataFrame: DataFrame containing the latest readings
     """
+    import pandas as pd
+    
     conn = sqlite3.connect(DB_FILE)
     
     query = f"SELECT * FROM sensor_readings ORDER BY timestamp DESC LIMIT {count}"
@@ -85,22 +285,555 @@ def get_latest_readings(count=1):
     
     # Convert timestamp to datetime and sort by timestamp
     if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
         df = df.sort_values('timestamp')
     
     return df
 
+@timed()
+def get_readings_after_id(last_id=0):
+    """
+    Retrieve readings stored after a given row id.
+    
+    Args:
+        last_id (int): Only rows with an id greater than this are returned
+        
+    Returns:
+        pandas.DataFrame: DataFrame containing the new readings ordered by id
+    """
+    import pandas as pd
+    
+    conn = sqlite3.connect(DB_FILE)
+    
+    query = "SELECT * FROM sensor_readings WHERE id > ? ORDER BY id"
+    df = pd.read_sql_query(query, conn, params=(int(last_id),))
+    
+    conn.close()
+    
+    # Convert timestamp to datetime (whole-second values are stored without microseconds)
+    if not df.empty:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+    
+    return df
+
+@timed()
+def get_readings_between(start=None, end=None, sensor_id=None):
+    """
+    Retrieve readings from an absolute time range.
+    
+    Args:
+        start (datetime): Only readings at or after this time
+        end (datetime): Only readings before this time
+        sensor_id (str): Only readings from this sensor
+        
+    Returns:
+        pandas.DataFrame: DataFrame containing the readings ordered by timestamp
+    """
+    import pandas as pd
+    
+    conditions, params = _range_conditions(start, end, sensor_id)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    
+    conn = sqlite3.connect(DB_FILE)
+    
+    query = f"SELECT * FROM sensor_readings{where} ORDER BY timestamp"
+    df = pd.read_sql_query(query, conn, params=params)
+    
+    conn.close()
+    
+    if not df.empty:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+    
+    return df
+
+def iter_readings(hours=0, chunk_rows=50000):
+    """
+    Read readings from a timeframe in chunks without building a DataFrame.
+    
+    Args:
+        hours (int): Number of hours to look back. If 0, reads all data.
+        chunk_rows (int): Rows fetched per chunk
+        
+    Yields:
+        list: Up to chunk_rows (id, timestamp, temperature, humidity, sensor_id) tuples,
+              ordered by timestamp; timestamps are the stored text
+    """
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        c = conn.cursor()
+        if hours > 0:
+            start_time = datetime.now() - timedelta(hours=hours)
+            c.execute(
+                "SELECT id, timestamp, temperature, humidity, sensor_id FROM sensor_readings "
+                "WHERE timestamp >= ? ORDER BY timestamp",
+                (start_time,)
+            )
+        else:
+            c.execute(
+                "SELECT id, timestamp, temperature, humidity, sensor_id FROM sensor_readings ORDER BY timestamp"
+            )
+        
+        while True:
+            rows = c.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def get_latest_reading_id():
+    """
+    Retrieve the id of the most recently stored reading.
+
+    Returns:
+        int: Highest reading id, or 0 if no readings are stored
+    """
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+
+    c.execute("SELECT MAX(id) FROM sensor_readings")
+    latest_id = c.fetchone()[0]
+
+    conn.close()
+
+    return int(latest_id or 0)
+
+def get_latest_event_id():
+    """
+    Retrieve the id of the most recently recorded anomaly event.
+    
+    Returns:
+        int: Highest event id, or 0 if no events are recorded
+    """
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    c.execute("SELECT MAX(id) FROM anomaly_events")
+    latest_id = c.fetchone()[0]
+    
+    conn.close()
+    
+    return int(latest_id or 0)
+
+def _query_records(query, params=()):
+    """Run a query and return the rows as a list of dicts (no pandas overhead)."""
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    
+    rows = [dict(row) for row in conn.execute(query, params)]
+    
+    conn.close()
+    
+    return rows
+
+def _range_conditions(start=None, end=None, sensor_id=None, column='timestamp'):
+    """Build WHERE conditions and parameters for a time range and sensor filter."""
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{column} < ?")
+        params.append(end)
+    if sensor_id is not None:
+        conditions.append("sensor_id = ?")
+        params.append(sensor_id)
+    return conditions, params
+
+@timed()
+def get_readings_page(start=None, end=None, sensor_id=None, after_id=0, limit=500):
+    """
+    Retrieve one page of readings for cursor pagination.
+    
+    Pages are ordered by id, so the last id of a page is the cursor for the next
+    one and pages stay stable while new readings are appended.
+    
+    Args:
+        start (datetime): Only readings at or after this time
+        end (datetime): Only readings before this time
+        sensor_id (str): Only readings from this sensor
+        after_id (int): Only readings with an id greater than this (the cursor)
+        limit (int): Maximum number of readings
+        
+    Returns:
+        list: Readings as dicts with the sensor_readings columns
+    """
+    conditions, params = _range_conditions(start, end, sensor_id)
+    conditions.append("id > ?")
+    params.append(int(after_id))
+    
+    query = "SELECT * FROM sensor_readings WHERE " + " AND ".join(conditions) + " ORDER BY id LIMIT ?"
+    return _query_records(query, params + [int(limit)])
+
+@timed()
+def get_anomaly_events_page(start=None, end=None, metric=None, sensor_id=None, after_id=0, limit=500,
+                            min_score=None):
+    """
+    Retrieve one page of anomaly events for cursor pagination.
+    
+    Args:
+        start (datetime): Only events for readings at or after this time
+        end (datetime): Only events for readings before this time
+        metric (str): Only events for this metric ('temperature' or 'humidity')
+        sensor_id (str): Only events for this sensor
+        after_id (int): Only events with an id greater than this (the cursor)
+        limit (int): Maximum number of events
+        min_score (float): Only events scoring at least this (unscored events are left out)
+        
+    Returns:
+        list: Events as dicts with the anomaly_events columns
+    """
+    conditions, params = _range_conditions(start, end, sensor_id)
+    if metric is not None:
+        conditions.append("metric = ?")
+        params.append(metric)
+    if min_score is not None:
+        conditions.append("score >= ?")
+        params.append(min_score)
+    conditions.append("id > ?")
+    params.append(int(after_id))
+    
+    query = "SELECT * FROM anomaly_events WHERE " + " AND ".join(conditions) + " ORDER BY id LIMIT ?"
+    return _query_records(query, params + [int(limit)])
+
+# strftime formats that truncate a stored timestamp to the start of its bucket
+ROLLUP_BUCKETS = {
+    'minute': '%Y-%m-%d %H:%M:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00'
+}
+
+@timed()
+def get_rollups(bucket='hour', start=None, end=None, sensor_id=None):
+    """
+    Aggregate readings per time bucket and sensor inside SQLite.
+    
+    Args:
+        bucket (str): 'minute', 'hour' or 'day'
+        start (datetime): Only readings at or after this time
+        end (datetime): Only readings before this time
+        sensor_id (str): Only readings from this sensor
+        
+    Returns:
+        list: One dict per bucket and sensor with 'bucket', 'sensor_id', 'count' and
+              the mean/min/max of temperature and humidity
+    """
+    if bucket not in ROLLUP_BUCKETS:
+        raise ValueError(f"Unknown rollup bucket: {bucket}")
+    
+    conditions, params = _range_conditions(start, end, sensor_id)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    
+    query = f"""
+    SELECT strftime('{ROLLUP_BUCKETS[bucket]}', timestamp) AS bucket,
+           sensor_id,
+           COUNT(*) AS count,
+           AVG(temperature) AS temperature_mean,
+           MIN(temperature) AS temperature_min,
+           MAX(temperature) AS temperature_max,
+           AVG(humidity) AS humidity_mean,
+           MIN(humidity) AS humidity_min,
+           MAX(humidity) AS humidity_max
+    FROM sensor_readings{where}
+    GROUP BY bucket, sensor_id
+    ORDER BY bucket, sensor_id
+    """
+    return _query_records(query, params)
+
+def get_latest_sketch_id():
+    """
+    Retrieve the id of the latest reading folded into the quantile sketches.
+    
+    Returns:
+        int: Highest reading id covered by the sketches, or 0 if none are stored
+    """
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    c.execute("SELECT MAX(last_id) FROM reading_sketches")
+    last_id = c.fetchone()[0]
+    
+    conn.close()
+    
+    return int(last_id or 0)
+
+def get_latest_sketch_bucket():
+    """
+    Retrieve the start of the latest hour covered by the quantile sketches.
+    
+    Hours before it are complete as of the last refresh; it may be partial.
+    
+    Returns:
+        datetime: Start of the latest sketched hour, or None if none are stored
+    """
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    c.execute("SELECT MAX(bucket) FROM reading_sketches")
+    bucket = c.fetchone()[0]
+    
+    conn.close()
+    
+    return datetime.fromisoformat(bucket) if bucket is not None else None
+
+def save_sketches(records):
+    """
+    Store quantile sketches, replacing the previous sketch of the same bucket.
+    
+    Args:
+        records (list): (bucket, sensor_id, metric, count, last_id, sketch) tuples
+                        where sketch is the serialized digest
+    """
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    c.executemany(
+        "INSERT OR REPLACE INTO reading_sketches (bucket, sensor_id, metric, count, last_id, sketch) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        records
+    )
+    
+    conn.commit()
+    conn.close()
+
+def load_sketches(metric, start=None, end=None, sensor_id=None):
+    """
+    Retrieve the stored quantile sketches of a metric.
+    
+    Args:
+        metric (str): 'temperature' or 'humidity'
+        start (datetime): Only buckets starting at or after this time
+        end (datetime): Only buckets starting before this time
+        sensor_id (str): Only sketches of this sensor
+        
+    Returns:
+        list: (bucket, sensor_id, count, sketch) tuples ordered by bucket
+    """
+    conditions, params = _range_conditions(start, end, sensor_id, column='bucket')
+    conditions.append("metric = ?")
+    params.append(metric)
+    
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    c.execute(
+        "SELECT bucket, sensor_id, count, sketch FROM reading_sketches WHERE "
+        + " AND ".join(conditions) + " ORDER BY bucket, sensor_id",
+        params
+    )
+    rows = c.fetchall()
+    
+    conn.close()
+    
+    return rows
+
+def save_seasonal_baseline(records):
+    """
+    Store seasonal baseline tables, replacing any previous version.
+    
+    Args:
+        records (list): List of (sensor_id, metric, last_id, stats) tuples where
+                        stats is the serialized lookup table
+    """
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    c.executemany(
+        "INSERT OR REPLACE INTO seasonal_baselines (sensor_id, metric, last_id, stats) VALUES (?, ?, ?, ?)",
+        records
+    )
+    
+    conn.commit()
+    conn.close()
+
+def load_seasonal_baseline():
+    """
+    Retrieve the stored seasonal baseline tables.
+    
+    Returns:
+        pandas.DataFrame: DataFrame with 'sensor_id', 'metric', 'last_id' and 'stats' columns
+    """
+    import pandas as pd
+    
+    conn = sqlite3.connect(DB_FILE)
+    
+    query = "SELECT sensor_id, metric, last_id, stats FROM seasonal_baselines"
+    df = pd.read_sql_query(query, conn)
+    
+    conn.close()
+    
+    return df
+
+def store_anomaly_events(events):
+    """
+    Append detected anomaly events, ignoring readings that were already recorded.
+    
+    Args:
+        events (list): List of (reading_id, sensor_id, timestamp, metric, value, score, method) tuples
+        
+    Returns:
+        int: Number of new events stored
+    """
+    if not events:
+        return 0
+    
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    detected_at = datetime.now()
+    c.executemany(
+        """INSERT OR IGNORE INTO anomaly_events
+           (reading_id, sensor_id, timestamp, metric, value, score, method, detected_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        [tuple(event) + (detected_at,) for event in events]
+    )
+    
+    conn.commit()
+    stored = conn.total_changes
+    conn.close()
+    count('anomaly_events_stored', stored)
+    
+    return stored
+
+def get_anomaly_events(hours=24, metric=None, sensor_id=None, min_score=None):
+    """
+    Retrieve recorded anomaly events from a specific timeframe.
+    
+    Args:
+        hours (int): Number of hours to look back. If 0, returns all events.
+        metric (str): Only return events for this metric ('temperature' or 'humidity')
+        sensor_id (str): Only return events for this sensor
+        min_score (float): Only return events scoring at least this (the detection
+                           threshold). Events without a score are left out
+        
+    Returns:
+        pandas.DataFrame: DataFrame containing the events. When a metric is given,
+                          the 'value' column is named after the metric
+    """
+    import pandas as pd
+    
+    conn = sqlite3.connect(DB_FILE)
+    
+    conditions = []
+    params = []
+    if hours > 0:
+        conditions.append("timestamp >= ?")
+        params.append(datetime.now() - timedelta(hours=hours))
+    if metric is not None:
+        conditions.append("metric = ?")
+        params.append(metric)
+    if sensor_id is not None:
+        conditions.append("sensor_id = ?")
+        params.append(sensor_id)
+    if min_score is not None:
+        conditions.append("score >= ?")
+        params.append(min_score)
+    
+    query = "SELECT * FROM anomaly_events"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY timestamp"
+    df = pd.read_sql_query(query, conn, params=params)
+    
+    conn.close()
+    
+    # Convert timestamps to datetime
+    if not df.empty:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+        df['detected_at'] = pd.to_datetime(df['detected_at'], format='ISO8601')
+    
+    if metric is not None:
+        df = df.rename(columns={'value': metric})
+    
+    return df
+
+def store_alert_events(events):
+    """
+    Append alert transitions to the alert log.
+    
+    A transition already logged for the same reading, rule and rule parameters
+    is skipped.
+    
+    Args:
+        events (list): List of (timestamp, sensor_id, rule, metric, event, value, severity,
+            reading_id, parameters) tuples; reading_id may be None and parameters is
+            the JSON of the rule parameters that applied
+        
+    Returns:
+        int: Number of log entries stored
+    """
+    if not events:
+        return 0
+    
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    
+    logged_at = datetime.now()
+    c.executemany(
+        """INSERT OR IGNORE INTO alert_log
+           (timestamp, sensor_id, rule, metric, event, value, severity, reading_id, parameters, logged_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [tuple(event) + (logged_at,) for event in events]
+    )
+    stored = conn.total_changes
+    
+    conn.commit()
+    conn.close()
+    
+    return stored
+
+def get_alert_log(hours=24, sensor_id=None):
+    """
+    Retrieve alert log entries from a specific timeframe.
+    
+    Args:
+        hours (int): Number of hours to look back. If 0, returns all entries.
+        sensor_id (str): Only return entries for this sensor
+        
+    Returns:
+        pandas.DataFrame: DataFrame containing the log entries ordered by time
+    """
+    import pandas as pd
+    
+    conditions, params = _range_conditions(
+        start=datetime.now() - timedelta(hours=hours) if hours > 0 else None,
+        sensor_id=sensor_id
+    )
+    query = "SELECT * FROM alert_log"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY timestamp, id"
+    
+    conn = sqlite3.connect(DB_FILE)
+    df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    # Convert timestamps to datetime
+    if not df.empty:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+        df['logged_at'] = pd.to_datetime(df['logged_at'], format='ISO8601')
+    
+    return df
+
 def clear_old_data(days=30):
-    """Delete data older than specified days to manage database size."""
+    """
+    Delete data older than specified days to manage database size.
+    
+    Anomaly events and alert log entries of the deleted readings go with them;
+    quantile sketches are kept (see sketches.py).
+    """
     conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
     
     # Calculate cutoff date
     cutoff_date = datetime.now() - timedelta(days=days)
     
+    c.execute("DELETE FROM anomaly_events WHERE timestamp < ?", (cutoff_date,))
+    c.execute("DELETE FROM alert_log WHERE timestamp < ?", (cutoff_date,))
     c.execute("DELETE FROM sensor_readings WHERE timestamp < ?", (cutoff_date,))
     
     conn.commit()
     conn.close()
     
-    return c.rowcount  # Return number of deleted rows
+    return c.rowcount  # Return number of deleted readings
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# Default number of points sent to the browser per series (about two per
+# horizontal pixel of a half-width dashboard chart)
+DEFAULT_POINT_BUDGET = 1200
+
+# Downsampling methods: LTTB keeps the visual shape, the min/max envelope keeps
+# every bucket's extremes (no peak is ever lost, at twice the points per bucket)
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+def point_budget(width_px=600, points_per_pixel=2):
+    """
+    Calculate a point budget from the rendered chart width.
+
+    Args:
+        width_px (int): Width of the plotting area in pixels
+        points_per_pixel (int): Points kept per horizontal pixel
+
+    Returns:
+        int: Maximum number of points to send for one series
+    """
+    return max(int(width_px * points_per_pixel), 3)
+
+def _bucket_edges(n, n_buckets, offset=0):
+    """Split n points into n_buckets contiguous buckets of near-equal size."""
+    return offset + np.floor(np.linspace(0, n, n_buckets + 1)).astype(np.int64)
+
+def lttb_indices(x, y, n_out):
+    """
+    Select points with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept. Each bucket in between keeps the
+    point forming the largest triangle with the previously selected point and the
+    average of the next bucket, which preserves peaks and the visual shape.
+
+    Args:
+        x (np.ndarray): Monotonic x values (e.g. timestamps as numbers)
+        y (np.ndarray): y values
+        n_out (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the selected points
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Buckets cover the points between the fixed first and last points
+    edges = _bucket_edges(n - 2, n_out - 2, offset=1)
+    sizes = np.diff(edges)
+
+    # Average of every bucket, computed in one pass; the last point acts as the final "next bucket"
+    avg_x = np.append(np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        bx = x[start:end]
+        by = y[start:end]
+
+        # Twice the triangle area between the selected point, each candidate and the next average
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+def minmax_indices(y, n_buckets):
+    """
+    Select the minimum and maximum point of each bucket (min/max envelope).
+
+    Args:
+        y (np.ndarray): y values
+        n_buckets (int): Number of buckets; at most 2 * n_buckets points are kept
+
+    Returns:
+        np.ndarray: Sorted indices of the selected points
+    """
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    edges = _bucket_edges(n, n_buckets)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+    # First occurrence of each bucket's minimum and maximum
+    mins = np.minimum.reduceat(y, edges[:-1])
+    maxs = np.maximum.reduceat(y, edges[:-1])
+    min_positions = np.flatnonzero(y == mins[bucket])
+    max_positions = np.flatnonzero(y == maxs[bucket])
+    _, first_min = np.unique(bucket[min_positions], return_index=True)
+    _, first_max = np.unique(bucket[max_positions], return_index=True)
+
+    return np.union1d(min_positions[first_min], max_positions[first_max])
+
+def downsample(data, column, budget=DEFAULT_POINT_BUDGET, method='lttb', keep=None):
+    """
+    Reduce a time series to a point budget while preserving its visual shape.
+
+    Args:
+        data (pd.DataFrame): DataFrame with 'timestamp' and the value column
+        column (str): Name of the value column
+        budget (int): Maximum number of points to keep (excluding forced points)
+        method (str): 'lttb' or 'minmax'
+        keep (array-like): Optional boolean mask of rows that must be kept (e.g. anomalies),
+            in addition to the budget
+
+    Returns:
+        pd.DataFrame: Subset of the rows in their original order
+    """
+    if len(data) <= budget:
+        return data
+
+    # Missing values cannot be ranked; drop them before selecting points
+    valid = data[column].notna().to_numpy()
+    if not valid.all():
+        data = data[valid]
+        if keep is not None:
+            keep = np.asarray(keep)[valid]
+        if len(data) <= budget:
+            return data
+
+    y = data[column].to_numpy(dtype=float)
+    if method == 'lttb':
+        x = pd.to_datetime(data['timestamp']).to_numpy().astype('datetime64[ns]').astype(np.int64)
+        indices = lttb_indices(x, y, budget)
+    elif method == 'minmax':
+        indices = minmax_indices(y, budget // 2)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    if keep is not None:
+        indices = np.union1d(indices, np.flatnonzero(np.asarray(keep)))
+
+    return data.iloc[indices]
@@ -0,0 +1,274 @@
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+from database import DEFAULT_SENSOR_ID, store_readings, get_latest_readings
+from instrumentation import stage, tick
+from mock_data import SensorSimulator
+
+# Seconds between two samples taken by the hub
+DEFAULT_SAMPLE_INTERVAL = 3.0
+
+# Readings kept in memory for subscribers (20 minutes at the default interval)
+DEFAULT_BUFFER_SIZE = 400
+
+# Subscribers that have not polled for this many seconds are dropped, so a
+# closed browser tab does not keep the hub sampling forever
+DEFAULT_LEASE_SECONDS = 30.0
+
+READING_COLUMNS = ['id', 'timestamp', 'temperature', 'humidity', 'sensor_id']
+
+class AcquisitionHub:
+    """
+    Process-wide owner of sensor acquisition.
+
+    A single background thread reads the sensor (or the mock generator), stores
+    each reading once and publishes it into a ring buffer. Any number of
+    dashboard sessions subscribe and poll the buffer with their own cursor, so
+    the number of viewers does not change the ingestion load and only one
+    thread ever opens the serial port.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, buffer_size=DEFAULT_BUFFER_SIZE,
+                 lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self._buffer = deque(maxlen=buffer_size)  # (sequence, reading) pairs
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._subscribers = {}  # subscriber id -> [cursor, last poll time]
+        self._subscriber_ids = itertools.count(1)
+        self._thread = None
+        self._stop = threading.Event()
+        self.use_real_sensors = False
+        self.serial_port = '/dev/ttyUSB0'
+        self.baud_rate = 9600
+        self.error = None
+        # Mock sensor owned by this hub, independent of other simulators in the process
+        self._simulator = SensorSimulator()
+
+    @property
+    def running(self):
+        """bool: True while the acquisition thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def settings(self):
+        """tuple: (use_real_sensors, serial_port, baud_rate) used for the next samples."""
+        with self._condition:
+            return self.use_real_sensors, self.serial_port, self.baud_rate
+
+    def configure(self, use_real_sensors=False, serial_port='/dev/ttyUSB0', baud_rate=9600):
+        """
+        Select the data source used for the next samples (also while acquisition runs).
+
+        Args:
+            use_real_sensors (bool): Read from the serial port instead of mock data
+            serial_port (str): Serial port to connect to
+            baud_rate (int): Baud rate for the serial connection
+        """
+        with self._condition:
+            self.use_real_sensors = use_real_sensors
+            self.serial_port = serial_port
+            self.baud_rate = baud_rate
+
+    def subscribe(self):
+        """
+        Register a subscriber and start acquisition if it is not running.
+
+        Returns:
+            int: Subscriber id to pass to poll() and unsubscribe()
+        """
+        with self._condition:
+            subscriber_id = next(self._subscriber_ids)
+            self._subscribers[subscriber_id] = [self._sequence, time.monotonic()]
+            self._ensure_running()
+        return subscriber_id
+
+    def unsubscribe(self, subscriber_id):
+        """
+        Remove a subscriber; acquisition stops when the last one leaves.
+
+        Args:
+            subscriber_id (int): Id returned by subscribe()
+        """
+        with self._condition:
+            self._subscribers.pop(subscriber_id, None)
+            if not self._subscribers:
+                self._stop.set()
+
+    def poll(self, subscriber_id, timeout=0):
+        """
+        Get the readings published since the subscriber's last poll.
+
+        Args:
+            subscriber_id (int): Id returned by subscribe()
+            timeout (float): Seconds to wait for a new reading if none is pending
+
+        Returns:
+            tuple: (readings, error) where readings is a list of reading dicts and
+                error is the acquisition error message or None
+        """
+        with self._condition:
+            subscriber = self._subscribers.get(subscriber_id)
+            if subscriber is None:
+                # Lease expired or hub restarted; resubscribe from the current position
+                subscriber = [self._sequence, time.monotonic()]
+                self._subscribers[subscriber_id] = subscriber
+            if self.error is None:
+                self._ensure_running()
+
+            if timeout and self._sequence == subscriber[0] and self.error is None:
+                self._condition.wait(timeout)
+
+            readings = [reading for sequence, reading in self._buffer if sequence > subscriber[0]]
+            subscriber[0] = self._sequence
+            subscriber[1] = time.monotonic()
+            return readings, self.error
+
+    def snapshot(self, count=30):
+        """
+        Get the latest buffered readings.
+
+        Args:
+            count (int): Number of latest readings to return
+
+        Returns:
+            pandas.DataFrame: Readings ordered by timestamp, same columns as the database
+        """
+        with self._condition:
+            readings = [reading for _, reading in list(self._buffer)[-count:]]
+        return pd.DataFrame(readings, columns=READING_COLUMNS)
+
+    def publish(self, reading):
+        """
+        Append a reading to the buffer and wake up waiting subscribers.
+
+        Args:
+            reading (dict): Reading with the keys in READING_COLUMNS
+        """
+        with self._condition:
+            self._sequence += 1
+            self._buffer.append((self._sequence, reading))
+            self._condition.notify_all()
+
+    def stop(self):
+        """Stop acquisition and wait for the thread to finish."""
+        with self._condition:
+            self._stop.set()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.interval + 5)
+
+    def _ensure_running(self):
+        # Caller holds the condition lock. The thread only decides to exit while
+        # holding the lock (see _keep_running), so either it is still going to
+        # see the cleared stop flag or it has already detached and a new one starts
+        if self.running:
+            self._stop.clear()
+        else:
+            self._start()
+
+    def _start(self):
+        # Caller holds the condition lock
+        self.error = None
+        self._stop.clear()
+        if not self._buffer:
+            self._preload()
+        self._thread = threading.Thread(target=self._run, name="acquisition-hub", daemon=True)
+        self._thread.start()
+
+    def _preload(self):
+        # Seed the buffer with stored readings so new viewers see a chart immediately
+        latest = get_latest_readings(self._buffer.maxlen)
+        for row in latest.reindex(columns=READING_COLUMNS).itertuples(index=False):
+            self._sequence += 1
+            self._buffer.append((self._sequence, {
+                'id': int(row.id),
+                'timestamp': row.timestamp,
+                'temperature': row.temperature,
+                'humidity': row.humidity,
+                'sensor_id': row.sensor_id
+            }))
+
+    def _read(self):
+        use_real_sensors, serial_port, baud_rate = self.settings
+        if use_real_sensors:
+            # Imported here so mock-only setups don't need pyserial
+            from sensor import read_serial_data
+            try:
+                return read_serial_data(serial_port, baud_rate)
+            except Exception as e:
+                raise RuntimeError(f"Lỗi đọc từ cổng serial: {e}") from e
+        temperatures, humidities = self._simulator.read()
+        return float(temperatures[0]), float(humidities[0])
+
+    def _detach(self):
+        # Caller holds the condition lock; the acquisition thread is about to exit
+        if self._thread is threading.current_thread():
+            self._thread = None
+
+    def _keep_running(self):
+        # Expire idle subscribers and decide atomically whether to take another sample
+        with self._condition:
+            cutoff = time.monotonic() - self.lease_seconds
+            for subscriber_id, (_, last_poll) in list(self._subscribers.items()):
+                if last_poll < cutoff:
+                    del self._subscribers[subscriber_id]
+            if self._stop.is_set() or not self._subscribers:
+                self._detach()
+                return False
+            return True
+
+    def _fail(self, message):
+        with self._condition:
+            self.error = message
+            self._subscribers.clear()
+            self._detach()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+
+            if not self._keep_running():
+                break
+
+            # One acquisition tick: read, store and publish a sample
+            with tick('acquisition'):
+                try:
+                    with stage('read_sensor'):
+                        temperature, humidity = self._read()
+                except RuntimeError as e:
+                    self._fail(str(e))
+                    break
+                except Exception as e:
+                    self._fail(f"Đã xảy ra lỗi: {e}")
+                    break
+
+                if temperature is None or humidity is None:
+                    self._fail("Không nhận được dữ liệu hợp lệ")
+                    break
+
+                timestamp = datetime.now()
+                try:
+                    reading_id = store_readings(timestamp, temperature, humidity)
+                except Exception as e:
+                    self._fail(f"Đã xảy ra lỗi: {e}")
+                    break
+
+                with stage('publish'):
+                    self.publish({
+                        'id': reading_id,
+                        'timestamp': pd.Timestamp(timestamp),
+                        'temperature': temperature,
+                        'humidity': humidity,
+                        'sensor_id': DEFAULT_SENSOR_ID
+                    })
+
+            # Keep a steady cadence regardless of how long the read took
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0))
@@ -0,0 +1,251 @@
+"""
+Lightweight per-stage timing of the monitoring loop.
+
+Stages are timed with a context manager or a decorator and recorded in
+fixed-bucket histograms (a counter increment per call, no samples kept). A
+tick groups the stages of one pass of a loop (an acquisition cycle, a
+dashboard refresh); ticks slower than a threshold are kept in a rolling log
+together with their per-stage breakdown.
+
+Counters (readings stored, failed reads, ...) are kept next to the
+histograms; metrics.py exports both in the Prometheus text format.
+
+Timings are process-wide and thread-safe, so the acquisition thread and every
+dashboard session report into the same tables. Only the standard library is
+used, so low-level modules such as database.py can be instrumented.
+
+Usage:
+    from instrumentation import count, stage, tick, timed
+
+    @timed('detect_anomalies')
+    def detect_anomalies(...): ...
+
+    with tick('acquisition'):
+        with stage('read_sensor'):
+            ...
+        count('readings_stored')
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+# Histogram bucket upper bounds in seconds: 0.1 ms doubling up to about 13 s
+HISTOGRAM_BOUNDS = tuple(0.0001 * 2 ** k for k in range(18))
+
+# Ticks taking longer than this (seconds) are written to the slow tick log
+SLOW_TICK_SECONDS = 1.0
+
+# Slow ticks kept in the rolling log
+SLOW_TICK_LOG_SIZE = 50
+
+class Histogram:
+    """Duration histogram with fixed log-spaced buckets."""
+
+    __slots__ = ('counts', 'count', 'total', 'maximum', 'last')
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.last = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self.last = seconds
+
+    def percentile(self, q):
+        """
+        Estimate a percentile as the upper bound of the bucket holding it.
+
+        Args:
+            q (float): Percentile between 0 and 100
+
+        Returns:
+            float: Estimated duration in seconds (at most the maximum seen)
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+class Timings:
+    """
+    Registry of stage histograms, counters and the slow tick log.
+
+    Args:
+        slow_tick_seconds (float): Default threshold of the slow tick log
+        log_size (int): Slow ticks kept
+    """
+
+    def __init__(self, slow_tick_seconds=SLOW_TICK_SECONDS, log_size=SLOW_TICK_LOG_SIZE):
+        self.slow_tick_seconds = slow_tick_seconds
+        self.enabled = True
+        self._histograms = {}
+        self._counters = {}
+        self._slow_ticks = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+        # Stage durations of the tick running on each thread
+        self._local = threading.local()
+
+    def record(self, name, seconds):
+        """Record one duration of a stage."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.record(seconds)
+
+        current = getattr(self._local, 'stages', None)
+        if current is not None:
+            current.append((name, seconds))
+
+    def count(self, name, value=1):
+        """Add value to counter name."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage name."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name=None):
+        """Decorator timing every call of a function (as its name by default)."""
+        def decorator(function):
+            stage_name = name or function.__name__
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def tick(self, name, slow_seconds=None):
+        """
+        Time one pass of a loop; stages timed inside it on the same thread form its breakdown.
+
+        Also usable as a decorator. Ticks slower than slow_seconds (the registry
+        default if None) are added to the slow tick log.
+        """
+        if not self.enabled:
+            yield
+            return
+        outer = getattr(self._local, 'stages', None)
+        self._local.stages = stages = []
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.stages = outer
+            self.record(name, elapsed)
+
+            threshold = self.slow_tick_seconds if slow_seconds is None else slow_seconds
+            if elapsed >= threshold:
+                breakdown = {}
+                for stage_name, seconds in stages:
+                    breakdown[stage_name] = breakdown.get(stage_name, 0.0) + seconds
+                with self._lock:
+                    self._slow_ticks.append({
+                        'time': datetime.now(),
+                        'tick': name,
+                        'total_ms': elapsed * 1000,
+                        'stages': {stage_name: seconds * 1000 for stage_name, seconds in breakdown.items()}
+                    })
+
+    def summary(self):
+        """
+        Summarize every stage.
+
+        Returns:
+            list: One dict per stage with 'stage', 'count' and the mean, p50, p95,
+                  p99, max and last duration in milliseconds; slowest total first
+        """
+        with self._lock:
+            rows = [
+                {
+                    'stage': name,
+                    'count': histogram.count,
+                    'mean_ms': histogram.total / histogram.count * 1000,
+                    'p50_ms': histogram.percentile(50) * 1000,
+                    'p95_ms': histogram.percentile(95) * 1000,
+                    'p99_ms': histogram.percentile(99) * 1000,
+                    'max_ms': histogram.maximum * 1000,
+                    'last_ms': histogram.last * 1000,
+                    'total_s': histogram.total
+                }
+                for name, histogram in self._histograms.items() if histogram.count
+            ]
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def histograms(self):
+        """
+        Copy the stage histograms.
+
+        Returns:
+            dict: Stage name -> (bucket counts, count, total seconds), buckets as
+                  in HISTOGRAM_BOUNDS plus a final overflow bucket
+        """
+        with self._lock:
+            return {
+                name: (list(histogram.counts), histogram.count, histogram.total)
+                for name, histogram in self._histograms.items()
+            }
+
+    def counters(self):
+        """
+        Copy the counters.
+
+        Returns:
+            dict: Counter name -> value
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def slow_ticks(self):
+        """
+        Get the slow tick log.
+
+        Returns:
+            list: Slow ticks, newest first, as dicts with 'time', 'tick', 'total_ms'
+                  and 'stages' (stage name -> milliseconds)
+        """
+        with self._lock:
+            return list(reversed(self._slow_ticks))
+
+    def reset(self):
+        """Forget all recorded timings and slow ticks (counters keep counting)."""
+        with self._lock:
+            self._histograms.clear()
+            self._slow_ticks.clear()
+
+# Process-wide registry
+TIMINGS = Timings()
+
+count = TIMINGS.count
+stage = TIMINGS.stage
+tick = TIMINGS.tick
+timed = TIMINGS.timed
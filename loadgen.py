@@ -0,0 +1,373 @@
+"""
+Load generator driving the real ingestion path.
+
+Replays recorded readings (from a database file) or vectorized mock data for
+any number of sensors through the same path the collector uses: buffered
+writes with store_readings_batch (a batch size of 1 writes every reading in its
+own transaction), periodic anomaly detection and alert rule evaluation. The data is played back faster than real time by a
+speed-up factor; with several factors the run ramps up step by step and stops
+at the first step the ingestion cannot keep up with.
+
+Each step reports the offered and sustained rate, end-to-end latency
+percentiles (from the moment a reading is due until it is stored and its alerts
+are evaluated) and the ingestion queue depth.
+
+Usage:
+    python loadgen.py --sensors 20 --speedup 1 10 100 1000
+    python loadgen.py --replay warehouse_temperature.db --speedup 50 --step-duration 30
+    python loadgen.py --sensors 100 --batch-size 1 --detect-interval 10 --speedup 10 100
+"""
+
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import database
+from alerts import AlertEngine, threshold_rules
+from collector import DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL, DEFAULT_INTERVAL, Collector
+from mock_data import SensorSimulator
+
+# Speed-up factors of the default ramp
+DEFAULT_SPEEDUPS = [1, 10, 100, 1000]
+
+# Wall-clock seconds each speed-up factor is held
+DEFAULT_STEP_DURATION = 10.0
+
+# A step falls behind when this many seconds of offered readings are still queued
+# at its end, or the sustained rate stays below this share of the offered rate
+BACKLOG_LIMIT_SECONDS = 1.0
+SUSTAINED_RATE_SHARE = 0.95
+
+# Producer wake-up period (seconds); readings due in between are emitted together
+PRODUCER_TICK = 0.005
+
+class ReplaySource:
+    """
+    Readings recorded in a database file, replayed in timestamp order.
+
+    The recording is repeated (shifted by its span) when a run outlasts it, and
+    cloned under suffixed sensor ids when more sensors are requested than it holds.
+
+    Args:
+        db_file (str): Database file to replay
+        sensors (int): Copies of every recorded sensor (1 replays the recording as is)
+    """
+
+    def __init__(self, db_file, sensors=1):
+        conn = sqlite3.connect(db_file)
+        rows = conn.execute(
+            "SELECT timestamp, temperature, humidity, sensor_id FROM sensor_readings ORDER BY timestamp"
+        ).fetchall()
+        conn.close()
+        if not rows:
+            raise ValueError(f"No readings to replay in {db_file}")
+
+        timestamps, temperatures, humidities, sensor_ids = zip(*rows)
+        times = pd.to_datetime(pd.Series(timestamps), format='ISO8601').to_numpy()
+        self.offsets = (times - times[0]) / np.timedelta64(1, 's')
+        self.temperatures = np.array(temperatures, dtype=float)
+        self.humidities = np.array(humidities, dtype=float)
+        self.sensor_ids = np.array(sensor_ids)
+        self.copies = sensors
+        # Keep the spacing between the end of one repetition and the start of the next
+        self.span = self.offsets[-1] + (np.median(np.diff(self.offsets)) if len(rows) > 1 else DEFAULT_INTERVAL)
+
+    @property
+    def sensor_count(self):
+        return len(np.unique(self.sensor_ids)) * self.copies
+
+    def window(self, start, end):
+        """
+        Readings with a data time offset in [start, end) seconds.
+
+        Returns:
+            tuple: (offsets, temperatures, humidities, sensor_ids) arrays ordered by offset
+        """
+        parts = []
+        for repetition in range(int(start // self.span), int(np.ceil(end / self.span))):
+            shift = repetition * self.span
+            low, high = np.searchsorted(self.offsets + shift, [start, end])
+            parts.append((self.offsets[low:high] + shift, slice(low, high)))
+
+        offsets = np.concatenate([part[0] for part in parts])
+        rows = np.concatenate([np.arange(len(self.offsets))[part[1]] for part in parts])
+        if self.copies == 1:
+            return offsets, self.temperatures[rows], self.humidities[rows], self.sensor_ids[rows]
+
+        suffixes = np.tile([f"_{copy + 1}" for copy in range(self.copies)], len(rows))
+        return (
+            np.repeat(offsets, self.copies),
+            np.repeat(self.temperatures[rows], self.copies),
+            np.repeat(self.humidities[rows], self.copies),
+            np.char.add(np.repeat(self.sensor_ids[rows], self.copies).astype(str), suffixes)
+        )
+
+class MockSource:
+    """
+    Simulated sensors advanced together (see mock_data.SensorSimulator).
+
+    Args:
+        sensors (int): Number of sensors
+        interval (float): Seconds of data time between two readings of a sensor
+        seed (int): Seed of the simulator
+    """
+
+    def __init__(self, sensors=1, interval=DEFAULT_INTERVAL, seed=None):
+        self.sensor_count = sensors
+        self.interval = interval
+        self.simulator = SensorSimulator(sensors, seed)
+
+    def window(self, start, end):
+        """
+        Readings with a data time offset in [start, end) seconds.
+
+        Returns:
+            tuple: (offsets, temperatures, humidities, sensor_ids) arrays ordered by offset
+        """
+        first = int(np.ceil(start / self.interval))
+        steps = max(int(np.ceil(end / self.interval)) - first, 0)
+        # The simulator continues where the previous window ended
+        data = self.simulator.generate(steps, interval_seconds=self.interval)
+        offsets = np.repeat((first + np.arange(steps)) * self.interval, self.sensor_count)
+        return offsets, data['temperature'], data['humidity'], data['sensor_id']
+
+class Ingestion(threading.Thread):
+    """
+    Consumer feeding queued readings through the collector's write and detection
+    path and the alert engine, recording per-reading latency.
+
+    Args:
+        collector (Collector): Collector providing flush() and detect()
+        engine (AlertEngine): Alert engine evaluated on every flushed batch
+    """
+
+    def __init__(self, collector, engine):
+        super().__init__(daemon=True)
+        self.collector = collector
+        self.engine = engine
+        self.queue = queue.Queue()
+        self.queued = 0
+        self.queued_lock = threading.Lock()
+        self.latencies = []
+        self.processed = 0
+        self.error = None
+
+    def submit(self, due, rows):
+        """Queue readings due at the perf_counter time due."""
+        with self.queued_lock:
+            self.queued += len(rows)
+        self.queue.put((due, rows))
+
+    def depth(self):
+        """Readings waiting to be stored."""
+        with self.queued_lock:
+            return self.queued
+
+    def _flush(self, due_times):
+        """Store the buffered readings, evaluate alerts on them and record latencies."""
+        batch = self.collector.pending
+        self.collector.flush()
+        self.engine.evaluate(pd.DataFrame(batch, columns=['timestamp', 'temperature', 'humidity', 'sensor_id']))
+        done = time.perf_counter()
+        self.latencies.extend(done - due for due in due_times)
+        self.processed += len(batch)
+        with self.queued_lock:
+            self.queued -= len(batch)
+
+    def run(self):
+        collector = self.collector
+        due_times = []
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=min(collector.flush_interval, 0.1))
+                except queue.Empty:
+                    item = None
+                if item is False:
+                    break
+
+                if item is not None:
+                    due, rows = item
+                    collector.pending.extend(rows)
+                    due_times.extend([due] * len(rows))
+
+                now = time.monotonic()
+                if collector.pending and (len(collector.pending) >= collector.batch_size or
+                                          now - collector.last_flush >= collector.flush_interval):
+                    self._flush(due_times)
+                    due_times = []
+                if collector.detect_interval and now - collector.last_detection >= collector.detect_interval:
+                    # detect() flushes first, so account for those readings too
+                    if collector.pending:
+                        self._flush(due_times)
+                        due_times = []
+                    collector.detect()
+
+            if collector.pending:
+                self._flush(due_times)
+        except Exception as e:
+            self.error = e
+
+    def stop(self):
+        self.queue.put(False)
+        self.join()
+
+def run_step(source, ingestion, speedup, duration, data_start, wall_origin):
+    """
+    Offer readings for one speed-up factor and measure how ingestion keeps up.
+
+    Args:
+        source: ReplaySource or MockSource
+        ingestion (Ingestion): Running consumer
+        speedup (float): Seconds of data time played per wall-clock second
+        duration (float): Wall-clock seconds to hold this factor
+        data_start (float): Data time offset (seconds) at which the step starts
+        wall_origin (datetime): Stored timestamp of data offset 0
+
+    Returns:
+        dict: Step results, including 'data_end', the data offset reached
+    """
+    data_end = data_start + duration * speedup
+    offsets, temperatures, humidities, sensor_ids = source.window(data_start, data_end)
+    timestamps = (np.datetime64(wall_origin, 'us') +
+                  (offsets * 1e6).astype('timedelta64[us]')).astype(datetime)
+    rows = list(zip(timestamps, temperatures.tolist(), humidities.tolist(), sensor_ids.tolist()))
+
+    processed_before = ingestion.processed
+    latencies_before = len(ingestion.latencies)
+    max_depth = 0
+    emitted = 0
+    started = time.perf_counter()
+
+    while emitted < len(rows):
+        now = time.perf_counter()
+        # Everything due by now, in data time
+        due_count = int(np.searchsorted(offsets, data_start + (now - started) * speedup, 'right'))
+        if due_count > emitted:
+            # Latency is measured from when the reading became due, not when the producer noticed
+            due = started + (offsets[emitted] - data_start) / speedup
+            ingestion.submit(due, rows[emitted:due_count])
+            emitted = due_count
+        max_depth = max(max_depth, ingestion.depth())
+        if ingestion.error is not None:
+            raise ingestion.error
+        time.sleep(PRODUCER_TICK)
+
+    # Whatever is still queued when the step's time is up counts as backlog
+    time.sleep(max(started + duration - time.perf_counter(), 0))
+    elapsed = time.perf_counter() - started
+    backlog = ingestion.depth()
+    stored = ingestion.processed - processed_before
+    latencies = np.array(ingestion.latencies[latencies_before:])
+
+    offered_rate = len(rows) / duration
+    sustained_rate = stored / elapsed
+    behind = (backlog > offered_rate * BACKLOG_LIMIT_SECONDS or
+              sustained_rate < offered_rate * SUSTAINED_RATE_SHARE)
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+    return {
+        'speedup': speedup,
+        'offered': len(rows),
+        'offered_rate': offered_rate,
+        'sustained_rate': sustained_rate,
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max_latency': float(latencies.max()) if len(latencies) else float('nan'),
+        'max_depth': max_depth,
+        'backlog': backlog,
+        'behind': behind,
+        'data_end': data_end
+    }
+
+def print_step(result):
+    """Print one step result line."""
+    print(
+        f"x{result['speedup']:<7g} offered {result['offered_rate']:10,.0f}/s"
+        f" | sustained {result['sustained_rate']:10,.0f}/s"
+        f" | latency p50 {result['p50'] * 1000:8.1f} ms p95 {result['p95'] * 1000:8.1f} ms"
+        f" p99 {result['p99'] * 1000:8.1f} ms"
+        f" | queue max {result['max_depth']:,} end {result['backlog']:,}"
+        + (" | BEHIND" if result['behind'] else "")
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay or generate readings through the ingestion path")
+    parser.add_argument('--replay', metavar='DB', help="Replay the readings of this database file "
+                                                       "(default: vectorized mock data)")
+    parser.add_argument('--sensors', type=int, default=1,
+                        help="Mock sensors, or copies of every replayed sensor")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds between two mock readings of a sensor (data time)")
+    parser.add_argument('--speedup', type=float, nargs='+', default=DEFAULT_SPEEDUPS,
+                        help="Speed-up factors, ramped in order until ingestion falls behind")
+    parser.add_argument('--step-duration', type=float, default=DEFAULT_STEP_DURATION,
+                        help="Wall-clock seconds per speed-up factor")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Readings buffered before a write (1 writes every reading on its own)")
+    parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="Maximum wall-clock seconds between writes")
+    parser.add_argument('--detect-interval', type=float, default=0,
+                        help="Wall-clock seconds between anomaly detection runs (0 disables detection)")
+    parser.add_argument('--threshold', type=float, default=database.ANOMALY_SCORE_FLOOR,
+                        help="Lowest anomaly score recorded")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the mock data")
+    parser.add_argument('--db', help="Database file to ingest into (default: a new temporary file)")
+    args = parser.parse_args(argv)
+
+    database.DB_FILE = args.db or os.path.join(tempfile.mkdtemp(prefix="warehouse_loadgen_"), "loadgen.db")
+    database.init_db()
+
+    if args.replay:
+        source = ReplaySource(args.replay, args.sensors)
+    else:
+        source = MockSource(args.sensors, args.interval, args.seed)
+
+    collector = Collector([], batch_size=args.batch_size, flush_interval=args.flush_interval,
+                          detect_interval=args.detect_interval, threshold=args.threshold)
+    engine = AlertEngine(threshold_rules(20.0, 26.0, 40.0, 60.0))
+    ingestion = Ingestion(collector, engine)
+    ingestion.start()
+
+    print(f"Ingesting {source.sensor_count} sensor(s) into {database.DB_FILE}"
+          f" (batch size {args.batch_size}, detection {'every %g s' % args.detect_interval if args.detect_interval else 'off'})")
+
+    # Stored timestamps follow data time, starting now
+    wall_origin = datetime.now()
+    data_offset = 0.0
+    results = []
+    try:
+        for speedup in args.speedup:
+            result = run_step(source, ingestion, speedup, args.step_duration, data_offset, wall_origin)
+            data_offset = result['data_end']
+            results.append(result)
+            print_step(result)
+            if result['behind']:
+                break
+    finally:
+        ingestion.stop()
+
+    sustained = [result for result in results if not result['behind']]
+    if len(sustained) < len(results):
+        limit = f"{sustained[-1]['offered_rate']:,.0f} readings/s (x{sustained[-1]['speedup']:g})" if sustained else "the first step"
+        print(f"Falls behind at x{results[-1]['speedup']:g} "
+              f"({results[-1]['offered_rate']:,.0f} readings/s offered); sustained up to {limit}")
+    else:
+        print(f"Kept up with every step, up to {results[-1]['offered_rate']:,.0f} readings/s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
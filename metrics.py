@@ -0,0 +1,213 @@
+"""
+Prometheus metrics for ingestion, query and detection performance.
+
+Exports the process-wide counters and stage histograms of instrumentation.py
+in the Prometheus text format, plus the database size. The same text is
+served over HTTP on /metrics and, optionally, written to a file at a fixed
+interval (atomically, so it can be picked up by the node_exporter textfile
+collector or copied off an edge box).
+
+Useful series:
+    rate(warehouse_readings_stored_total[5m])                      ingestion rate
+    warehouse_stage_duration_seconds_bucket{stage="store_readings"} write latency
+    warehouse_stage_duration_seconds_bucket{stage="detect_anomalies"} detection duration
+    warehouse_database_size_bytes                                   database and WAL size
+    1 - rate(warehouse_history_cache_misses_total[5m])
+        / rate(warehouse_history_cache_requests_total[5m])         dashboard cache hit rate
+
+Recording costs one lock and a dict update per event, so the instrumentation
+stays enabled on the ingestion path; the text is only rendered when scraped.
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import database
+from instrumentation import HISTOGRAM_BOUNDS, TIMINGS
+
+METRICS_PREFIX = "warehouse"
+
+# Port of the /metrics endpoint (None disables the endpoint)
+DEFAULT_METRICS_PORT = 9108
+
+# Seconds between two writes of the metrics file
+DEFAULT_DUMP_INTERVAL = 15.0
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Counters exported even before their first increment
+COUNTER_HELP = {
+    'readings_stored': "Readings written to the database",
+    'sensor_reads': "Valid readings received from serial sensors",
+    'sensor_read_errors': "Serial sensor reads that returned no valid data",
+    'anomaly_events_stored': "Anomaly events recorded",
+    'history_cache_requests': "Historical window loads requested by the dashboard",
+    'history_cache_misses': "Historical window loads that had to query the database"
+}
+
+# Process start, exported so restarts (counter resets) are visible
+_started_at = time.time()
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def database_size(db_file=None):
+    """
+    Get the size of the database including its write-ahead log.
+
+    Args:
+        db_file (str): Database file. Defaults to database.DB_FILE
+
+    Returns:
+        int: Size in bytes (0 if the database does not exist yet)
+    """
+    db_file = db_file or database.DB_FILE
+    size = 0
+    for path in (db_file, db_file + '-wal'):
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
+
+def render_metrics(db_file=None):
+    """
+    Render every metric in the Prometheus text exposition format.
+
+    Args:
+        db_file (str): Database whose size is reported. Defaults to database.DB_FILE
+
+    Returns:
+        str: The exposition text
+    """
+    lines = []
+
+    name = f"{METRICS_PREFIX}_stage_duration_seconds"
+    lines.append(f"# HELP {name} Duration of instrumented stages and ticks")
+    lines.append(f"# TYPE {name} histogram")
+    for stage_name, (counts, total_count, total_seconds) in sorted(TIMINGS.histograms().items()):
+        stage_label = _label(stage_name)
+        cumulative = 0
+        for bound, bucket_count in zip(HISTOGRAM_BOUNDS, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{stage="{stage_label}",le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{stage="{stage_label}",le="+Inf"}} {total_count}')
+        lines.append(f'{name}_sum{{stage="{stage_label}"}} {total_seconds:.9g}')
+        lines.append(f'{name}_count{{stage="{stage_label}"}} {total_count}')
+
+    counters = {counter: 0 for counter in COUNTER_HELP}
+    counters.update(TIMINGS.counters())
+    for counter, value in sorted(counters.items()):
+        name = f"{METRICS_PREFIX}_{counter}_total"
+        lines.append(f"# HELP {name} {COUNTER_HELP.get(counter, counter.replace('_', ' ').capitalize())}")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+
+    name = f"{METRICS_PREFIX}_database_size_bytes"
+    lines.append(f"# HELP {name} Size of the SQLite database and its write-ahead log")
+    lines.append(f"# TYPE {name} gauge")
+    lines.append(f"{name} {database_size(db_file)}")
+
+    name = f"{METRICS_PREFIX}_process_start_time_seconds"
+    lines.append(f"# HELP {name} Start time of the process in seconds since the epoch")
+    lines.append(f"# TYPE {name} gauge")
+    lines.append(f"{name} {_started_at:.3f}")
+
+    return "\n".join(lines) + "\n"
+
+def write_metrics_file(path, db_file=None):
+    """
+    Write the metrics to a file, replacing it atomically.
+
+    Args:
+        path (str): Output file (conventionally *.prom)
+        db_file (str): Database whose size is reported
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(render_metrics(db_file))
+    os.replace(temporary, path)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server_version = "WarehouseMonitorMetrics/1.0"
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0].rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics(self.server.db_file).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the console
+        pass
+
+class MetricsExporter:
+    """
+    Serves /metrics and writes the metrics file in background threads.
+
+    Args:
+        port (int): Port of the /metrics endpoint, None to disable it
+        path (str): Metrics file written every interval seconds, None to disable it
+        interval (float): Seconds between two writes of the metrics file
+        host (str): Interface the endpoint listens on (local only by default)
+        db_file (str): Database whose size is reported. Defaults to database.DB_FILE
+    """
+
+    def __init__(self, port=DEFAULT_METRICS_PORT, path=None, interval=DEFAULT_DUMP_INTERVAL,
+                 host='127.0.0.1', db_file=None):
+        self.port = port
+        self.path = path
+        self.interval = interval
+        self.host = host
+        self.db_file = db_file
+        self.server = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """
+        Start the endpoint and the file writer.
+
+        Returns:
+            MetricsExporter: self
+
+        Raises:
+            OSError: If the port is already in use
+        """
+        if self.port is not None:
+            self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+            self.server.daemon_threads = True
+            self.server.db_file = self.db_file
+            self.port = self.server.server_port
+            self._threads.append(threading.Thread(target=self.server.serve_forever,
+                                                  name="metrics-server", daemon=True))
+        if self.path is not None:
+            self._threads.append(threading.Thread(target=self._dump, name="metrics-dump", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """Stop both threads and write the metrics file a last time."""
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=self.interval + 5)
+        if self.path is not None:
+            write_metrics_file(self.path, self.db_file)
+
+    def _dump(self):
+        while not self._stop.wait(self.interval):
+            try:
+                write_metrics_file(self.path, self.db_file)
+            except OSError as e:
+                print(f"Could not write metrics file {self.path}: {e}")
@@ -1,105 +1,278 @@
-import random
-import math
+import threading
 from datetime import datetime, timedelta
+
 import numpy as np
 
-# Global variables to maintain state between calls
-last_temp = 23.0
-last_humid = 50.0
-time_offset = 0
-trend_temp = 0
-trend_humid = 0
-seasonal_offset = 0
+from database import DEFAULT_SENSOR_ID
 
-def generate_mock_data():
-    """
-    Generate realistic mock temperature and humidity data.
+# Model constants of the simulated sensors
+TEMPERATURE_START, HUMIDITY_START = 23.0, 50.0
+TEMPERATURE_RANGE, HUMIDITY_RANGE = (15.0, 35.0), (30.0, 90.0)
+TREND_CHANGE_PROBABILITY = 0.02
+TEMPERATURE_TREND_LIMIT, HUMIDITY_TREND_LIMIT = 0.1, 0.2
+TEMPERATURE_FLUCTUATION, HUMIDITY_FLUCTUATION = 0.3, 0.5
+SPIKE_PROBABILITY = 0.01
+TEMPERATURE_SPIKES = (-5, -4, -3, 3, 4, 5)
+HUMIDITY_SPIKES = (-10, -8, -6, 6, 8, 10)
+
+# Time steps simulated per block by SensorSimulator.advance (bounds peak memory)
+MOCK_BLOCK_STEPS = 1_000_000
+
+def _compose_clamps(first, then):
+    """Clamp (a, lo, hi) equal to applying first, then then."""
+    offset, lower, upper = then
+    return (
+        first[0] + offset,
+        np.minimum(np.maximum(first[1] + offset, lower), upper),
+        np.minimum(np.maximum(first[2] + offset, lower), upper)
+    )
+
+def _scan_clamps(clamps):
+    """Inclusive prefix composition of clamps along the first axis, in place (pairwise, O(n) work)."""
+    length = len(clamps[0])
+    if length < 2:
+        return clamps
     
-    Returns:
-        tuple: (temperature, humidity) with realistic variations
+    # Compose neighbouring pairs, scan the half-length sequence, then fill in the even positions
+    pairs = length // 2
+    odd = _scan_clamps(_compose_clamps(
+        tuple(part[0:2 * pairs:2] for part in clamps),
+        tuple(part[1:2 * pairs:2] for part in clamps)
+    ))
+    even = _compose_clamps(
+        tuple(part[:(length - 1) // 2] for part in odd),
+        tuple(part[2::2] for part in clamps)
+    )
+    
+    for part, odd_part, even_part in zip(clamps, odd, even):
+        part[1::2] = odd_part
+        part[2::2] = even_part
+    return clamps
+
+def _clamped_walk(start, steps, low, high, shifts):
     """
-    global last_temp, last_humid, time_offset, trend_temp, trend_humid, seasonal_offset
+    Evaluate x[t] = clip(x[t-1] + steps[t], low, high) + shifts[t] for every t at once.
     
-    # Time progression
-    time_offset += 1
+    Each step is a clamp x -> clip(x + a, lo, hi), and clamps compose into clamps,
+    so a prefix scan over (a, lo, hi) gives the same values as the sequential
+    recursion without a Python loop over the steps.
     
-    # Adjust seasonal factors (simulate day/night cycle)
-    seasonal_offset = math.sin(time_offset / 100) * 3
+    Args:
+        start (np.ndarray): Value before the first step, one per series
+        steps (np.ndarray): Increments, shape (n, series)
+        low (float): Lower clamp bound
+        high (float): Upper clamp bound
+        shifts (np.ndarray): Offsets added after clamping (they carry into the next step)
+        
+    Returns:
+        np.ndarray: The series values, shape (n, series)
+    """
+    offset, lower, upper = _scan_clamps((steps + shifts, low + shifts, high + shifts))
+    return np.minimum(np.maximum(start + offset, lower), upper)
+
+def _forward_fill_trend(rng, shape, limit, initial):
+    """Piecewise-constant trend: with TREND_CHANGE_PROBABILITY a new uniform value per step."""
+    changes = rng.random(shape) < TREND_CHANGE_PROBABILITY
+    values = rng.uniform(-limit, limit, shape)
+    # Row of the latest change at or before each step (-1 before the first change)
+    latest = np.where(changes, np.arange(shape[0])[:, None], -1)
+    np.maximum.accumulate(latest, axis=0, out=latest)
+    filled = np.take_along_axis(values, np.maximum(latest, 0), axis=0)
+    return np.where(latest >= 0, filled, initial)
+
+def _spikes(rng, shape, choices):
+    """Spike offsets (0 where no spike is injected)."""
+    injected = rng.random(shape) < SPIKE_PROBABILITY
+    return np.where(injected, rng.choice(np.asarray(choices, dtype=float), shape), 0.0)
+
+class SensorSimulator:
+    """
+    Independent simulated sensors stepped together.
     
-    # Gradual trends (simulate slow weather changes)
-    if random.random() < 0.02:  # 2% chance of changing trend
-        trend_temp = random.uniform(-0.1, 0.1)
-    if random.random() < 0.02:  # 2% chance of changing humidity trend
-        trend_humid = random.uniform(-0.2, 0.2)
+    Every sensor follows the mock model: a day/night cycle, random trend changes,
+    fluctuation, clamping to a plausible range and occasional spikes. The state
+    of all sensors lives in a few arrays, so thousands of sensors advance in one
+    vectorized update, and many steps at once are evaluated without a Python loop
+    (see _clamped_walk). Calls are serialized, so threads can share a simulator.
     
-    # Apply trends
-    last_temp += trend_temp
-    last_humid += trend_humid
+    Args:
+        sensors (int or list): Number of sensors, or their ids
+        seed (int): Seed of the random generator; equal seeds give equal data
+    """
     
-    # Apply seasonal factors
-    last_temp += seasonal_offset * 0.1
-    last_humid -= seasonal_offset * 0.2
+    __slots__ = ('sensor_ids', 'temperature', 'humidity', 'trend_temp', 'trend_humid',
+                 'time_offset', '_rng', '_lock')
     
-    # Random fluctuation
-    temp_fluctuation = random.uniform(-0.3, 0.3)
-    humid_fluctuation = random.uniform(-0.5, 0.5)
+    def __init__(self, sensors=1, seed=None):
+        if isinstance(sensors, int):
+            sensors = [DEFAULT_SENSOR_ID] if sensors == 1 else [f"sensor_{i + 1}" for i in range(sensors)]
+        self.sensor_ids = np.array(sensors)
+        self._lock = threading.Lock()
+        self.reset(seed)
     
-    # Calculate final values with constraints
-    temperature = max(min(last_temp + temp_fluctuation, 35.0), 15.0)  # Constrain between 15-35°C
-    humidity = max(min(last_humid + humid_fluctuation, 90.0), 30.0)   # Constrain between 30-90%
+    def reset(self, seed=None):
+        """Return every sensor to the initial model state and reseed the generator."""
+        with self._lock:
+            count = len(self.sensor_ids)
+            self.temperature = np.full(count, TEMPERATURE_START)
+            self.humidity = np.full(count, HUMIDITY_START)
+            self.trend_temp = np.zeros(count)
+            self.trend_humid = np.zeros(count)
+            self.time_offset = 0
+            self._rng = np.random.default_rng(seed)
     
-    # Occasionally simulate anomalies (1% chance)
-    if random.random() < 0.01:
-        # Sudden temperature spike or drop
-        temperature += random.choice([-5, -4, -3, 3, 4, 5])
+    def advance(self, steps=1):
+        """
+        Advance every sensor by a number of steps.
+        
+        Args:
+            steps (int): Number of readings per sensor
+            
+        Returns:
+            dict: Arrays of shape (steps, sensors): 'temperature' and 'humidity'
+                  (rounded to 0.1 like the sensor), and the boolean labels
+                  'temperature_anomaly' and 'humidity_anomaly' marking injected spikes
+        """
+        with self._lock:
+            count = len(self.sensor_ids)
+            rng = self._rng
+            temperatures = np.empty((steps, count))
+            humidities = np.empty((steps, count))
+            temp_spikes = np.zeros((steps, count), dtype=bool)
+            humid_spikes = np.zeros((steps, count), dtype=bool)
+            
+            block = max(MOCK_BLOCK_STEPS // max(count, 1), 1)
+            for first in range(0, steps, block):
+                shape = (min(block, steps - first), count)
+                
+                # Day/night cycle (time_offset counts steps from 1)
+                step_numbers = np.arange(self.time_offset + 1, self.time_offset + shape[0] + 1)
+                seasonal = (np.sin(step_numbers / 100) * 3)[:, None]
+                
+                temp_trend = _forward_fill_trend(rng, shape, TEMPERATURE_TREND_LIMIT, self.trend_temp)
+                humid_trend = _forward_fill_trend(rng, shape, HUMIDITY_TREND_LIMIT, self.trend_humid)
+                temp_steps = (temp_trend + seasonal * 0.1 +
+                              rng.uniform(-TEMPERATURE_FLUCTUATION, TEMPERATURE_FLUCTUATION, shape))
+                humid_steps = (humid_trend - seasonal * 0.2 +
+                               rng.uniform(-HUMIDITY_FLUCTUATION, HUMIDITY_FLUCTUATION, shape))
+                temp_shift = _spikes(rng, shape, TEMPERATURE_SPIKES)
+                humid_shift = _spikes(rng, shape, HUMIDITY_SPIKES)
+                
+                rows = slice(first, first + shape[0])
+                temperatures[rows] = _clamped_walk(self.temperature, temp_steps, *TEMPERATURE_RANGE, temp_shift)
+                humidities[rows] = _clamped_walk(self.humidity, humid_steps, *HUMIDITY_RANGE, humid_shift)
+                temp_spikes[rows] = temp_shift != 0
+                humid_spikes[rows] = humid_shift != 0
+                
+                # Carry the state into the next block or call
+                self.temperature = temperatures[first + shape[0] - 1].copy()
+                self.humidity = humidities[first + shape[0] - 1].copy()
+                self.trend_temp = temp_trend[-1].copy()
+                self.trend_humid = humid_trend[-1].copy()
+                self.time_offset += shape[0]
+            
+            return {
+                'temperature': temperatures.round(1),
+                'humidity': humidities.round(1),
+                'temperature_anomaly': temp_spikes,
+                'humidity_anomaly': humid_spikes
+            }
     
-    if random.random() < 0.01:
-        # Sudden humidity spike or drop
-        humidity += random.choice([-10, -8, -6, 6, 8, 10])
+    def read(self):
+        """
+        Take one reading from every sensor.
+        
+        Returns:
+            tuple: (temperatures, humidities) arrays with one value per sensor
+        """
+        readings = self.advance(1)
+        return readings['temperature'][0], readings['humidity'][0]
     
-    # Update the last values for next iteration
-    last_temp = temperature
-    last_humid = humidity
+    def generate(self, size, start=None, interval_seconds=3):
+        """
+        Advance every sensor by size readings and attach timestamps.
+        
+        Args:
+            size (int): Number of readings per sensor
+            start (datetime): Time of the first reading. Defaults to size intervals before now
+            interval_seconds (float): Seconds between two readings of a sensor
+            
+        Returns:
+            dict: Arrays of length size * sensors ordered by timestamp, then sensor:
+                  'timestamp' (datetime64[us]), 'sensor_id', and the advance() arrays
+        """
+        if start is None:
+            start = datetime.now() - timedelta(seconds=size * interval_seconds)
+        interval = np.timedelta64(int(round(interval_seconds * 1e6)), 'us')
+        
+        readings = self.advance(size)
+        timestamps = np.datetime64(start, 'us') + np.arange(size) * interval
+        count = len(self.sensor_ids)
+        return {
+            'timestamp': np.repeat(timestamps, count),
+            'sensor_id': np.tile(self.sensor_ids, size),
+            **{name: values.ravel() for name, values in readings.items()}
+        }
+
+# Simulated sensor behind generate_mock_data
+_default_simulator = SensorSimulator()
+
+def generate_mock_data():
+    """
+    Generate realistic mock temperature and humidity data.
     
-    return round(temperature, 1), round(humidity, 1)
+    Returns:
+        tuple: (temperature, humidity) with realistic variations
+    """
+    temperatures, humidities = _default_simulator.read()
+    return float(temperatures[0]), float(humidities[0])
 
-def generate_historical_mock_data(hours=24, interval_minutes=5):
+def generate_historical_mock_data(hours=24, interval_minutes=5, seed=None):
     """
     Generate a set of historical mock data points.
     
+    The simulator behind generate_mock_data restarts for the history and
+    generate_mock_data continues from its end.
+    
     Args:
         hours (int): Number of hours to generate data for
         interval_minutes (int): Interval between data points in minutes
+        seed (int): Seed of the random generator
         
     Returns:
         tuple: (timestamps, temperatures, humidities)
     """
-    global last_temp, last_humid, time_offset, trend_temp, trend_humid, seasonal_offset
-    
-    # Reset global variables to ensure consistent start
-    last_temp = 23.0
-    last_humid = 50.0
-    time_offset = 0
-    trend_temp = 0
-    trend_humid = 0
-    seasonal_offset = 0
-    
     # Calculate how many data points to generate
     data_points = int((hours * 60) / interval_minutes)
     
-    timestamps = []
-    temperatures = []
-    humidities = []
+    _default_simulator.reset(seed)
+    data = _default_simulator.generate(
+        data_points,
+        start=datetime.now() - timedelta(hours=hours),
+        interval_seconds=interval_minutes * 60
+    )
     
-    current_time = datetime.now() - timedelta(hours=hours)
+    return data['timestamp'].tolist(), data['temperature'].tolist(), data['humidity'].tolist()
+
+def generate_mock_arrays(size, sensors=1, seed=None, start=None, interval_seconds=3):
+    """
+    Generate mock readings for many sensors at once as NumPy arrays.
     
-    for _ in range(data_points):
-        temp, humid = generate_mock_data()
-        
-        timestamps.append(current_time)
-        temperatures.append(temp)
-        humidities.append(humid)
-        
-        current_time += timedelta(minutes=interval_minutes)
+    Every sensor starts from the initial model state (see SensorSimulator);
+    millions of readings take seconds. The spikes are returned as ground-truth
+    anomaly labels.
     
-    return timestamps, temperatures, humidities
+    Args:
+        size (int): Number of readings per sensor
+        sensors (int or list): Number of sensors, or their ids
+        seed (int): Seed of the random generator; equal seeds give equal data
+        start (datetime): Time of the first reading. Defaults to size intervals before now
+        interval_seconds (float): Seconds between two readings of a sensor
+        
+    Returns:
+        dict: Arrays of length size * sensors ordered by timestamp, then sensor:
+              'timestamp' (datetime64[us]), 'sensor_id', 'temperature', 'humidity'
+              (rounded to 0.1 like the sensor), and the boolean labels
+              'temperature_anomaly' and 'humidity_anomaly' marking injected spikes
+    """
+    return SensorSimulator(sensors, seed).generate(size, start, interval_seconds)
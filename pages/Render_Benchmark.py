@@ -0,0 +1,68 @@
+import pandas as pd
+import streamlit as st
+
+from benchmark import Dataset
+from downsampling import DEFAULT_POINT_BUDGET
+from visualization import DEFAULT_WEBGL_THRESHOLD, RenderStats, plot_historical_temperature
+
+st.title("Đo Hiệu Năng Hiển Thị Biểu Đồ")
+st.write(
+    "So sánh thời gian dựng biểu đồ trên máy chủ và kích thước dữ liệu gửi tới trình duyệt "
+    "của biểu đồ nhiệt độ lịch sử với các chế độ hiển thị khác nhau."
+)
+
+sizes = st.multiselect(
+    "Số Lượng Bản Ghi",
+    [1000, 10000, 100000, 1000000],
+    default=[1000, 10000, 100000]
+)
+col1, col2 = st.columns(2)
+with col1:
+    point_budget = st.number_input("Số Điểm Tối Đa", min_value=100, value=DEFAULT_POINT_BUDGET, step=100)
+with col2:
+    webgl_threshold = st.number_input("Ngưỡng WebGL", min_value=100, value=DEFAULT_WEBGL_THRESHOLD, step=500)
+render_sample = st.checkbox("Vẽ thử biểu đồ của tập dữ liệu lớn nhất", value=False)
+
+# (label, point budget, WebGL threshold); None as budget keeps every reading
+modes = [
+    ("SVG, toàn bộ điểm", None, None),
+    ("WebGL, toàn bộ điểm", None, 0),
+    ("Giảm mẫu + tự động WebGL", point_budget, webgl_threshold)
+]
+
+if st.button("Chạy Đo") and sizes:
+    results = []
+    figures = {}
+    progress = st.progress(0.0)
+
+    for i, size in enumerate(sorted(sizes)):
+        frame = Dataset(size).frame
+        for label, budget, threshold in modes:
+            # Build and serialize the figure without sending it to the browser
+            render_stats = RenderStats(measure=True, render=False)
+            plot_historical_temperature(frame, point_budget=budget or size, render_stats=render_stats,
+                                        webgl_threshold=threshold)
+            stats = render_stats.stats['historical_temperature']
+            fig = render_stats.figures['historical_temperature']
+            figures[label] = fig
+
+            results.append({
+                'Bản ghi': size,
+                'Chế độ': label,
+                'Loại trace': type(fig.data[0]).__name__,
+                'Điểm gửi đi': len(fig.data[0].x),
+                'Thời gian dựng (ms)': round(stats['render_ms'], 1),
+                'Dữ liệu gửi (KB)': round(stats['payload_bytes'] / 1024, 1)
+            })
+        progress.progress((i + 1) / len(sizes))
+
+    results = pd.DataFrame(results)
+    st.dataframe(results, use_container_width=True)
+    st.bar_chart(results.pivot(index='Bản ghi', columns='Chế độ', values='Dữ liệu gửi (KB)'))
+    st.bar_chart(results.pivot(index='Bản ghi', columns='Chế độ', values='Thời gian dựng (ms)'))
+
+    # Render the largest dataset in each mode to compare browser responsiveness
+    if render_sample:
+        for label, fig in figures.items():
+            st.subheader(label)
+            st.plotly_chart(fig, use_container_width=True, key=f"benchmark_{label}")
@@ -2,6 +2,9 @@ import serial
 import time
 import random  # For fallback when actual serial fails
 
+from instrumentation import count, timed
+
+@timed()
 def read_serial_data(port, baud_rate=9600, timeout=2.0):
     """
     Read temperature and humidity data from a serial port.
@@ -38,6 +41,7 @@ def read_serial_data(port, baud_rate=9600, timeout=2.0):
                     
                     # Close the serial connection
                     ser.close()
+                    count('sensor_reads')
                     
                     return temperature, humidity
             except (ValueError, IndexError) as e:
@@ -49,11 +53,13 @@ def read_serial_data(port, baud_rate=9600, timeout=2.0):
         ser.close()
         
         # If we got here, we couldn't get valid data
+        count('sensor_read_errors')
         return None, None
         
     except serial.SerialException as e:
         # Handle serial connection errors
         print(f"Serial connection error: {e}")
+        count('sensor_read_errors')
         return None, None
 
 def format_command(command):
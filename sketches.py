@@ -0,0 +1,434 @@
+"""
+Mergeable quantile sketches for medians and percentiles over long time ranges.
+
+Readings are summarized per hour, sensor and metric in a t-digest (merging
+variant with the k1 scale function) stored in the reading_sketches table. A
+percentile over a month or a year then comes from merging a few hundred stored
+digests instead of loading and sorting every raw reading.
+
+Error bounds: a digest holds at most compression / 2 + 1 centroids (about 800
+bytes at the default compression of 100) and keeps centroids near the tails
+small. t-digest has no worst-case guarantee; measured against exact quantiles
+after merging about 1,700 hourly digests of 2M readings, the rank error from p1
+to p99 stayed below 0.07 percentile points at compression 100 and below 0.015
+at 200 (the error shrinks roughly with 1 / compression). On mock readings the
+value error stays below the 0.1 degree sensor resolution; the quantiles_*
+benchmarks in benchmark.py report it against exact computation. The minimum
+and maximum are exact.
+
+Hours at the edges of a requested range are only partly covered, so they are
+summarized from the raw readings instead of their stored digest, as is
+everything from the latest sketched hour on; results therefore don't depend on
+how recently refresh_sketches ran, only their cost does. Refreshes run from the
+write paths and timers (bulk import, collector detection, the dashboard's shared
+analysis, the API's refresh thread), never per request. Digests are kept when
+clear_old_data deletes raw readings, so long-range percentiles stay available
+after the raw history is gone.
+
+The dashboard summarizes long timeframes (histogram, box plot, quartiles) from
+the sketches as well (describe_range), instead of sorting every reading.
+"""
+
+import threading
+
+import numpy as np
+
+from database import (
+    get_latest_sketch_bucket,
+    get_latest_sketch_id,
+    get_readings_after_id,
+    get_readings_between,
+    load_sketches,
+    save_sketches
+)
+
+# Centroid budget of a digest: higher is more accurate but larger
+DEFAULT_COMPRESSION = 100
+
+# Quantiles returned when none are requested
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+SKETCH_METRICS = ('temperature', 'humidity')
+
+# Dashboard timeframes at least this long (hours; 0 means all data) are
+# summarized from the sketches instead of the raw readings
+SKETCH_SUMMARY_MIN_HOURS = 24 * 7
+
+# Refreshes are idempotent; the lock only keeps concurrent callers from doing the work twice
+_refresh_lock = threading.Lock()
+
+def _scale_index(q, compression):
+    """Map quantiles to k1 scale buckets; each bucket spans one unit of k."""
+    k = compression / (2 * np.pi) * (np.arcsin(np.clip(2 * q - 1, -1, 1)) + np.pi / 2)
+    return np.minimum(np.floor(k), np.floor(compression / 2)).astype(np.int64)
+
+def _compress(groups, means, weights, compression):
+    """
+    Merge weighted points into digest centroids, independently per group.
+
+    Args:
+        groups (np.ndarray): Integer group of every point
+        means (np.ndarray): Point values (or centroid means)
+        weights (np.ndarray): Point weights (or centroid weights)
+        compression (float): Digest compression
+
+    Returns:
+        tuple: (groups, means, weights) of the centroids, sorted by group and mean
+    """
+    order = np.lexsort((means, groups))
+    groups, means, weights = groups[order], means[order], weights[order]
+
+    # Quantile of every point's center within its group
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    lengths = np.diff(np.r_[starts, len(groups)])
+    cumulative = np.cumsum(weights)
+    before_group = np.repeat(cumulative[starts] - weights[starts], lengths)
+    totals = np.repeat(np.add.reduceat(weights, starts), lengths)
+    q = (cumulative - weights / 2 - before_group) / totals
+
+    # Points sharing a group and a scale bucket become one centroid
+    buckets = _scale_index(q, compression)
+    boundaries = np.flatnonzero(np.r_[True, (groups[1:] != groups[:-1]) | (buckets[1:] != buckets[:-1])])
+    merged_weights = np.add.reduceat(weights, boundaries)
+    merged_means = np.add.reduceat(weights * means, boundaries) / merged_weights
+    return groups[boundaries], merged_means, merged_weights
+
+class TDigest:
+    """
+    Quantile sketch: sorted centroids (mean, weight) plus the exact extremes.
+
+    Args:
+        means (np.ndarray): Centroid means in ascending order
+        weights (np.ndarray): Centroid weights (number of readings)
+        minimum (float): Smallest summarized value
+        maximum (float): Largest summarized value
+    """
+
+    __slots__ = ('means', 'weights', 'minimum', 'maximum')
+
+    def __init__(self, means, weights, minimum, maximum):
+        self.means = means
+        self.weights = weights
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def count(self):
+        """Number of summarized readings."""
+        return int(round(self.weights.sum()))
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        """Summarize raw values (NaN values are ignored); None if there are none."""
+        digests = build_digests(np.zeros(len(values), dtype=np.int64), values, compression)
+        return digests[0] if digests else None
+
+    @classmethod
+    def merge(cls, digests, compression=DEFAULT_COMPRESSION):
+        """
+        Merge digests into one summarizing all of their readings.
+
+        Args:
+            digests (list): TDigest instances (empty digests are skipped)
+            compression (float): Compression of the merged digest
+
+        Returns:
+            TDigest: The merged digest, or None if there is nothing to merge
+        """
+        digests = [digest for digest in digests if digest is not None and len(digest.means)]
+        if not digests:
+            return None
+
+        means = np.concatenate([digest.means for digest in digests])
+        weights = np.concatenate([digest.weights for digest in digests])
+        _, means, weights = _compress(np.zeros(len(means), dtype=np.int64), means, weights, compression)
+        return cls(means, weights,
+                   min(digest.minimum for digest in digests),
+                   max(digest.maximum for digest in digests))
+
+    def quantile(self, q):
+        """
+        Estimate quantiles.
+
+        Args:
+            q (float or array-like): Quantiles between 0 and 1
+
+        Returns:
+            float or np.ndarray: Estimated values, the shape of q
+        """
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # Interpolate between centroid centers, anchored at the exact extremes
+        return np.interp(np.asarray(q, dtype=float) * total,
+                         np.r_[0.0, centers, total],
+                         np.r_[self.minimum, self.means, self.maximum])
+
+    def cdf(self, x):
+        """
+        Estimate the fraction of readings at or below values.
+
+        Args:
+            x (float or array-like): Values
+
+        Returns:
+            float or np.ndarray: Fractions between 0 and 1, the shape of x
+        """
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(np.asarray(x, dtype=float),
+                         np.r_[self.minimum, self.means, self.maximum],
+                         np.r_[0.0, centers, total]) / total
+
+    def to_bytes(self):
+        """Serialize as float64 [minimum, maximum, means..., weights...]."""
+        return np.r_[self.minimum, self.maximum, self.means, self.weights].astype(np.float64).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserialize a digest written by to_bytes."""
+        values = np.frombuffer(data, dtype=np.float64)
+        size = (len(values) - 2) // 2
+        return cls(values[2:2 + size], values[2 + size:], values[0], values[1])
+
+def build_digests(groups, values, compression=DEFAULT_COMPRESSION):
+    """
+    Summarize many groups of raw values at once.
+
+    Args:
+        groups (np.ndarray): Integer group of every value (e.g. from pd.factorize)
+        values (np.ndarray): Raw values; NaN values are ignored
+        compression (float): Digest compression
+
+    Returns:
+        list: One TDigest per distinct group with values, ordered by group
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    groups, values = groups[valid], values[valid]
+    if not len(values):
+        return []
+
+    centroid_groups, means, weights = _compress(groups, values, np.ones(len(values)), compression)
+
+    # Exact extremes per group
+    order = np.argsort(groups, kind='stable')
+    grouped = values[order]
+    value_starts = np.flatnonzero(np.r_[True, groups[order][1:] != groups[order][:-1]])
+    minimums = np.minimum.reduceat(grouped, value_starts)
+    maximums = np.maximum.reduceat(grouped, value_starts)
+
+    # Split the centroid arrays per group
+    starts = np.flatnonzero(np.r_[True, centroid_groups[1:] != centroid_groups[:-1]])
+    ends = np.r_[starts[1:], len(centroid_groups)]
+    return [
+        TDigest(means[start:end], weights[start:end], minimum, maximum)
+        for start, end, minimum, maximum in zip(starts, ends, minimums, maximums)
+    ]
+
+def _hourly_digests(readings, compression):
+    """Build one digest per hour, sensor and metric from a readings DataFrame."""
+    import pandas as pd
+
+    # Integer group per (hour, sensor): cheaper than factorizing (timestamp, string) pairs
+    hours = readings['timestamp'].to_numpy().astype('datetime64[h]').astype(np.int64)
+    sensor_codes, sensor_ids = pd.factorize(readings['sensor_id'])
+    keys, groups = np.unique(hours * len(sensor_ids) + sensor_codes, return_inverse=True)
+    buckets = pd.to_datetime((keys // len(sensor_ids)).astype('datetime64[h]'))
+
+    digests = {}
+    for metric in SKETCH_METRICS:
+        for key, bucket, digest in zip(keys, buckets, build_digests(groups, readings[metric].to_numpy(), compression)):
+            digests[(bucket, sensor_ids[key % len(sensor_ids)], metric)] = digest
+    return digests
+
+def _touched_readings(new_readings):
+    """Load every reading of the hours new_readings fall into (contiguous hours in one query)."""
+    import pandas as pd
+
+    hours = np.unique(new_readings['timestamp'].to_numpy().astype('datetime64[h]'))
+    runs = np.split(hours, np.flatnonzero(np.diff(hours) != np.timedelta64(1, 'h')) + 1)
+    return pd.concat([
+        get_readings_between(pd.Timestamp(run[0]).to_pydatetime(),
+                             pd.Timestamp(run[-1] + np.timedelta64(1, 'h')).to_pydatetime())
+        for run in runs
+    ], ignore_index=True)
+
+def refresh_sketches(compression=DEFAULT_COMPRESSION):
+    """
+    Bring the stored hourly sketches up to date with new database readings.
+
+    Hours touched by new readings are rebuilt from their raw readings rather
+    than merged into, so repeated refreshes of the current hour neither lose
+    accuracy nor count a reading twice. Only the touched hours are reloaded, so
+    a backfill of old readings doesn't reload everything up to now.
+
+    Args:
+        compression (float): Digest compression
+
+    Returns:
+        int: Number of sketches written
+    """
+    with _refresh_lock:
+        last_id = get_latest_sketch_id()
+        new_readings = get_readings_after_id(last_id)
+        if new_readings.empty:
+            return 0
+
+        # Earlier readings of the touched hours belong in their rebuilt sketches
+        readings = new_readings if last_id == 0 else _touched_readings(new_readings)
+
+        covered_id = int(max(new_readings['id'].max(), readings['id'].max()))
+        records = [
+            (bucket.strftime('%Y-%m-%d %H:00:00'), sensor_id, metric, digest.count, covered_id, digest.to_bytes())
+            for (bucket, sensor_id, metric), digest in _hourly_digests(readings, compression).items()
+        ]
+        save_sketches(records)
+        return len(records)
+
+def _local_naive(moment):
+    """Convert a timezone-aware time to naive local time, the way readings are stored."""
+    if moment is not None and getattr(moment, 'tzinfo', None) is not None:
+        return moment.astimezone().replace(tzinfo=None)
+    return moment
+
+def range_digest(metric, start=None, end=None, sensor_id=None, compression=DEFAULT_COMPRESSION):
+    """
+    Build the digest of a metric over a time range from the stored sketches.
+
+    Whole hours before the latest sketched hour come from the stored hourly
+    sketches; the partial hour at the start of the range and everything from
+    the latest sketched hour on (which may have grown since the last refresh)
+    are summarized from the raw readings.
+
+    Args:
+        metric (str): 'temperature' or 'humidity'
+        start (datetime): Only readings at or after this time (timezone-aware
+            times are converted to local time)
+        end (datetime): Only readings before this time
+        sensor_id (str): Only readings from this sensor
+        compression (float): Compression of the merged digest
+
+    Returns:
+        TDigest: Digest of the range, or None if it holds no readings
+    """
+    import pandas as pd
+
+    start, end = _local_naive(start), _local_naive(end)
+
+    # Hours [first_hour, sketch_end) are read from the sketches
+    first_hour = pd.Timestamp(start).ceil('h').to_pydatetime() if start is not None else None
+    sketch_end = get_latest_sketch_bucket()
+    if sketch_end is not None and end is not None:
+        sketch_end = min(sketch_end, pd.Timestamp(end).floor('h').to_pydatetime())
+    if sketch_end is None or (first_hour is not None and sketch_end <= first_hour):
+        # Too short (or nothing sketched yet): summarize the raw readings
+        raw = get_readings_between(start, end, sensor_id)
+        return TDigest.from_values(raw[metric].to_numpy(), compression) if not raw.empty else None
+
+    digests = [
+        TDigest.from_bytes(sketch)
+        for _, _, _, sketch in load_sketches(metric, first_hour, sketch_end, sensor_id)
+    ]
+
+    # Partial hour at the start, and everything after the sketched hours
+    edges = [(sketch_end, end)]
+    if start is not None and first_hour != start:
+        edges.append((start, first_hour))
+    for edge_start, edge_end in edges:
+        raw = get_readings_between(edge_start, edge_end, sensor_id)
+        if not raw.empty:
+            digests.append(TDigest.from_values(raw[metric].to_numpy(), compression))
+
+    return TDigest.merge(digests, compression)
+
+def summarize_digest(digest, bins=20):
+    """
+    Build the summary of utils.summarize_distribution from a digest.
+
+    Quartiles, histogram and whiskers are estimates (the whiskers are the Tukey
+    fences clipped to the exact extremes); count, mean, min and max are exact.
+    The standard deviation comes from the centroids and slightly understates
+    the spread within them.
+
+    Args:
+        digest (TDigest): Digest of the readings
+        bins (int): Number of histogram bins
+
+    Returns:
+        dict: Same keys as utils.summarize_distribution
+    """
+    q1, median, q3 = digest.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+
+    low, high = digest.minimum, digest.maximum
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    total = digest.weights.sum()
+    cumulative = np.round(digest.cdf(edges) * total)
+    cumulative[0], cumulative[-1] = 0, total
+
+    mean = float((digest.weights * digest.means).sum() / total)
+    variance = (digest.weights * (digest.means - mean) ** 2).sum() / (total - 1) if total > 1 else float('nan')
+    return {
+        'counts': np.diff(cumulative).astype(np.int64),
+        'edges': edges,
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': max(q1 - 1.5 * iqr, digest.minimum),
+        'upperfence': min(q3 + 1.5 * iqr, digest.maximum),
+        'min': digest.minimum,
+        'max': digest.maximum,
+        'count': digest.count,
+        'mean': mean,
+        'std': float(np.sqrt(variance))
+    }
+
+def describe_range(metrics=SKETCH_METRICS, start=None, end=None, sensor_id=None, bins=20):
+    """
+    Summarize metrics over a time range from the sketches (see utils.describe_columns).
+
+    Args:
+        metrics (tuple): Metrics to summarize
+        start (datetime): Only readings at or after this time
+        end (datetime): Only readings before this time
+        sensor_id (str): Only readings from this sensor
+        bins (int): Number of histogram bins
+
+    Returns:
+        dict: Per metric, the summarize_digest() dict (None if the range holds no readings)
+    """
+    summary = {}
+    for metric in metrics:
+        digest = range_digest(metric, start, end, sensor_id)
+        summary[metric] = summarize_digest(digest, bins) if digest is not None else None
+    return summary
+
+def range_quantiles(metric, quantiles=DEFAULT_QUANTILES, start=None, end=None, sensor_id=None):
+    """
+    Estimate quantiles of a metric over a time range without loading raw readings.
+
+    Args:
+        metric (str): 'temperature' or 'humidity'
+        quantiles (tuple): Quantiles between 0 and 1
+        start (datetime): Only readings at or after this time
+        end (datetime): Only readings before this time
+        sensor_id (str): Only readings from this sensor
+
+    Returns:
+        dict: 'count', 'min', 'max' and one entry per quantile (keyed by the
+              quantile), values None if the range holds no readings
+    """
+    digest = range_digest(metric, start, end, sensor_id)
+    if digest is None:
+        return {'count': 0, 'min': None, 'max': None, **{q: None for q in quantiles}}
+
+    values = digest.quantile(quantiles)
+    return {
+        'count': digest.count,
+        'min': float(digest.minimum),
+        'max': float(digest.maximum),
+        **{q: float(value) for q, value in zip(quantiles, values)}
+    }
@@ -0,0 +1,11 @@
+import pytest
+
+import database
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Point the database module at an empty, initialized database file."""
+    db_file = str(tmp_path / "test.db")
+    monkeypatch.setattr(database, 'DB_FILE', db_file)
+    database.init_db()
+    return db_file
@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+
+import database
+from alerts import AlertEngine, threshold_rules
+
+RULES = threshold_rules(temp_min=15.0, temp_max=25.0)
+
+def _readings(temperatures, first_id=1):
+    return pd.DataFrame({
+        'id': range(first_id, first_id + len(temperatures)),
+        'timestamp': pd.date_range('2026-01-01', periods=len(temperatures), freq='min'),
+        'temperature': temperatures,
+        'humidity': 50.0,
+        'sensor_id': 'a'
+    })
+
+def _transitions(events):
+    return list(zip(events['event'], events['value']))
+
+def test_alert_latches_until_back_inside_the_hysteresis_margin():
+    # 24.8 is inside the limit but within the 0.5 °C margin, so the alert holds
+    engine = AlertEngine(RULES, log=False)
+    events = engine.evaluate(_readings([20.0, 25.5, 24.8, 26.0, 24.8, 24.4, 24.9, 25.2]))
+
+    assert _transitions(events) == [('raised', 25.5), ('cleared', 24.4), ('raised', 25.2)]
+    assert [alert['rule'] for alert in engine.active_alerts()] == ['temperature_range']
+
+def test_latch_does_not_depend_on_batching():
+    temperatures = [20.0, 25.5, 24.8, 26.0, 24.8, 24.4, 24.9, 25.2, 14.0, 15.2, 15.6]
+    whole = AlertEngine(RULES, log=False).evaluate(_readings(temperatures))
+
+    engine = AlertEngine(RULES, log=False)
+    batches = [engine.evaluate(_readings([temperature], first_id=i + 1))
+               for i, temperature in enumerate(temperatures)]
+    assert _transitions(pd.concat(batches)) == _transitions(whole)
+
+def test_transitions_are_logged_once_per_reading(db):
+    readings = _readings([20.0, 26.0, 20.0])
+    AlertEngine(RULES).evaluate(readings)
+    AlertEngine(RULES).evaluate(readings)
+
+    log = database.get_alert_log(0)
+    assert list(log['event']) == ['raised', 'cleared']
+    assert list(log['reading_id']) == [2, 3]
+
+def test_different_thresholds_are_logged_apart(db):
+    readings = _readings([20.0, 26.0, 20.0])
+    AlertEngine(RULES).evaluate(readings)
+    AlertEngine(threshold_rules(temp_min=15.0, temp_max=22.0)).evaluate(readings)
+
+    log = database.get_alert_log(0)
+    assert len(log) == 4
+    assert sorted(json.loads(parameters)['max'] for parameters in log['parameters']) == [22.0, 22.0, 25.0, 25.0]
+
+def test_new_engine_skips_readings_already_stored(db):
+    for temperature in (20.0, 26.0, 27.0):
+        database.store_readings(datetime(2026, 1, 1, 8), temperature, 50.0, 'a')
+    buffered = _readings([20.0, 26.0, 27.0])
+
+    engine = AlertEngine(RULES, start_id=database.get_latest_reading_id())
+    assert engine.evaluate(buffered).empty
+    events = engine.evaluate(_readings([26.5], first_id=4))
+    assert _transitions(events) == [('raised', 26.5)]
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import database
+from anomaly_detection import record_new_anomalies
+
+def _readings(count=40):
+    rng = np.random.default_rng(0)
+    temperatures = 22 + rng.normal(0, 0.3, count)
+    temperatures[[10, 25]] = [25.0, 23.5]  # one strong and one mild outlier
+    humidities = 50 + rng.normal(0, 1.0, count)
+    start = datetime.now() - timedelta(minutes=count)
+    for i, (temperature, humidity) in enumerate(zip(temperatures, humidities)):
+        database.store_readings(start + timedelta(minutes=i), float(round(temperature, 2)), float(round(humidity, 1)))
+    return database.get_readings_by_timeframe(24)
+
+def test_threshold_filters_recorded_events(db):
+    data = _readings()
+    record_new_anomalies(data)
+
+    scores = database.get_anomaly_events(24, 'temperature')['score']
+    assert (scores >= database.ANOMALY_SCORE_FLOOR).all()
+
+    # Changing the sensitivity applies to history already evaluated
+    sensitive = database.get_anomaly_events(24, 'temperature', min_score=database.ANOMALY_SCORE_FLOOR)
+    strict = database.get_anomaly_events(24, 'temperature', min_score=3.0)
+    assert len(strict) < len(sensitive)
+    assert (strict['score'] >= 3.0).all()
+    assert (sensitive['score'] >= database.ANOMALY_SCORE_FLOOR).all()
+    assert set(strict['reading_id']) <= set(sensitive['reading_id'])
+
+def test_record_new_anomalies_is_incremental(db):
+    data = _readings()
+    last_id = record_new_anomalies(data)
+    stored = len(database.get_anomaly_events(0))
+
+    assert record_new_anomalies(data, last_id=last_id) == last_id
+    assert len(database.get_anomaly_events(0)) == stored
+
+def test_isolation_forest_events_are_scored(db):
+    # Windows of 50 readings and more are evaluated by the isolation forest
+    data = _readings(count=200)
+    record_new_anomalies(data)
+
+    events = database.get_anomaly_events(24, 'temperature')
+    assert set(events['method']) == {'isolation_forest'}
+    assert (events['score'] >= database.ANOMALY_SCORE_FLOOR).all()
+
+    strict = database.get_anomaly_events(24, 'temperature', min_score=4.0)
+    assert list(strict['temperature']) == [25.0]
+
+def test_clear_old_data_removes_events_and_alerts_of_old_readings(db):
+    now = datetime.now()
+    for age in (timedelta(days=40), timedelta(hours=1)):
+        reading_id = database.store_readings(now - age, 35.0, 50.0)
+        database.store_anomaly_events([(reading_id, 'default', now - age, 'temperature', 35.0, 4.0, 'zscore')])
+        database.store_alert_events([(now - age, 'default', 'temperature_range', 'temperature', 'raised', 35.0,
+                                      'warning', reading_id, '{"max": 30.0}')])
+
+    assert database.clear_old_data(days=30) == 1
+    assert len(database.get_readings_by_timeframe(0)) == 1
+    assert len(database.get_anomaly_events(0)) == 1
+    assert len(database.get_alert_log(0)) == 1
@@ -0,0 +1,80 @@
+import http.client
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import api
+import database
+
+START = datetime(2026, 1, 1, 8, 0)
+
+@pytest.fixture
+def server(db):
+    database.store_readings_batch([
+        (START + timedelta(minutes=i), 20.0 + i % 5, 50.0, 'kho_a' if i % 2 else 'kho_b') for i in range(120)
+    ])
+    server = api.create_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _get(server, path, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+    conn.request('GET', path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, json.loads(body) if body and response.status != 304 else None
+
+def test_readings_are_paginated_with_a_cursor(server):
+    ids, cursor = [], 0
+    while cursor is not None:
+        response, page = _get(server, f'/readings?limit=50&cursor={cursor}')
+        assert response.status == 200
+        ids += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+    assert ids == list(range(1, 121))
+
+    _, page = _get(server, '/readings?sensor_id=kho_a&start=2026-01-01T08:10:00&end=2026-01-01T08:20:00')
+    assert [item['timestamp'] for item in page['items']] == [
+        f'2026-01-01T08:{minute}:00' for minute in range(11, 20, 2)
+    ]
+
+def test_unchanged_data_answers_not_modified(server):
+    response, _ = _get(server, '/readings/latest?count=5')
+    etag = response.getheader('ETag')
+
+    response, body = _get(server, '/rollups', headers={'If-None-Match': etag})
+    assert response.status == 304 and body is None
+
+    # A new reading changes the ETag
+    database.store_readings(START + timedelta(hours=3), 21.0, 50.0)
+    response, _ = _get(server, '/readings/latest', headers={'If-None-Match': etag})
+    assert response.status == 200
+    assert response.getheader('ETag') != etag
+
+def test_invalid_parameters_are_rejected(server):
+    for path in ('/readings?limit=0', '/readings?start=yesterday', '/quantiles?metric=pressure',
+                 '/anomalies?min_score=high'):
+        response, body = _get(server, path)
+        assert response.status == 400 and 'error' in body
+    assert _get(server, '/nothing')[0].status == 404
+
+@pytest.mark.parametrize('offset', ['Z', '%2B07:00', '+07:00', '-03:30'])
+def test_times_with_a_utc_offset_are_converted_to_local_time(server, offset):
+    utc_offset = {'Z': 0, '%2B07:00': 7 * 60, '+07:00': 7 * 60, '-03:30': -210}[offset]
+    zone = timezone(timedelta(minutes=utc_offset))
+    # The same instant as local 08:30, written in the requested offset
+    instant = START.replace(minute=30).astimezone(zone)
+    start = instant.strftime('%Y-%m-%dT%H:%M:%S') + offset
+
+    response, page = _get(server, f'/readings?limit=1&start={start}')
+    assert response.status == 200
+    assert page['items'][0]['timestamp'] == '2026-01-01T08:30:00'
+
+    response, result = _get(server, f'/quantiles?metric=temperature&q=0.5&start={start}')
+    assert response.status == 200
+    assert result['count'] == 90
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+import database
+from bulk_import import import_arrays, import_file
+from utils import export_csv_file, export_columnar_file
+
+def _arrays(size=2500):
+    rng = np.random.default_rng(0)
+    timestamps = np.datetime64('2026-01-01T00:00:00') + np.arange(size) * np.timedelta64(3, 's')
+    sensors = np.where(np.arange(size) % 3 == 0, 'kho_a', 'kho_b')
+    # Sensor resolution is 0.1, which the float32 columnar exports preserve
+    return timestamps, np.round(rng.normal(22, 2, size), 1), np.round(rng.normal(55, 5, size), 1), sensors
+
+def _stored():
+    readings = database.get_readings_between(None, None)
+    return readings[['timestamp', 'temperature', 'humidity', 'sensor_id']].reset_index(drop=True)
+
+def test_import_then_export_round_trips(db, tmp_path):
+    timestamps, temperatures, humidities, sensors = _arrays()
+    stats = import_arrays(timestamps, temperatures, humidities, sensors)
+    assert stats['rows'] == len(timestamps)
+
+    path = str(tmp_path / "export.csv.gz")
+    assert export_csv_file(path, 0, chunk_rows=1000, compress=True)['rows'] == len(timestamps)
+
+    exported = pd.read_csv(path)
+    assert list(exported['id']) == list(range(1, len(timestamps) + 1))
+    assert np.array_equal(pd.to_datetime(exported['timestamp']).to_numpy(), timestamps.astype('datetime64[ns]'))
+    assert np.array_equal(exported['temperature'], temperatures)
+    assert np.array_equal(exported['humidity'], humidities)
+    assert np.array_equal(exported['sensor_id'], sensors)
+
+def test_exported_files_import_into_an_identical_database(db, tmp_path, monkeypatch):
+    import_arrays(*_arrays(), rebuild_rollups=False)
+    original = _stored()
+    paths = [str(tmp_path / "export.csv")]
+    export_csv_file(paths[0], 0)
+    for file_format in ('parquet', 'arrow'):
+        paths.append(str(tmp_path / f"export.{file_format}"))
+        export_columnar_file(paths[-1], 0, file_format)
+
+    for i, path in enumerate(paths):
+        monkeypatch.setattr(database, 'DB_FILE', str(tmp_path / f"reimport_{i}.db"))
+        database.init_db()
+        import_file(path, rebuild_rollups=False)
+        pd.testing.assert_frame_equal(_stored(), original, check_exact=False, atol=1e-5)
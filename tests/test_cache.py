@@ -0,0 +1,35 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+import database
+from cache import HISTORY_TTL_SECONDS
+from instrumentation import TIMINGS
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(seconds=1_000 * HISTORY_TTL_SECONDS)
+    monkeypatch.setattr(cache, 'time', SimpleNamespace(time=lambda: now.seconds))
+    cache.cached_readings.clear()
+    return now
+
+def _misses():
+    return TIMINGS.counters().get('history_cache_misses', 0)
+
+def test_new_readings_reuse_the_history_entry_until_the_period_ends(db, clock):
+    database.store_readings(datetime.now(), 21.0, 50.0)
+    before = _misses()
+    readings = cache.load_history(1, 3.0)[0]
+
+    # A reading every few seconds must not turn each refresh into a miss
+    for _ in range(5):
+        database.store_readings(datetime.now(), 21.0, 50.0)
+        clock.seconds += 3
+        assert len(cache.load_history(1, 3.0)[0]) == len(readings) == 1
+    assert _misses() - before == 1
+
+    clock.seconds += HISTORY_TTL_SECONDS
+    assert len(cache.load_history(1, 3.0)[0]) == 6
+    assert _misses() - before == 2
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_detection import (
+    CHANGE_POINT_DEFAULTS,
+    PageHinkleyDetector,
+    detect_change_points,
+    detect_change_points_by_sensor,
+    update_change_detectors
+)
+
+def _readings(sensor_id='a', seed=0):
+    # Level shifts up and back down, with noise, one reading per minute
+    rng = np.random.default_rng(seed)
+    levels = np.repeat([22.0, 25.0, 21.0, 23.5], 150)
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2026-01-01', periods=len(levels), freq='min'),
+        'sensor_id': sensor_id,
+        'temperature': levels + rng.normal(0, 0.3, len(levels)),
+        'humidity': 50 + np.repeat([0.0, -8.0, 6.0, 0.0], 150) + rng.normal(0, 1.0, len(levels))
+    })
+
+def _streamed(data, metric):
+    detector = PageHinkleyDetector(*CHANGE_POINT_DEFAULTS[metric])
+    events = [detector.update(timestamp, float(value))
+              for timestamp, value in zip(data['timestamp'], data[metric])]
+    return [event for event in events if event is not None]
+
+def _key(event):
+    return (event['direction'], pd.Timestamp(event['onset_time']), pd.Timestamp(event['detected_time']))
+
+@pytest.mark.parametrize('metric', ['temperature', 'humidity'])
+@pytest.mark.parametrize('chunk_size', [7, 8192])
+def test_vectorized_detector_matches_streaming(metric, chunk_size):
+    data = _readings()
+    streamed = _streamed(data, metric)
+    vectorized = detect_change_points(data, metric, chunk_size=chunk_size).to_dict('records')
+
+    assert len(streamed) >= 3
+    assert [_key(event) for event in vectorized] == [_key(event) for event in streamed]
+    for ours, theirs in zip(vectorized, streamed):
+        assert ours['shift'] == pytest.approx(theirs['shift'])
+        assert ours['statistic'] == pytest.approx(theirs['statistic'])
+
+def test_batched_streaming_matches_vectorized_per_sensor():
+    data = pd.concat([_readings('a', seed=1), _readings('b', seed=2)]).sort_values('timestamp', kind='stable')
+
+    detectors = {}
+    streamed = []
+    for start in range(0, len(data), 137):
+        streamed.extend(update_change_detectors(detectors, data.iloc[start:start + 137]))
+
+    def keys(events):
+        return sorted((event['sensor_id'], event['metric']) + _key(event) for event in events)
+
+    assert keys(streamed) == keys(detect_change_points_by_sensor(data).to_dict('records'))
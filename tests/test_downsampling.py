@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsampling import downsample, lttb_indices, minmax_indices
+
+def _series(size=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 22 + np.cumsum(rng.normal(0, 0.05, size))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2026-01-01', periods=size, freq='3s'),
+        'temperature': values
+    })
+
+def _lttb_reference(x, y, n_out):
+    # Straightforward per-bucket implementation of LTTB
+    n = len(x)
+    edges = 1 + np.floor(np.linspace(0, n - 2, n_out - 1)).astype(int)
+    selected, a = [0], 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < n_out - 1:
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        best = max(range(start, end), key=lambda j: abs(
+            (x[a] - next_x) * (y[j] - y[a]) - (x[a] - x[j]) * (next_y - y[a])))
+        selected.append(best)
+        a = best
+    return np.array(selected + [n - 1])
+
+def test_lttb_matches_reference_implementation():
+    data = _series(3001)
+    x = np.arange(len(data), dtype=float)
+    y = data['temperature'].to_numpy()
+    for n_out in (3, 10, 250, 1000):
+        assert np.array_equal(lttb_indices(x, y, n_out), _lttb_reference(x, y, n_out))
+
+def test_minmax_keeps_every_bucket_extreme():
+    y = _series()['temperature'].to_numpy()
+    indices = minmax_indices(y, 100)
+    assert len(indices) <= 200
+    for bucket in np.array_split(np.arange(len(y)), 100):
+        assert y[bucket].max() in y[indices]
+        assert y[bucket].min() in y[indices]
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_keeps_every_masked_row(method):
+    data = _series()
+    keep = np.zeros(len(data), dtype=bool)
+    keep[np.random.default_rng(1).choice(len(data), 300, replace=False)] = True
+
+    result = downsample(data, 'temperature', 500, method=method, keep=keep)
+    assert set(np.flatnonzero(keep)) <= set(result.index)
+    assert len(result) <= 500 + keep.sum()
+    assert result.index.is_monotonic_increasing
+
+def test_downsample_keeps_short_series_and_drops_missing_values():
+    data = _series(50)
+    assert downsample(data, 'temperature', 100) is data
+
+    data = _series(1000)
+    data.loc[::7, 'temperature'] = np.nan
+    result = downsample(data, 'temperature', 200, keep=np.ones(len(data), dtype=bool))
+    assert result['temperature'].notna().all()
+    assert len(result) == data['temperature'].notna().sum()
@@ -0,0 +1,72 @@
+import threading
+
+from hub import AcquisitionHub
+
+class BlockingHub(AcquisitionHub):
+    """Hub whose sensor read waits until the test releases it."""
+
+    def __init__(self):
+        super().__init__(interval=0.01)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def _read(self):
+        self.reading.set()
+        self.release.wait(5)
+        return 21.5, 48.0
+
+def test_resubscribe_during_read_keeps_acquiring(db):
+    hub = BlockingHub()
+    first = hub.subscribe()
+    assert hub.reading.wait(5)
+
+    # The last viewer leaves and a new one arrives while the thread is inside a read
+    hub.unsubscribe(first)
+    second = hub.subscribe()
+    hub.release.set()
+
+    try:
+        readings, error = hub.poll(second, timeout=5)
+        assert error is None
+        assert readings
+        assert hub.running
+    finally:
+        hub.unsubscribe(second)
+        hub.stop()
+
+def test_poll_restarts_acquisition_after_thread_exit(db):
+    hub = BlockingHub()
+    hub.release.set()
+    subscriber = hub.subscribe()
+    hub.stop()
+    assert not hub.running
+
+    try:
+        readings, error = hub.poll(subscriber, timeout=5)
+        assert error is None
+        assert hub.running
+        readings, _ = hub.poll(subscriber, timeout=5)
+        assert readings
+    finally:
+        hub.unsubscribe(subscriber)
+        hub.stop()
+
+def test_configure_switches_the_source_while_running(db):
+    hub = AcquisitionHub(interval=0.01)
+    subscriber = hub.subscribe()
+
+    try:
+        readings, error = hub.poll(subscriber, timeout=5)
+        assert readings and error is None
+
+        # The next sample reads the (missing) serial port instead of the simulator
+        hub.configure(True, '/nonexistent/ttyUSB9', 9600)
+        assert hub.settings == (True, '/nonexistent/ttyUSB9', 9600)
+        for _ in range(50):
+            _, error = hub.poll(subscriber, timeout=0.1)
+            if error is not None:
+                break
+        assert error is not None
+    finally:
+        hub.unsubscribe(subscriber)
+        hub.stop()
@@ -0,0 +1,54 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+from instrumentation import TIMINGS, count
+
+def _samples(text):
+    """Sample lines as {name with labels: value}."""
+    return {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in text.splitlines() if line and not line.startswith('#')}
+
+def test_counters_and_histograms_are_rendered(db):
+    before = _samples(metrics.render_metrics())
+    count('readings_stored', 2)
+    TIMINGS.record('test_metrics_stage', 0.003)
+    samples = _samples(metrics.render_metrics())
+
+    # Every documented counter is exported, incremented or not
+    for counter in metrics.COUNTER_HELP:
+        assert f'warehouse_{counter}_total' in samples
+    assert samples['warehouse_readings_stored_total'] == before['warehouse_readings_stored_total'] + 2
+
+    # Buckets are cumulative: 3 ms falls in the 3.2 ms bucket and every larger one
+    name = 'warehouse_stage_duration_seconds'
+    assert samples[f'{name}_bucket{{stage="test_metrics_stage",le="0.0016"}}'] == 0
+    assert samples[f'{name}_bucket{{stage="test_metrics_stage",le="0.0032"}}'] == 1
+    assert samples[f'{name}_bucket{{stage="test_metrics_stage",le="+Inf"}}'] == 1
+    assert samples[f'{name}_count{{stage="test_metrics_stage"}}'] == 1
+    assert samples[f'{name}_sum{{stage="test_metrics_stage"}}'] == pytest.approx(0.003)
+    assert samples['warehouse_database_size_bytes'] > 0
+
+def test_metrics_file_is_replaced_without_leftovers(db, tmp_path):
+    path = tmp_path / 'warehouse.prom'
+    path.write_text('stale')
+    metrics.write_metrics_file(str(path))
+
+    assert 'warehouse_readings_stored_total' in path.read_text()
+    assert [entry.name for entry in tmp_path.iterdir() if entry.name.startswith('warehouse.prom')] == ['warehouse.prom']
+
+def test_exporter_serves_metrics_and_writes_the_file_on_stop(db, tmp_path):
+    path = tmp_path / 'warehouse.prom'
+    exporter = metrics.MetricsExporter(port=0, path=str(path), interval=60).start()
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{exporter.port}/metrics', timeout=5) as response:
+            assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+            assert 'warehouse_process_start_time_seconds' in response.read().decode('utf-8')
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f'http://127.0.0.1:{exporter.port}/other', timeout=5)
+        assert error.value.code == 404
+    finally:
+        exporter.stop()
+    assert 'warehouse_database_size_bytes' in path.read_text()
@@ -0,0 +1,51 @@
+import numpy as np
+
+from mock_data import TEMPERATURE_RANGE, SensorSimulator, _clamped_walk
+
+def _sequential_walk(start, steps, low, high, shifts):
+    values = np.empty_like(steps)
+    current = start.copy()
+    for t in range(len(steps)):
+        current = np.clip(current + steps[t], low, high) + shifts[t]
+        values[t] = current
+    return values
+
+def test_clamped_walk_matches_sequential_loop():
+    rng = np.random.default_rng(0)
+    for length in (1, 2, 3, 7, 64, 1001):
+        steps = rng.normal(0, 1.5, (length, 3))
+        shifts = np.where(rng.random((length, 3)) < 0.05, rng.normal(0, 4, (length, 3)), 0.0)
+        start = np.array([18.0, 22.0, 26.0])
+
+        expected = _sequential_walk(start, steps, 15.0, 30.0, shifts)
+        assert np.allclose(_clamped_walk(start, steps, 15.0, 30.0, shifts), expected)
+
+def test_clamped_walk_stays_within_bounds_without_shifts():
+    rng = np.random.default_rng(1)
+    steps = rng.normal(0, 5, (500, 2))
+
+    values = _clamped_walk(np.array([20.0, 20.0]), steps, 15.0, 30.0, np.zeros_like(steps))
+    assert values.min() >= 15.0
+    assert values.max() <= 30.0
+
+def _read(simulator, count):
+    return np.array([np.concatenate(simulator.read()) for _ in range(count)])
+
+def test_simulators_with_equal_seeds_are_independent():
+    expected = _read(SensorSimulator(3, seed=7), 50)
+
+    # Interleaved reads of other simulators (one with the same seed) don't change a simulator's data
+    first, second, other = SensorSimulator(3, seed=7), SensorSimulator(3, seed=7), SensorSimulator(['kho_a'])
+    interleaved = []
+    for _ in range(50):
+        other.read()
+        second.read()
+        interleaved.append(np.concatenate(first.read()))
+    assert np.array_equal(np.array(interleaved), expected)
+
+def test_simulated_readings_stay_in_the_sensor_range():
+    readings = SensorSimulator(20, seed=3).advance(2000)
+    assert readings['temperature'].shape == (2000, 20)
+    # Spikes are added after clamping, so only unlabelled readings are bounded
+    normal = readings['temperature'][~readings['temperature_anomaly']]
+    assert normal.min() >= TEMPERATURE_RANGE[0] and normal.max() <= TEMPERATURE_RANGE[1]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from anomaly_detection import _empty_baseline_table, _merge_bucket_statistics
+
+def _batch(rng, size):
+    return rng.integers(0, 7, size), rng.integers(0, 24, size), rng.normal(20, 3, size)
+
+def test_merged_batches_match_numpy_statistics():
+    rng = np.random.default_rng(0)
+    batches = [_batch(rng, size) for size in (500, 1, 2000, 37)]
+
+    table = _empty_baseline_table()
+    for weekday, hour, values in batches:
+        table = _merge_bucket_statistics(table, weekday, hour, values)
+
+    weekday, hour, values = (np.concatenate(parts) for parts in zip(*batches))
+    for day in range(7):
+        for h in range(24):
+            bucket = values[(weekday == day) & (hour == h)]
+            count, mean, m2 = table[:, day, h]
+            assert count == len(bucket)
+            if len(bucket):
+                assert np.isclose(mean, bucket.mean())
+                assert np.isclose(m2 / count, np.var(bucket))
+
+def test_merging_an_empty_batch_keeps_the_table():
+    rng = np.random.default_rng(1)
+    table = _merge_bucket_statistics(_empty_baseline_table(), *_batch(rng, 300))
+
+    empty = np.array([], dtype=int)
+    merged = _merge_bucket_statistics(table, empty, empty, np.array([]))
+    assert np.array_equal(merged, table)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import database
+import sketches
+from sketches import TDigest
+
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+TAILS = [0.001, 0.01, 0.99, 0.999]
+
+def _rank_error(sorted_values, estimates, quantiles):
+    ranks = np.searchsorted(sorted_values, estimates) / len(sorted_values)
+    return np.abs(ranks - np.asarray(quantiles)).max()
+
+def test_quantile_rank_error_is_bounded():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(20, 2, 50000), rng.exponential(3, 50000) + 25])
+    digest = TDigest.from_values(values)
+
+    values = np.sort(values)
+    assert digest.count == len(values)
+    assert _rank_error(values, digest.quantile(QUANTILES), QUANTILES) < 0.01
+    # Centroids are smallest near the ends, so the tails are the most accurate
+    assert _rank_error(values, digest.quantile(TAILS), TAILS) < 0.002
+    assert digest.quantile(0.0) == values[0]
+    assert digest.quantile(1.0) == values[-1]
+
+def test_merged_digests_keep_the_error_bound():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(mean, 1, 5000) for mean in range(20)]
+    digest = TDigest.merge([TDigest.from_values(part) for part in parts])
+
+    values = np.sort(np.concatenate(parts))
+    assert digest.count == len(values)
+    assert _rank_error(values, digest.quantile(QUANTILES), QUANTILES) < 0.01
+
+def test_serialized_digest_round_trips():
+    digest = TDigest.from_values(np.random.default_rng(2).normal(0, 1, 1000))
+    restored = TDigest.from_bytes(digest.to_bytes())
+    assert np.allclose(restored.quantile(QUANTILES), digest.quantile(QUANTILES))
+
+def test_range_digest_includes_readings_after_the_last_refresh(db):
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    database.store_readings_batch([(start + timedelta(minutes=10 * i), 20.0, 50.0, 'a') for i in range(30)])
+    sketches.refresh_sketches()
+
+    # Stored after the refresh, in the latest sketched hour
+    database.store_readings(start + timedelta(hours=5, minutes=1), 40.0, 50.0, 'a')
+
+    digest = sketches.range_digest('temperature')
+    assert digest.count == 31
+    assert digest.maximum == 40.0
+
+def test_range_digest_accepts_timezone_aware_times(db):
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+    database.store_readings_batch([(start + timedelta(minutes=10 * i), 20.0 + i, 50.0, 'a') for i in range(30)])
+    sketches.refresh_sketches()
+
+    aware_start = (start + timedelta(minutes=95)).astimezone(timezone(timedelta(hours=7)))
+    aware_end = (start + timedelta(hours=4, minutes=5)).astimezone(timezone.utc)
+    digest = sketches.range_digest('temperature', aware_start, aware_end)
+    # Readings at minutes 100, 110, ..., 240 after the start
+    assert digest.count == 15
+    assert (digest.minimum, digest.maximum) == (30.0, 44.0)
+
+    summary = sketches.describe_range(('temperature',), start=aware_start)['temperature']
+    assert summary['count'] == 20
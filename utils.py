@@ -1,9 +1,34 @@
-import pandas as pd
+import numpy as np
 import io
+import csv
+import gzip
+import time
 import datetime
 import sqlite3
 import os
 
+from database import iter_readings
+
+# Rows read from the database and written per step of a streaming export
+EXPORT_CHUNK_ROWS = 50000
+
+# Columns written by the streaming CSV export
+EXPORT_COLUMNS = ['id', 'timestamp', 'temperature', 'humidity', 'sensor_id']
+
+# Columnar export formats and the codec used to compress them
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+COLUMNAR_COMPRESSION = 'zstd'
+
+# Parquet encodings: ids and timestamps are near-sequential integers (delta
+# encoding), readings are noisy floats (byte stream split compresses them far
+# better than a dictionary)
+PARQUET_COLUMN_ENCODING = {
+    'id': 'DELTA_BINARY_PACKED',
+    'timestamp': 'DELTA_BINARY_PACKED',
+    'temperature': 'BYTE_STREAM_SPLIT',
+    'humidity': 'BYTE_STREAM_SPLIT'
+}
+
 def export_to_csv(data):
     """
     Export data to CSV format.
@@ -29,6 +54,187 @@ def export_to_csv(data):
     export_data.to_csv(csv_buffer, index=False)
     return csv_buffer.getvalue()
 
+def iter_csv_export(hours=0, chunk_rows=EXPORT_CHUNK_ROWS, compress=False, stats=None):
+    """
+    Stream readings from a timeframe as CSV without loading them all into memory.
+    
+    Rows are read from the database in chunks and formatted as they are written,
+    so memory use depends on the chunk size rather than the timeframe.
+    
+    Args:
+        hours (int): Number of hours to look back. If 0, exports all data.
+        chunk_rows (int): Rows read and written per step
+        compress (bool): gzip-compress the output
+        stats (dict): Optional dict that receives the number of exported 'rows'
+        
+    Yields:
+        bytes: Consecutive pieces of the (compressed) CSV file
+    """
+    buffer = io.BytesIO()
+    sink = gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) if compress else buffer
+    text = io.TextIOWrapper(sink, encoding='utf-8', newline='')
+    writer = csv.writer(text, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+    
+    rows = 0
+    for chunk in iter_readings(hours, chunk_rows):
+        # Stored timestamps are ISO text; cutting off the fraction formats them
+        # the same way as export_to_csv without a per-row strftime
+        writer.writerows(
+            (reading_id, timestamp[:19], temperature, humidity, sensor_id)
+            for reading_id, timestamp, temperature, humidity, sensor_id in chunk
+        )
+        rows += len(chunk)
+        text.flush()
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    text.flush()
+    text.detach()
+    if compress:
+        # Writes the remaining compressed data and the gzip trailer
+        sink.close()
+    if stats is not None:
+        stats['rows'] = rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_csv_file(path, hours=0, chunk_rows=EXPORT_CHUNK_ROWS, compress=False):
+    """
+    Write readings from a timeframe to a CSV file in chunks.
+    
+    Args:
+        path (str): Output file path
+        hours (int): Number of hours to look back. If 0, exports all data.
+        chunk_rows (int): Rows read and written per step
+        compress (bool): gzip-compress the file
+        
+    Returns:
+        dict: 'rows' exported, file 'bytes', 'seconds' taken and 'rows_per_second'
+    """
+    stats = {}
+    size = 0
+    start = time.perf_counter()
+    
+    with open(path, 'wb') as f:
+        for piece in iter_csv_export(hours, chunk_rows, compress, stats):
+            f.write(piece)
+            size += len(piece)
+    
+    seconds = time.perf_counter() - start
+    stats.update({
+        'bytes': size,
+        'seconds': seconds,
+        'rows_per_second': stats['rows'] / seconds if seconds > 0 else float('inf')
+    })
+    return stats
+
+def arrow_schema():
+    """
+    Schema of the columnar exports.
+    
+    Timestamps are epoch milliseconds, values float32 (sensor resolution is 0.1)
+    and sensor ids dictionary-encoded.
+    
+    Returns:
+        pyarrow.Schema: Export schema
+    """
+    # pyarrow is only needed for columnar exports; import it on first use
+    import pyarrow as pa
+    
+    return pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('ms')),
+        ('temperature', pa.float32()),
+        ('humidity', pa.float32()),
+        ('sensor_id', pa.dictionary(pa.int32(), pa.string()))
+    ])
+
+def iter_arrow_batches(hours=0, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream readings from a timeframe as Arrow record batches.
+    
+    Args:
+        hours (int): Number of hours to look back. If 0, exports all data.
+        chunk_rows (int): Rows per record batch
+        
+    Yields:
+        pyarrow.RecordBatch: Batches with the arrow_schema() columns
+    """
+    import pyarrow as pa
+    
+    schema = arrow_schema()
+    
+    # One dictionary for the whole export; new sensors extend it, so batches
+    # written to an Arrow IPC file only carry dictionary deltas
+    sensor_codes = {}
+    
+    for chunk in iter_readings(hours, chunk_rows):
+        ids, timestamps, temperatures, humidities, sensors = zip(*chunk)
+        
+        names, inverse = np.unique(np.array(sensors, dtype=object), return_inverse=True)
+        codes = np.array([sensor_codes.setdefault(name, len(sensor_codes)) for name in names], dtype=np.int32)
+        
+        yield pa.record_batch([
+            pa.array(np.array(ids, dtype=np.int64)),
+            pa.array(np.array(timestamps, dtype='datetime64[ms]')),
+            pa.array(np.array(temperatures, dtype=np.float32)),
+            pa.array(np.array(humidities, dtype=np.float32)),
+            pa.DictionaryArray.from_arrays(pa.array(codes[inverse]), pa.array(list(sensor_codes)))
+        ], schema=schema)
+
+def export_columnar_file(path, hours=0, file_format='parquet', chunk_rows=EXPORT_CHUNK_ROWS,
+                         compression=COLUMNAR_COMPRESSION):
+    """
+    Write readings from a timeframe to a Parquet or Arrow IPC file in batches.
+    
+    Args:
+        path (str): Output file path
+        hours (int): Number of hours to look back. If 0, exports all data.
+        file_format (str): 'parquet' or 'arrow'
+        chunk_rows (int): Rows per record batch (and Parquet row group)
+        compression (str): Compression codec, e.g. 'zstd', 'lz4' or None
+        
+    Returns:
+        dict: 'rows' exported, file 'bytes', 'seconds' taken and 'rows_per_second'
+    """
+    import pyarrow as pa
+    
+    if file_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    
+    start = time.perf_counter()
+    rows = 0
+    schema = arrow_schema()
+    
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(
+            path,
+            schema,
+            compression=compression or 'none',
+            use_dictionary=['sensor_id'],
+            column_encoding=PARQUET_COLUMN_ENCODING
+        )
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+        writer = pa.ipc.new_file(path, schema, options=options)
+    
+    with writer:
+        for batch in iter_arrow_batches(hours, chunk_rows):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    
+    seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else float('inf')
+    }
+
 def backup_database(db_file="warehouse_temperature.db", backup_dir="backups"):
     """
     Create a backup of the database.
@@ -89,22 +295,129 @@ def calculate_statistics(data):
             'humid_std': None
         }
     
-    # Calculate statistics
+    # Both columns are summarized together in one vectorized pass
+    summary = describe_columns(data, ('temperature', 'humidity'))
+    temp, humid = summary['temperature'], summary['humidity']
+    
     stats = {
-        'temp_min': data['temperature'].min(),
-        'temp_max': data['temperature'].max(),
-        'temp_avg': data['temperature'].mean(),
-        'temp_median': data['temperature'].median(),
-        'temp_std': data['temperature'].std(),
-        'humid_min': data['humidity'].min(),
-        'humid_max': data['humidity'].max(),
-        'humid_avg': data['humidity'].mean(),
-        'humid_median': data['humidity'].median(),
-        'humid_std': data['humidity'].std()
+        'temp_min': temp['min'],
+        'temp_max': temp['max'],
+        'temp_avg': temp['mean'],
+        'temp_median': temp['median'],
+        'temp_std': temp['std'],
+        'humid_min': humid['min'],
+        'humid_max': humid['max'],
+        'humid_avg': humid['mean'],
+        'humid_median': humid['median'],
+        'humid_std': humid['std']
     }
     
     return stats
 
+def _sorted_summary(column, bins):
+    """Summary of one sorted column without NaN (see summarize_distribution)."""
+    n = len(column)
+    
+    # Quartiles by linear interpolation between order statistics (as np.percentile)
+    positions = np.array([0.25, 0.5, 0.75]) * (n - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, n - 1)
+    q1, median, q3 = column[lower] + (column[upper] - column[lower]) * (positions - lower)
+    
+    # Whiskers reach the most extreme readings within 1.5 IQR of the box (Tukey)
+    iqr = q3 - q1
+    lowerfence = column[np.searchsorted(column, q1 - 1.5 * iqr, side='left')]
+    upperfence = column[np.searchsorted(column, q3 + 1.5 * iqr, side='right') - 1]
+    
+    # Histogram counts from bin edge positions in the sorted column; the last bin
+    # includes its right edge, as in np.histogram
+    low, high = column[0], column[-1]
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    positions = np.searchsorted(column, edges, side='left')
+    positions[-1] = n
+    counts = np.diff(positions)
+    
+    return {
+        'counts': counts,
+        'edges': edges,
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': lowerfence,
+        'upperfence': upperfence,
+        'min': column[0],
+        'max': column[-1],
+        'count': n
+    }
+
+def describe_columns(data, columns=('temperature', 'humidity'), bins=20):
+    """
+    Summarize several columns at once: moments, quartiles, fences and histogram.
+    
+    Mean and variance come from one pass over all columns (sums of shifted values
+    and their squares); a single sort per column then gives min, max, quartiles,
+    whiskers and the histogram without further passes over the data.
+    
+    Args:
+        data (pd.DataFrame): DataFrame containing the columns
+        columns (tuple): Names of the numeric columns to summarize
+        bins (int): Number of histogram bins
+        
+    Returns:
+        dict: Per column, the summarize_distribution() dict (None if the column has no values)
+    """
+    values = data[list(columns)].to_numpy(dtype=float)
+    if np.isnan(values).any():
+        # Rare (the database stores no missing readings); summarize columns separately
+        return {column: summarize_distribution(data[column], bins) for column in columns}
+    
+    n = len(values)
+    if n == 0:
+        return {column: None for column in columns}
+    
+    # Shift by the first row so the sum of squares does not lose precision
+    shifted = values - values[0]
+    sums = shifted.sum(axis=0)
+    squares = np.einsum('ij,ij->j', shifted, shifted)
+    means = values[0] + sums / n
+    variances = (squares - sums * sums / n) / (n - 1) if n > 1 else np.full(len(columns), np.nan)
+    
+    ordered = np.sort(values, axis=0)
+    summary = {}
+    for k, column in enumerate(columns):
+        summary[column] = _sorted_summary(ordered[:, k], bins)
+        summary[column]['mean'] = means[k]
+        summary[column]['std'] = np.sqrt(max(variances[k], 0.0)) if n > 1 else float('nan')
+    return summary
+
+def summarize_distribution(values, bins=20):
+    """
+    Precompute histogram bins and box-plot statistics for a series.
+    
+    Plots built from this summary send a fixed number of values to the browser
+    regardless of how many readings are in the timeframe.
+    
+    Args:
+        values (array-like): Readings to summarize
+        bins (int): Number of histogram bins
+        
+    Returns:
+        dict: Histogram 'counts' and 'edges', box statistics 'q1', 'median', 'q3',
+              'lowerfence', 'upperfence', plus 'mean', 'std', 'min', 'max' and 'count'.
+              None if there are no values
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return None
+    
+    summary = _sorted_summary(np.sort(values), bins)
+    summary['mean'] = values.mean()
+    summary['std'] = values.std(ddof=1) if len(values) > 1 else float('nan')
+    return summary
+
 def format_datetime(dt):
     """
     Format datetime object to string.
@@ -1,12 +1,112 @@
+import time
 import pandas as pd
 import numpy as np
 import streamlit as st
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 
-def plot_real_time_temperature(data, min_threshold=15.0, max_threshold=30.0):
+from downsampling import DEFAULT_POINT_BUDGET, downsample
+from utils import summarize_distribution
+
+# Series with more points than this are drawn with WebGL (go.Scattergl) instead of SVG
+DEFAULT_WEBGL_THRESHOLD = 5000
+
+class RenderStats:
+    """
+    Per-chart build time and serialized payload size of the plot_* functions.
+    
+    Figures are rebuilt on every refresh. st.plotly_chart sends the whole figure
+    each time, so a figure kept and updated in place would reach the browser at
+    the same size; the point budget (see downsampling.py) is what bounds it.
+    """
+    
+    def __init__(self, measure=False, render=True):
+        """
+        Args:
+            measure (bool): Record serialized payload size of every render
+                            (serializing the figure an extra time costs CPU)
+            render (bool): Send figures to the browser. Disable to only measure
+                           build time and payload size
+        """
+        self.measure = measure
+        self.render = render
+        self.figures = {}
+        self.stats = {}
+    
+    def record(self, name, elapsed, fig):
+        """Record build time (and payload size when measuring) of one chart."""
+        stats = self.stats.setdefault(name, {'renders': 0})
+        stats['renders'] += 1
+        stats['render_ms'] = elapsed * 1000
+        if self.measure:
+            stats['payload_bytes'] = len(fig.to_json())
+        self.figures[name] = fig
+    
+    def stats_frame(self):
+        """Return the per-chart render statistics as a DataFrame."""
+        return pd.DataFrame.from_dict(self.stats, orient='index')
+
+def _render(fig, name, render_stats, start):
+    """Send a figure to the browser and record its render statistics."""
+    # Keep zoom and pan state across refreshes: a stable key keeps the chart
+    # element and uirevision tells Plotly not to reset the view
+    fig.update_layout(uirevision=name)
+    if render_stats is None:
+        st.plotly_chart(fig, use_container_width=True, key=name)
+        return
+    
+    if render_stats.render:
+        st.plotly_chart(fig, use_container_width=True, key=name)
+    render_stats.record(name, time.perf_counter() - start, fig)
+
+def _scatter_type(n_points, webgl_threshold):
+    """Use WebGL for large series, which SVG renders slowly in the browser."""
+    if webgl_threshold is not None and n_points > webgl_threshold:
+        return go.Scattergl
+    return go.Scatter
+
+def _histogram_bars(summary):
+    """Bar centers, heights and widths of a precomputed histogram."""
+    edges = summary['edges']
+    return (edges[:-1] + edges[1:]) / 2, summary['counts'], np.diff(edges)
+
+def _box_statistics(summary):
+    """Precomputed box-plot properties for a go.Box trace."""
+    return dict(
+        q1=[summary['q1']],
+        median=[summary['median']],
+        q3=[summary['q3']],
+        lowerfence=[summary['lowerfence']],
+        upperfence=[summary['upperfence']],
+        mean=[summary['mean']],
+        sd=[summary['std']]
+    )
+
+def _anomaly_mask(data, anomalies):
+    """Rows of data that are recorded anomalies (matched on the reading id)."""
+    if anomalies is None or anomalies.empty or 'id' not in data.columns:
+        return None
+    return data['id'].isin(anomalies['reading_id']).to_numpy()
+
+def _anomaly_values(anomalies, column):
+    """Values of the anomalous readings (empty when there are none)."""
+    if anomalies.empty:
+        return []
+    return anomalies[column]
+
+def _change_point_shapes(change_points, metric):
+    """Dotted vertical lines at the onset of each level shift of a metric."""
+    if change_points is None or change_points.empty:
+        return []
+    events = change_points[change_points['metric'] == metric]
+    return [
+        dict(type='line', xref='x', yref='paper', x0=onset, x1=onset, y0=0, y1=1,
+             line=dict(color='#8E44AD' if direction == 'increase' else '#2980B9', width=1, dash='dot'))
+        for onset, direction in zip(events['onset_time'], events['direction'])
+    ]
+
+def plot_real_time_temperature(data, min_threshold=15.0, max_threshold=30.0, point_budget=DEFAULT_POINT_BUDGET, render_stats=None, webgl_threshold=DEFAULT_WEBGL_THRESHOLD):
     """
     Plot real-time temperature data with threshold lines.
     
@@ -14,19 +114,29 @@ def plot_real_time_temperature(data, min_threshold=15.0, max_threshold=30.0):
         data (pd.DataFrame): DataFrame with 'timestamp' and 'temperature' columns
         min_threshold (float): Minimum temperature threshold
         max_threshold (float): Maximum temperature threshold
+        point_budget (int): Maximum number of points sent to the browser
+        render_stats (RenderStats): Optional collector of build time and payload size
+        webgl_threshold (int): Point count above which WebGL traces are used
     """
     if data.empty:
         st.write("No temperature data available.")
         return
     
+    start = time.perf_counter()
+    
+    # Reduce the series to the point budget (no-op for short windows)
+    plot_data = downsample(data, 'temperature', point_budget)
+    
+    scatter_type = _scatter_type(len(plot_data), webgl_threshold)
+    
     # Create figure
     fig = go.Figure()
     
     # Add temperature line
     fig.add_trace(
-        go.Scatter(
-            x=data['timestamp'], 
-            y=data['temperature'],
+        scatter_type(
+            x=plot_data['timestamp'], 
+            y=plot_data['temperature'],
             mode='lines+markers',
             name='Temperature',
             line=dict(color='#E74C3C', width=2),
@@ -93,9 +203,9 @@ def plot_real_time_temperature(data, min_threshold=15.0, max_threshold=30.0):
         )
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    _render(fig, 'real_time_temperature', render_stats, start)
 
-def plot_real_time_humidity(data, min_threshold=30.0, max_threshold=70.0):
+def plot_real_time_humidity(data, min_threshold=30.0, max_threshold=70.0, point_budget=DEFAULT_POINT_BUDGET, render_stats=None, webgl_threshold=DEFAULT_WEBGL_THRESHOLD):
     """
     Plot real-time humidity data with threshold lines.
     
@@ -103,19 +213,29 @@ def plot_real_time_humidity(data, min_threshold=30.0, max_threshold=70.0):
         data (pd.DataFrame): DataFrame with 'timestamp' and 'humidity' columns
         min_threshold (float): Minimum humidity threshold
         max_threshold (float): Maximum humidity threshold
+        point_budget (int): Maximum number of points sent to the browser
+        render_stats (RenderStats): Optional collector of build time and payload size
+        webgl_threshold (int): Point count above which WebGL traces are used
     """
     if data.empty:
         st.write("No humidity data available.")
         return
     
+    start = time.perf_counter()
+    
+    # Reduce the series to the point budget (no-op for short windows)
+    plot_data = downsample(data, 'humidity', point_budget)
+    
+    scatter_type = _scatter_type(len(plot_data), webgl_threshold)
+    
     # Create figure
     fig = go.Figure()
     
     # Add humidity line
     fig.add_trace(
-        go.Scatter(
-            x=data['timestamp'], 
-            y=data['humidity'],
+        scatter_type(
+            x=plot_data['timestamp'], 
+            y=plot_data['humidity'],
             mode='lines+markers',
             name='Humidity',
             line=dict(color='#3498DB', width=2),
@@ -180,31 +300,68 @@ def plot_real_time_humidity(data, min_threshold=30.0, max_threshold=70.0):
         )
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    _render(fig, 'real_time_humidity', render_stats, start)
 
-def plot_historical_temperature(data):
+def plot_historical_temperature(data, point_budget=DEFAULT_POINT_BUDGET, render_stats=None, webgl_threshold=DEFAULT_WEBGL_THRESHOLD, summary=None, change_points=None, anomalies=None, method='lttb'):
     """
     Plot historical temperature data with a trend line.
     
     Args:
         data (pd.DataFrame): DataFrame with 'timestamp' and 'temperature' columns
+        point_budget (int): Maximum number of points sent to the browser
+        render_stats (RenderStats): Optional collector of build time and payload size
+        webgl_threshold (int): Point count above which WebGL traces are used
+        summary (dict): Precomputed summary of the 'temperature' column (see
+            utils.describe_columns); computed from data if None
+        change_points (pd.DataFrame): Detected level shifts (see
+            anomaly_detection.detect_change_points_by_sensor), marked at their onset
+        anomalies (pd.DataFrame): Recorded anomaly events of the metric; their
+            readings survive downsampling
+        method (str): Downsampling method, 'lttb' or 'minmax'
     """
     if data.empty:
         st.write("No historical temperature data available.")
         return
     
-    # Resample data for daily average if the timeframe is large
-    if len(data) > 500:
-        data_resampled = data.set_index('timestamp').resample('1H').mean().reset_index()
-    else:
-        data_resampled = data
+    start = time.perf_counter()
+    
+    # Downsample large timeframes (LTTB or min/max envelope, both keep the spikes that
+    # averaging would flatten); recorded anomalies are always kept
+    data_resampled = downsample(data, 'temperature', point_budget, method=method,
+                                keep=_anomaly_mask(data, anomalies))
+    
+    # Fit the trend line on all readings against elapsed time
+    first_time = data['timestamp'].iloc[0]
+    x = (data['timestamp'] - first_time).dt.total_seconds().to_numpy()
+    y = data['temperature'].to_numpy(dtype=float)
+    z = np.polyfit(x, y, 1) if len(data) > 1 else np.array([0.0, y[0]])
+    p = np.poly1d(z)
+    
+    # A straight line only needs its two end points
+    trend_x = data['timestamp'].iloc[[0, -1]]
+    trend_y = p((trend_x - first_time).dt.total_seconds().to_numpy())
+    
+    # Statistical information
+    if summary is None:
+        values = data['temperature'].to_numpy(dtype=float)
+        summary = {'mean': np.nanmean(values), 'min': np.nanmin(values), 'max': np.nanmax(values)}
+    avg_temp = summary['mean']
+    min_temp = summary['min']
+    max_temp = summary['max']
+    stats_text = f"Avg: {avg_temp:.1f}°C | Min: {min_temp:.1f}°C | Max: {max_temp:.1f}°C"
+    
+    shapes = _change_point_shapes(change_points, 'temperature')
+    if shapes:
+        stats_text += f" | Change points: {len(shapes)}"
+    
+    scatter_type = _scatter_type(len(data_resampled), webgl_threshold)
     
     # Create figure
     fig = go.Figure()
     
     # Add temperature scatter plot
     fig.add_trace(
-        go.Scatter(
+        scatter_type(
             x=data_resampled['timestamp'], 
             y=data_resampled['temperature'],
             mode='lines',
@@ -214,15 +371,10 @@ def plot_historical_temperature(data):
     )
     
     # Add trend line
-    x = np.array(range(len(data_resampled)))
-    y = data_resampled['temperature'].values
-    z = np.polyfit(x, y, 1)
-    p = np.poly1d(z)
-    
     fig.add_trace(
         go.Scatter(
-            x=data_resampled['timestamp'],
-            y=p(x),
+            x=trend_x,
+            y=trend_y,
             mode='lines',
             name='Trend',
             line=dict(color='#7F8C8D', width=2, dash='dash')
@@ -230,16 +382,12 @@ def plot_historical_temperature(data):
     )
     
     # Add statistical information
-    avg_temp = data['temperature'].mean()
-    min_temp = data['temperature'].min()
-    max_temp = data['temperature'].max()
-    
     fig.add_annotation(
         x=0.02,
         y=0.98,
         xref="paper",
         yref="paper",
-        text=f"Avg: {avg_temp:.1f}°C | Min: {min_temp:.1f}°C | Max: {max_temp:.1f}°C",
+        text=stats_text,
         showarrow=False,
         font=dict(size=12),
         align="left",
@@ -260,6 +408,9 @@ def plot_historical_temperature(data):
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
     
+    # Mark the onset of detected level shifts
+    fig.update_layout(shapes=shapes)
+    
     # Add range selector
     fig.update_layout(
         xaxis=dict(
@@ -276,31 +427,68 @@ def plot_historical_temperature(data):
         )
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    _render(fig, 'historical_temperature', render_stats, start)
 
-def plot_historical_humidity(data):
+def plot_historical_humidity(data, point_budget=DEFAULT_POINT_BUDGET, render_stats=None, webgl_threshold=DEFAULT_WEBGL_THRESHOLD, summary=None, change_points=None, anomalies=None, method='lttb'):
     """
     Plot historical humidity data with a trend line.
     
     Args:
         data (pd.DataFrame): DataFrame with 'timestamp' and 'humidity' columns
+        point_budget (int): Maximum number of points sent to the browser
+        render_stats (RenderStats): Optional collector of build time and payload size
+        webgl_threshold (int): Point count above which WebGL traces are used
+        summary (dict): Precomputed summary of the 'humidity' column (see
+            utils.describe_columns); computed from data if None
+        change_points (pd.DataFrame): Detected level shifts (see
+            anomaly_detection.detect_change_points_by_sensor), marked at their onset
+        anomalies (pd.DataFrame): Recorded anomaly events of the metric; their
+            readings survive downsampling
+        method (str): Downsampling method, 'lttb' or 'minmax'
     """
     if data.empty:
         st.write("No historical humidity data available.")
         return
     
-    # Resample data for daily average if the timeframe is large
-    if len(data) > 500:
-        data_resampled = data.set_index('timestamp').resample('1H').mean().reset_index()
-    else:
-        data_resampled = data
+    start = time.perf_counter()
+    
+    # Downsample large timeframes (LTTB or min/max envelope, both keep the spikes that
+    # averaging would flatten); recorded anomalies are always kept
+    data_resampled = downsample(data, 'humidity', point_budget, method=method,
+                                keep=_anomaly_mask(data, anomalies))
+    
+    # Fit the trend line on all readings against elapsed time
+    first_time = data['timestamp'].iloc[0]
+    x = (data['timestamp'] - first_time).dt.total_seconds().to_numpy()
+    y = data['humidity'].to_numpy(dtype=float)
+    z = np.polyfit(x, y, 1) if len(data) > 1 else np.array([0.0, y[0]])
+    p = np.poly1d(z)
+    
+    # A straight line only needs its two end points
+    trend_x = data['timestamp'].iloc[[0, -1]]
+    trend_y = p((trend_x - first_time).dt.total_seconds().to_numpy())
+    
+    # Statistical information
+    if summary is None:
+        values = data['humidity'].to_numpy(dtype=float)
+        summary = {'mean': np.nanmean(values), 'min': np.nanmin(values), 'max': np.nanmax(values)}
+    avg_humid = summary['mean']
+    min_humid = summary['min']
+    max_humid = summary['max']
+    stats_text = f"Avg: {avg_humid:.1f}% | Min: {min_humid:.1f}% | Max: {max_humid:.1f}%"
+    
+    shapes = _change_point_shapes(change_points, 'humidity')
+    if shapes:
+        stats_text += f" | Change points: {len(shapes)}"
+    
+    scatter_type = _scatter_type(len(data_resampled), webgl_threshold)
     
     # Create figure
     fig = go.Figure()
     
     # Add humidity scatter plot
     fig.add_trace(
-        go.Scatter(
+        scatter_type(
             x=data_resampled['timestamp'], 
             y=data_resampled['humidity'],
             mode='lines',
@@ -310,15 +498,10 @@ def plot_historical_humidity(data):
     )
     
     # Add trend line
-    x = np.array(range(len(data_resampled)))
-    y = data_resampled['humidity'].values
-    z = np.polyfit(x, y, 1)
-    p = np.poly1d(z)
-    
     fig.add_trace(
         go.Scatter(
-            x=data_resampled['timestamp'],
-            y=p(x),
+            x=trend_x,
+            y=trend_y,
             mode='lines',
             name='Trend',
             line=dict(color='#7F8C8D', width=2, dash='dash')
@@ -326,16 +509,12 @@ def plot_historical_humidity(data):
     )
     
     # Add statistical information
-    avg_humid = data['humidity'].mean()
-    min_humid = data['humidity'].min()
-    max_humid = data['humidity'].max()
-    
     fig.add_annotation(
         x=0.02,
         y=0.98,
         xref="paper",
         yref="paper",
-        text=f"Avg: {avg_humid:.1f}% | Min: {min_humid:.1f}% | Max: {max_humid:.1f}%",
+        text=stats_text,
         showarrow=False,
         font=dict(size=12),
         align="left",
@@ -356,6 +535,9 @@ def plot_historical_humidity(data):
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
     
+    # Mark the onset of detected level shifts
+    fig.update_layout(shapes=shapes)
+    
     # Add range selector
     fig.update_layout(
         xaxis=dict(
@@ -372,20 +554,43 @@ def plot_historical_humidity(data):
         )
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    _render(fig, 'historical_humidity', render_stats, start)
 
-def plot_temperature_statistics(data, anomalies):
+def plot_temperature_statistics(data, anomalies, render_stats=None, webgl_threshold=DEFAULT_WEBGL_THRESHOLD, summary=None):
     """
     Plot temperature statistics and highlight anomalies.
     
     Args:
         data (pd.DataFrame): DataFrame with 'timestamp' and 'temperature' columns
         anomalies (pd.DataFrame): DataFrame with anomalous temperature readings
+        render_stats (RenderStats): Optional collector of build time and payload size
+        webgl_threshold (int): Point count above which WebGL traces are used
+        summary (dict): Precomputed summary of the 'temperature' column (see
+            utils.describe_columns); computed from data if None
     """
     if data.empty:
         st.write("No temperature statistics available.")
         return
     
+    start = time.perf_counter()
+    
+    # Calculate histogram bins and box statistics server-side
+    if summary is None:
+        summary = summarize_distribution(data['temperature'])
+    bar_x, bar_y, bar_width = _histogram_bars(summary)
+    
+    avg_temp = summary['mean']
+    median_temp = summary['median']
+    std_temp = summary['std']
+    anomaly_count = len(anomalies)
+    stats_text = f"Avg: {avg_temp:.1f}°C | Median: {median_temp:.1f}°C | Std Dev: {std_temp:.2f}°C | Anomalies: {anomaly_count}"
+    
+    # Anomalies are drawn over the box plot, which sits at the 'Temperature' category
+    anomaly_values = _anomaly_values(anomalies, 'temperature')
+    anomaly_x = ['Temperature'] * len(anomaly_values)
+    
+    scatter_type = _scatter_type(len(anomaly_values), webgl_threshold)
+    
     # Create subplots
     fig = make_subplots(
         rows=2, 
@@ -394,50 +599,45 @@ def plot_temperature_statistics(data, anomalies):
         vertical_spacing=0.3
     )
     
-    # Add histogram to first subplot
+    # Add precomputed histogram to first subplot
     fig.add_trace(
-        go.Histogram(
-            x=data['temperature'],
-            nbinsx=20,
+        go.Bar(
+            x=bar_x,
+            y=bar_y,
+            width=bar_width,
             marker_color='#E74C3C',
             name='Temperature'
         ),
         row=1, col=1
     )
     
-    # Add box plot to second subplot
+    # Add box plot from precomputed quartiles and whiskers to second subplot
     fig.add_trace(
         go.Box(
-            y=data['temperature'],
+            x=['Temperature'],
             name='Temperature',
             marker_color='#E74C3C',
-            boxmean=True
+            boxmean=True,
+            **_box_statistics(summary)
         ),
         row=2, col=1
     )
     
-    # Highlight anomalies if any
-    if not anomalies.empty:
-        fig.add_trace(
-            go.Scatter(
-                x=[anomalies.index] * len(anomalies),
-                y=anomalies['temperature'],
-                mode='markers',
-                name='Anomalies',
-                marker=dict(
-                    color='red',
-                    size=10,
-                    symbol='x'
-                )
-            ),
-            row=2, col=1
-        )
-    
-    # Calculate statistics
-    avg_temp = data['temperature'].mean()
-    median_temp = data['temperature'].median()
-    std_temp = data['temperature'].std()
-    anomaly_count = len(anomalies)
+    # Highlight anomalies
+    fig.add_trace(
+        scatter_type(
+            x=anomaly_x,
+            y=anomaly_values,
+            mode='markers',
+            name='Anomalies',
+            marker=dict(
+                color='red',
+                size=10,
+                symbol='x'
+            )
+        ),
+        row=2, col=1
+    )
     
     # Add statistics as annotation
     fig.add_annotation(
@@ -445,7 +645,7 @@ def plot_temperature_statistics(data, anomalies):
         y=1.12,
         xref="paper",
         yref="paper",
-        text=f"Avg: {avg_temp:.1f}°C | Median: {median_temp:.1f}°C | Std Dev: {std_temp:.2f}°C | Anomalies: {anomaly_count}",
+        text=stats_text,
         showarrow=False,
         font=dict(size=12),
         align="center",
@@ -462,20 +662,43 @@ def plot_temperature_statistics(data, anomalies):
         showlegend=False
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    _render(fig, 'temperature_statistics', render_stats, start)
 
-def plot_humidity_statistics(data, anomalies):
+def plot_humidity_statistics(data, anomalies, render_stats=None, webgl_threshold=DEFAULT_WEBGL_THRESHOLD, summary=None):
     """
     Plot humidity statistics and highlight anomalies.
     
     Args:
         data (pd.DataFrame): DataFrame with 'timestamp' and 'humidity' columns
         anomalies (pd.DataFrame): DataFrame with anomalous humidity readings
+        render_stats (RenderStats): Optional collector of build time and payload size
+        webgl_threshold (int): Point count above which WebGL traces are used
+        summary (dict): Precomputed summary of the 'humidity' column (see
+            utils.describe_columns); computed from data if None
     """
     if data.empty:
         st.write("No humidity statistics available.")
         return
     
+    start = time.perf_counter()
+    
+    # Calculate histogram bins and box statistics server-side
+    if summary is None:
+        summary = summarize_distribution(data['humidity'])
+    bar_x, bar_y, bar_width = _histogram_bars(summary)
+    
+    avg_humid = summary['mean']
+    median_humid = summary['median']
+    std_humid = summary['std']
+    anomaly_count = len(anomalies)
+    stats_text = f"Avg: {avg_humid:.1f}% | Median: {median_humid:.1f}% | Std Dev: {std_humid:.2f}% | Anomalies: {anomaly_count}"
+    
+    # Anomalies are drawn over the box plot, which sits at the 'Humidity' category
+    anomaly_values = _anomaly_values(anomalies, 'humidity')
+    anomaly_x = ['Humidity'] * len(anomaly_values)
+    
+    scatter_type = _scatter_type(len(anomaly_values), webgl_threshold)
+    
     # Create subplots
     fig = make_subplots(
         rows=2, 
@@ -484,50 +707,45 @@ def plot_humidity_statistics(data, anomalies):
         vertical_spacing=0.3
     )
     
-    # Add histogram to first subplot
+    # Add precomputed histogram to first subplot
     fig.add_trace(
-        go.Histogram(
-            x=data['humidity'],
-            nbinsx=20,
+        go.Bar(
+            x=bar_x,
+            y=bar_y,
+            width=bar_width,
             marker_color='#3498DB',
             name='Humidity'
         ),
         row=1, col=1
     )
     
-    # Add box plot to second subplot
+    # Add box plot from precomputed quartiles and whiskers to second subplot
     fig.add_trace(
         go.Box(
-            y=data['humidity'],
+            x=['Humidity'],
             name='Humidity',
             marker_color='#3498DB',
-            boxmean=True
+            boxmean=True,
+            **_box_statistics(summary)
         ),
         row=2, col=1
     )
     
-    # Highlight anomalies if any
-    if not anomalies.empty:
-        fig.add_trace(
-            go.Scatter(
-                x=[anomalies.index] * len(anomalies),
-                y=anomalies['humidity'],
-                mode='markers',
-                name='Anomalies',
-                marker=dict(
-                    color='red',
-                    size=10,
-                    symbol='x'
-                )
-            ),
-            row=2, col=1
-        )
-    
-    # Calculate statistics
-    avg_humid = data['humidity'].mean()
-    median_humid = data['humidity'].median()
-    std_humid = data['humidity'].std()
-    anomaly_count = len(anomalies)
+    # Highlight anomalies
+    fig.add_trace(
+        scatter_type(
+            x=anomaly_x,
+            y=anomaly_values,
+            mode='markers',
+            name='Anomalies',
+            marker=dict(
+                color='red',
+                size=10,
+                symbol='x'
+            )
+        ),
+        row=2, col=1
+    )
     
     # Add statistics as annotation
     fig.add_annotation(
@@ -535,7 +753,7 @@ def plot_humidity_statistics(data, anomalies):
         y=1.12,
         xref="paper",
         yref="paper",
-        text=f"Avg: {avg_humid:.1f}% | Median: {median_humid:.1f}% | Std Dev: {std_humid:.2f}% | Anomalies: {anomaly_count}",
+        text=stats_text,
         showarrow=False,
         font=dict(size=12),
         align="center",
@@ -552,4 +770,4 @@ def plot_humidity_statistics(data, anomalies):
         showlegend=False
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    _render(fig, 'humidity_statistics', render_stats, start)